@@ -0,0 +1,6 @@
+"""Synthetic data generator and benchmark scenarios for the parser and server.
+
+  python -m benchmark.generate --entries 100000 --out /tmp/big
+  python -m benchmark.run --sizes 10000 100000 [--baseline benchmark/results/<commit>.json]
+  python -m benchmark.loadtest --threads 16 --requests 2000 [--url http://127.0.0.1:5000] [--max-p95-ms 200]
+"""
@@ -0,0 +1,128 @@
+"""Deterministic synthetic glossaries shaped like the ECSS data.
+
+The same (count, seed) always produces byte-identical files, so benchmark
+runs on different commits see the same input.
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.json_stream import write_json_array
+
+SEED = 2023
+
+CSV_HEADER = ['Type', 'Identifiant', 'Terme/Abréviation', 'Définition/Signification']
+
+WORDS = (
+    'acceptance activity analysis antenna apogee assembly assurance attitude audit availability baseline '
+    'battery board cleanliness component configuration contamination control customer data design '
+    'deviation document element engineering environment equipment failure flight function ground '
+    'hardware hazard inspection integration interface launch level lifetime load maintenance margin '
+    'material mission model module nonconformance operation orbit part payload performance plan '
+    'procedure process product project qualification quality radiation readiness redundancy '
+    'reliability requirement review risk safety satellite segment software space specification '
+    'structure subsystem supplier support system telemetry test thermal validation verification waiver'
+).split()
+
+LINKS = ('of', 'for', 'within', 'under', 'against', 'with', 'by', 'from', 'during', 'after')
+
+TAGS = ('Management', 'Engineering', 'Product assurance', 'Sustainability', 'Ground', 'Launch',
+        'Software', 'Thermal', 'Mechanical', 'Electrical')
+
+
+def _phrase(rng, low, high):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+
+def _definition(rng):
+    parts = [_phrase(rng, 2, 5)]
+    for _ in range(rng.randint(1, 4)):
+        parts.append(rng.choice(LINKS))
+        parts.append(_phrase(rng, 1, 4))
+    text = ' '.join(parts)
+    roll = rng.random()
+    if roll < 0.3:
+        # commas and quotes exercise the CSV quoting
+        text += f', including "{_phrase(rng, 1, 2)}", {_phrase(rng, 1, 3)}'
+    elif roll < 0.35:
+        text += '\n' + _phrase(rng, 3, 8)
+    return text
+
+
+def _abbreviation(term):
+    return ''.join(w[0] for w in term.split()).upper()
+
+
+def iter_ecss_rows(count, seed=SEED):
+    """Yield [type, id, term, definition] rows: about 2/3 terms numbered
+    like ECSS clauses (2.2.x, 2.3.x, ...), the rest numbered abbreviations."""
+    rng = random.Random(seed)
+    clause = 2
+    numbers = {}
+    abbreviations = 0
+    for i in range(count):
+        if rng.random() < 0.67:
+            sub = rng.randint(2, 5)
+            numbers[sub] = numbers.get(sub, 0) + 1
+            term = _phrase(rng, 1, 3)
+            yield ['Terme', f'{clause}.{sub}.{numbers[sub]}', term, _definition(rng)]
+        else:
+            abbreviations += 1
+            meaning = _phrase(rng, 2, 4)
+            yield ['Abréviation', str(abbreviations), _abbreviation(meaning) + str(i % 7 or ''), meaning]
+
+
+def iter_user_entries(count, seed=SEED):
+    """Yield user glossary entries in the server's schema (unique timestamps)."""
+    rng = random.Random(seed + 1)
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        term = _phrase(rng, 1, 3)
+        created = (start + timedelta(seconds=37 * i)).isoformat() + 'Z'
+        yield {
+            'id': str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            'term': term,
+            'definition': _definition(rng),
+            'abbreviation': _abbreviation(term) if rng.random() < 0.4 else '',
+            'tags': rng.sample(TAGS, rng.randint(0, 2)),
+            'created_at': created,
+            'updated_at': created,
+        }
+
+
+def write_ecss_csv(path, count, seed=SEED):
+    with open(path, 'w', newline='', encoding='utf-8') as fh:
+        writer = csv.writer(fh, lineterminator='\n')
+        writer.writerow(CSV_HEADER)
+        writer.writerows(iter_ecss_rows(count, seed))
+    return path
+
+
+def write_user_glossary(path, count, seed=SEED):
+    with open(path, 'w', encoding='utf-8') as fh:
+        write_json_array(iter_user_entries(count, seed), fh)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write a synthetic ECSS CSV and user glossary.')
+    parser.add_argument('--entries', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--out', default='.', help='output directory')
+    args = parser.parse_args(argv)
+    os.makedirs(args.out, exist_ok=True)
+    csv_path = write_ecss_csv(os.path.join(args.out, 'ecss_glossaire.txt'), args.entries, args.seed)
+    user_path = write_user_glossary(os.path.join(args.out, 'glossary_user.json'), args.entries, args.seed)
+    print(f'Wrote {csv_path} and {user_path} ({args.entries} entries each).')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
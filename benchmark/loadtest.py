@@ -0,0 +1,334 @@
+"""Concurrent load test: many clients editing every collection at once.
+
+Worker threads send a weighted mix of list / search / create / update /
+delete requests across terms, images, equations, references and methods,
+either to the Flask app in-process (on a temporary copy of synthetic data)
+or to a running server (`--url`). Each worker only updates and deletes what
+it created, so the expected final state of every acknowledged write is
+known; afterwards every collection is read back and checked:
+
+- the JSON still parses and ids are unique;
+- every acknowledged create is present (unless deleted) with the value of
+  its last acknowledged update;
+- every acknowledged delete is gone.
+
+The server has no search endpoint (search runs in the browser); `search`
+fetches the precomputed index for terms and the list elsewhere.
+
+  python -m benchmark.loadtest --threads 16 --requests 2000
+  python -m benchmark.loadtest --url http://127.0.0.1:5000 --max-p95-ms 200
+
+Exits with status 1 when the integrity check fails or an SLO is exceeded.
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmark import generate
+
+OPERATIONS = ('list', 'search', 'create', 'update', 'delete')
+DEFAULT_MIX = {'list': 35, 'search': 15, 'create': 20, 'update': 20, 'delete': 10}
+
+SVG = b'<svg xmlns="http://www.w3.org/2000/svg" width="4" height="4"><rect width="4" height="4"/></svg>'
+
+# collection -> url, search url, create payload, field changed by updates
+COLLECTIONS = {
+    'terms': ('/api/terms', '/api/terms/index',
+              lambda n: {'term': f'load term {n}', 'definition': 'created under load', 'tags': 'Load'}, 'definition'),
+    'equations': ('/api/equations', None,
+                  lambda n: {'name': f'load equation {n}', 'content': f'x_{{{n}}} = 1', 'description': ''}, 'description'),
+    'references': ('/api/references', None,
+                   lambda n: {'title': f'load reference {n}', 'type': 'article', 'author': 'load test', 'description': ''}, 'description'),
+    'methods': ('/api/methods', None,
+                lambda n: {'title': f'load method {n}', 'definition': 'created under load'}, 'definition'),
+    'images': ('/api/images', None, None, None),
+}
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class InProcessClient:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None, upload=None):
+        kwargs = {}
+        if upload is not None:
+            name, data = upload
+            kwargs['data'] = {'file': (io.BytesIO(data), name), 'title': name}
+            kwargs['content_type'] = 'multipart/form-data'
+        elif body is not None:
+            kwargs['json'] = body
+        resp = self.client.open(path, method=method, **kwargs)
+        return resp.status_code, resp.get_data()
+
+
+class HttpClient:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, body=None, upload=None):
+        headers = {}
+        data = None
+        if upload is not None:
+            name, content = upload
+            boundary = uuid.uuid4().hex
+            data = (f'--{boundary}\r\nContent-Disposition: form-data; name="title"\r\n\r\n{name}\r\n'
+                    f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{name}"\r\n'
+                    f'Content-Type: application/octet-stream\r\n\r\n').encode() + content + f'\r\n--{boundary}--\r\n'.encode()
+            headers['Content-Type'] = f'multipart/form-data; boundary={boundary}'
+        elif body is not None:
+            data = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        req = urllib.request.Request(self.base_url + path, data=data, method=method, headers=headers)
+        try:
+            with urllib.request.urlopen(req, timeout=60) as resp:
+                return resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+
+class Worker:
+    """One simulated user: owns the records it creates."""
+
+    def __init__(self, index, client, mix, seed):
+        self.index = index
+        self.client = client
+        self.rng = random.Random(seed * 1000 + index)
+        self.ops, self.weights = zip(*mix.items())
+        self.owned = {name: {} for name in COLLECTIONS}    # id -> expected field value
+        self.deleted = {name: set() for name in COLLECTIONS}
+        self.latencies = {}                                 # 'op collection' -> [seconds]
+        self.errors = {}                                    # 'op collection status' -> count
+        self.count = 0
+
+    def _call(self, label, method, path, body=None, upload=None, expect=(200,)):
+        start = time.perf_counter()
+        try:
+            status, data = self.client.request(method, path, body, upload)
+        except Exception as e:
+            status, data = f'exception {type(e).__name__}', b''
+        self.latencies.setdefault(label, []).append(time.perf_counter() - start)
+        self.count += 1
+        if status not in expect:
+            key = f'{label} {status}'
+            self.errors[key] = self.errors.get(key, 0) + 1
+            return None
+        return data
+
+    def step(self):
+        name = self.rng.choice(list(COLLECTIONS))
+        url, search_url, payload, field = COLLECTIONS[name]
+        op = self.rng.choices(self.ops, self.weights)[0]
+        owned = self.owned[name]
+        if op in ('update', 'delete') and not owned or op == 'update' and field is None:
+            op = 'create'
+        label = f'{op} {name}'
+        if op == 'list':
+            self._call(label, 'GET', url)
+        elif op == 'search':
+            self._call(label, 'GET', search_url or url, expect=(200, 404))
+        elif op == 'create':
+            n = f'{self.index}-{self.count}'
+            if payload is None:
+                data = self._call(label, 'POST', url, upload=(f'load-{n}.svg', SVG), expect=(201,))
+                value = None
+            else:
+                data = self._call(label, 'POST', url, payload(n), expect=(201,))
+                value = payload(n).get(field)
+            if data is not None:
+                owned[json.loads(data)['id']] = value
+        elif op == 'update':
+            item_id = self.rng.choice(list(owned))
+            value = f'updated by worker {self.index} at {self.count}'
+            if self._call(label, 'PUT', f'{url}/{item_id}', {field: value}) is not None:
+                owned[item_id] = value
+        else:
+            item_id = self.rng.choice(list(owned))
+            if self._call(label, 'DELETE', f'{url}/{item_id}') is not None:
+                del owned[item_id]
+                self.deleted[name].add(item_id)
+
+
+def check_integrity(client, workers, data_dir=None):
+    """Return a list of problems with the final state of every collection."""
+    problems = []
+    for name, (url, _, _, field) in COLLECTIONS.items():
+        status, data = client.request('GET', url)
+        if status != 200:
+            problems.append(f'{name}: GET {url} returned {status}')
+            continue
+        try:
+            items = json.loads(data)
+        except ValueError as e:
+            problems.append(f'{name}: list is not valid JSON ({e})')
+            continue
+        by_id = {}
+        for it in items:
+            if it.get('id') in by_id:
+                problems.append(f'{name}: duplicate id {it.get("id")}')
+            by_id[it.get('id')] = it
+        for w in workers:
+            for item_id, value in w.owned[name].items():
+                if item_id not in by_id:
+                    problems.append(f'{name}: acknowledged create {item_id} is missing (lost update)')
+                elif field and by_id[item_id].get(field) != value:
+                    problems.append(f'{name}: {item_id}.{field} is {by_id[item_id].get(field)!r}, expected {value!r}')
+            for item_id in w.deleted[name]:
+                if item_id in by_id:
+                    problems.append(f'{name}: acknowledged delete {item_id} is still present')
+    if data_dir:
+        for fn in sorted(os.listdir(data_dir)):
+            if fn.endswith('.json'):
+                try:
+                    with open(os.path.join(data_dir, fn), encoding='utf-8') as fh:
+                        json.load(fh)
+                except ValueError as e:
+                    problems.append(f'{fn}: corrupted JSON ({e})')
+    return problems
+
+
+def summarize(workers, elapsed):
+    by_label = {}
+    for w in workers:
+        for label, values in w.latencies.items():
+            by_label.setdefault(label, []).extend(values)
+    everything = sorted(v for values in by_label.values() for v in values)
+
+    def stats(values):
+        values = sorted(values)
+        return {'requests': len(values), 'p50_ms': round(percentile(values, 50) * 1000, 2),
+                'p95_ms': round(percentile(values, 95) * 1000, 2), 'p99_ms': round(percentile(values, 99) * 1000, 2)}
+
+    errors = {}
+    for w in workers:
+        for key, n in w.errors.items():
+            errors[key] = errors.get(key, 0) + n
+    total = len(everything)
+    return {
+        'requests': total,
+        'seconds': round(elapsed, 3),
+        'throughput_rps': round(total / elapsed, 1) if elapsed else 0.0,
+        'overall': stats(everything),
+        'operations': {label: stats(values) for label, values in sorted(by_label.items())},
+        'errors': errors,
+        'error_rate': round(sum(errors.values()) / total, 4) if total else 0.0,
+    }
+
+
+def run(clients, requests, mix=None, seed=generate.SEED):
+    """Drive `requests` requests split over one worker per client; return (workers, elapsed)."""
+    mix = mix or DEFAULT_MIX
+    workers = [Worker(i, c, mix, seed) for i, c in enumerate(clients)]
+    remaining = [requests]
+    lock = threading.Lock()
+
+    def loop(worker):
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            worker.step()
+
+    threads = [threading.Thread(target=loop, args=(w,)) for w in workers]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return workers, time.perf_counter() - start
+
+
+@contextlib.contextmanager
+def in_process_app(seed_terms, seed):
+    """The Flask app on a temporary data directory holding `seed_terms` synthetic terms."""
+    from benchmark.run import server_data
+    with tempfile.TemporaryDirectory(prefix='glossary-load-') as data_dir:
+        generate.write_user_glossary(os.path.join(data_dir, 'glossary_user.json'), seed_terms, seed)
+        with server_data(data_dir):
+            import server
+            yield server.app, data_dir
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Concurrent load test of the glossary server.')
+    parser.add_argument('--url', help='test a running server instead of the app in-process')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=2000, help='total requests')
+    parser.add_argument('--seed-terms', type=int, default=1000, help='synthetic terms to start from (in-process)')
+    parser.add_argument('--seed', type=int, default=generate.SEED)
+    parser.add_argument('--mix', help='weights, e.g. list=35,search=15,create=20,update=20,delete=10')
+    parser.add_argument('--max-p95-ms', type=float, help='fail when the overall p95 latency is above this')
+    parser.add_argument('--max-p99-ms', type=float, help='fail when the overall p99 latency is above this')
+    parser.add_argument('--max-error-rate', type=float, default=0.0, help='fail above this fraction of failed requests')
+    parser.add_argument('--out', help='write the JSON report here')
+    args = parser.parse_args(argv)
+
+    mix = dict(DEFAULT_MIX)
+    if args.mix:
+        for part in args.mix.split(','):
+            op, _, weight = part.partition('=')
+            if op not in OPERATIONS:
+                parser.error(f'unknown operation in --mix: {op}')
+            mix[op] = float(weight)
+
+    with contextlib.ExitStack() as stack:
+        if args.url:
+            clients = [HttpClient(args.url) for _ in range(args.threads)]
+            checker, data_dir = HttpClient(args.url), None
+        else:
+            app, data_dir = stack.enter_context(in_process_app(args.seed_terms, args.seed))
+            clients = [InProcessClient(app) for _ in range(args.threads)]
+            checker = InProcessClient(app)
+        workers, elapsed = run(clients, args.requests, mix, args.seed)
+        report = summarize(workers, elapsed)
+        report['integrity_problems'] = check_integrity(checker, workers, data_dir)
+
+    failures = list(report['integrity_problems'])
+    if args.max_p95_ms is not None and report['overall']['p95_ms'] > args.max_p95_ms:
+        failures.append(f"p95 {report['overall']['p95_ms']} ms > {args.max_p95_ms} ms")
+    if args.max_p99_ms is not None and report['overall']['p99_ms'] > args.max_p99_ms:
+        failures.append(f"p99 {report['overall']['p99_ms']} ms > {args.max_p99_ms} ms")
+    if report['error_rate'] > args.max_error_rate:
+        failures.append(f"error rate {report['error_rate']} > {args.max_error_rate}")
+    report['passed'] = not failures
+
+    for label, st in report['operations'].items():
+        print(f"{label:<20} {st['requests']:>6}  p50 {st['p50_ms']:>8.2f}  p95 {st['p95_ms']:>8.2f}  p99 {st['p99_ms']:>8.2f} ms")
+    o = report['overall']
+    print(f"{report['requests']} requests in {report['seconds']}s ({report['throughput_rps']} req/s), "
+          f"p50 {o['p50_ms']} / p95 {o['p95_ms']} / p99 {o['p99_ms']} ms, error rate {report['error_rate']}")
+    for key, n in sorted(report['errors'].items()):
+        print(f'  {n} x {key}')
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as fh:
+            json.dump(report, fh, indent=2)
+    for failure in failures[:50]:
+        print(f'FAIL {failure}')
+    print('PASS' if report['passed'] else 'FAIL')
+    return 0 if report['passed'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,227 @@
+"""Benchmark scenarios for the parser and the server, recorded as JSON.
+
+Every scenario runs on synthetic data from `benchmark.generate` for each
+requested size. The server is driven through the Flask test client with
+its data paths pointed at a temporary directory, the same way the tests do.
+
+  python -m benchmark.run --sizes 10000 100000
+  python -m benchmark.run --sizes 10000 --baseline benchmark/results/<commit>.json
+
+Times are in seconds; repeated scenarios report min/median/max.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmark import generate
+from tools import parse_glossary, search_index
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+RESULTS_DIR = REPO_ROOT / 'benchmark' / 'results'
+
+# A scenario whose median grows by more than this factor is a regression
+# (below NOISE_FLOOR seconds differences are ignored).
+REGRESSION_FACTOR = 1.25
+NOISE_FLOOR = 0.001
+
+# server.py module attributes -> name under the benchmark data directory
+SERVER_PATHS = {
+    'DATA_DIR': '',
+    'USER_FILE': 'glossary_user.json',
+    'BASE_FILE': 'glossary.json',
+    'IMAGES_DIR': 'images',
+    'IMAGES_FILE': 'images.json',
+    'EQUATIONS_FILE': 'equations.json',
+    'REFERENCES_FILE': 'references.json',
+    'METHODS_FILE': 'methods.json',
+    'BACKUPS_DIR': 'backups',
+    'TILES_DIR': 'tiles',
+    'PROFILES_DIR': 'profiles',
+    'SLOW_LOG_FILE': 'slow_requests.jsonl',
+    'ACCESS_LOG_FILE': 'logs/requests.jsonl',
+}
+
+QUERIES = ('space segment', 'thermal test', 'qualification review', 'telemetry')
+
+
+def _stats(times):
+    return {
+        'runs': len(times),
+        'min': round(min(times), 6),
+        'median': round(statistics.median(times), 6),
+        'max': round(max(times), 6),
+    }
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def _quiet(fn, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def bench_parser(workdir, size, seed):
+    csv_path = generate.write_ecss_csv(os.path.join(workdir, 'ecss_glossaire.txt'), size, seed)
+    out = os.path.join(workdir, 'glossary.json')
+    results = {}
+    results['parse_full'] = _stats([_timed(_quiet, parse_glossary.main, csv_path, out, full=True)[0]])
+    results['parse_unchanged'] = _stats([_timed(_quiet, parse_glossary.main, csv_path, out)[0]])
+    with open(csv_path, 'a', encoding='utf-8') as fh:
+        fh.write('Terme,9.9.9,benchmark term,added after the first parse\n')
+    results['parse_one_added'] = _stats([_timed(_quiet, parse_glossary.main, csv_path, out)[0]])
+    results['search_artefacts'] = _stats([_timed(search_index.write_artefacts, out)[0]])
+    return results
+
+
+@contextlib.contextmanager
+def server_data(data_dir):
+    """Point server.py at `data_dir` for the duration of the block."""
+    import server
+    saved = {name: getattr(server, name) for name in SERVER_PATHS}
+    saved_logs = server.access_log.path, server.slow_log.path
+    for name, rel in SERVER_PATHS.items():
+        setattr(server, name, Path(data_dir) / rel if rel else Path(data_dir))
+    server.create_app({'TESTING': True})
+    try:
+        with server.app.test_client() as client:
+            yield client
+    finally:
+        server.access_log.flush()
+        for name, value in saved.items():
+            setattr(server, name, value)
+        server.access_log.path, server.slow_log.path = saved_logs
+
+
+def bench_server(workdir, size, seed, repeat, ops):
+    data_dir = os.path.join(workdir, 'data')
+    os.makedirs(data_dir, exist_ok=True)
+    generate.write_user_glossary(os.path.join(data_dir, 'glossary_user.json'), size, seed)
+    results = {}
+    with server_data(data_dir) as client:
+        def get(url):
+            resp = client.get(url)
+            assert resp.status_code == 200, (url, resp.status_code)
+            return resp
+
+        results['list_cold'] = _stats([_timed(get, '/api/terms')[0]])
+        results['list_warm'] = _stats([_timed(get, '/api/terms')[0] for _ in range(repeat)])
+
+        created = []
+        times = []
+        for i in range(ops):
+            t, resp = _timed(client.post, '/api/terms', json={
+                'term': f'benchmark term {i}', 'definition': 'created by the benchmark', 'tags': 'Benchmark'})
+            times.append(t)
+            created.append(resp.get_json()['id'])
+        results['create'] = _stats(times)
+        results['update'] = _stats([_timed(client.put, f'/api/terms/{term_id}', json={'definition': 'updated'})[0]
+                                    for term_id in created])
+        results['delete'] = _stats([_timed(client.delete, f'/api/terms/{term_id}')[0] for term_id in created])
+
+        results['search_index_cold'] = _stats([_timed(get, '/api/terms/index')[0]])
+        results['search_index_warm'] = _stats([_timed(get, '/api/terms/index')[0] for _ in range(repeat)])
+
+    user_file = os.path.join(data_dir, 'glossary_user.json')
+    with open(search_index.artefact_paths(user_file)['inverted'], encoding='utf-8') as fh:
+        inverted = json.load(fh)
+
+    def query(q):
+        ids = None
+        for token in search_index.tokenize(q):
+            found = set(search_index.postings(inverted, token))
+            ids = found if ids is None else ids & found
+        return ids or set()
+
+    results['search_query'] = _stats([_timed(query, q)[0] for _ in range(repeat) for q in QUERIES])
+    return results
+
+
+def _commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, seed=generate.SEED, repeat=5, ops=5, log=print):
+    report = {
+        'commit': _commit(),
+        'created_at': datetime.utcnow().isoformat() + 'Z',
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'sizes': {},
+    }
+    for size in sizes:
+        with tempfile.TemporaryDirectory(prefix='glossary-bench-') as workdir:
+            log(f'{size} entries: parser...')
+            results = bench_parser(workdir, size, seed)
+            log(f'{size} entries: server...')
+            results.update(bench_server(workdir, size, seed, repeat, ops))
+        report['sizes'][str(size)] = results
+    return report
+
+
+def compare(report, baseline, factor=REGRESSION_FACTOR):
+    """Return [(size, scenario, old median, new median)] for regressions."""
+    regressions = []
+    for size, scenarios in report['sizes'].items():
+        for name, new in scenarios.items():
+            old = baseline.get('sizes', {}).get(size, {}).get(name)
+            if not old:
+                continue
+            if new['median'] > NOISE_FLOOR and new['median'] > old['median'] * factor:
+                regressions.append((size, name, old['median'], new['median']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the glossary parser and server.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--seed', type=int, default=generate.SEED)
+    parser.add_argument('--repeat', type=int, default=5, help='runs of the warm read scenarios')
+    parser.add_argument('--ops', type=int, default=5, help='create/update/delete requests per size')
+    parser.add_argument('--out', help='result file (default: benchmark/results/<commit>.json)')
+    parser.add_argument('--baseline', help='earlier result file to compare against')
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, args.seed, args.repeat, args.ops)
+    out = Path(args.out) if args.out else RESULTS_DIR / f"{report['commit'] or 'worktree'}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2), encoding='utf-8')
+    for size, scenarios in report['sizes'].items():
+        for name, st in scenarios.items():
+            print(f"{size:>9} {name:<20} median {st['median']:.4f}s ({st['runs']} runs)")
+    print(f'Wrote {out}')
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+        regressions = compare(report, baseline)
+        for size, name, old, new in regressions:
+            print(f'REGRESSION {size} {name}: {old:.4f}s -> {new:.4f}s')
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,30 +1,117 @@
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, g, jsonify, request, send_from_directory
 from pathlib import Path
+import contextlib
+import functools
+import hashlib
 import json
+import mimetypes
+import os
 import uuid
 import tempfile
 import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
-app = Flask(__name__, static_folder='web', static_url_path='/web')
+from tools import build_assets, clause_index, crossref, data_lock, image_store, memory, metrics, optimize_images, phash, png_codec, prerender, profiler, search_index, slowlog, tiles
+from tools.access_log import AccessLog
+
+# web/ is served by static_files() (pre-compressed variants when built)
+app = Flask(__name__, static_folder=None)
+WEB_DIR = Path(app.root_path) / 'web'
 
 DATA_DIR = Path('data')
 USER_FILE = DATA_DIR / 'glossary_user.json'
+BASE_FILE = DATA_DIR / 'glossary.json'
 IMAGES_DIR = DATA_DIR / 'images'
 IMAGES_FILE = DATA_DIR / 'images.json'
 EQUATIONS_FILE = DATA_DIR / 'equations.json'
 REFERENCES_FILE = DATA_DIR / 'references.json'
 METHODS_FILE = DATA_DIR / 'methods.json'
 BACKUPS_DIR = DATA_DIR / 'backups'
+TILES_DIR = DATA_DIR / 'tiles'
+PROFILES_DIR = DATA_DIR / 'profiles'
+SLOW_LOG_FILE = DATA_DIR / 'slow_requests.jsonl'
+ACCESS_LOG_FILE = DATA_DIR / 'logs' / 'requests.jsonl'
 MAX_BACKUPS = 10
-DATA_DIR.mkdir(exist_ok=True)
-IMAGES_DIR.mkdir(exist_ok=True)
-BACKUPS_DIR.mkdir(exist_ok=True)
+
+HTTP_REQUESTS = metrics.REGISTRY.counter('http_requests_total', 'HTTP requests served.', ('method', 'endpoint', 'status'))
+HTTP_LATENCY = metrics.REGISTRY.histogram('http_request_duration_seconds', 'Time spent handling a request.', ('method', 'endpoint'))
+HTTP_REQUEST_BYTES = metrics.REGISTRY.counter('http_request_bytes_total', 'Request body bytes received.', ('endpoint',))
+HTTP_RESPONSE_BYTES = metrics.REGISTRY.counter('http_response_bytes_total', 'Response body bytes sent (when the length is known).', ('endpoint',))
+HTTP_IN_FLIGHT = metrics.REGISTRY.gauge('http_requests_in_flight', 'Requests being handled.')
+STORAGE_LOADS = metrics.REGISTRY.counter('storage_loads_total', 'Calls to the load_* helpers.', ('collection',))
+CACHE_REQUESTS = metrics.REGISTRY.counter('cache_requests_total', 'Lookups of the in-memory indexes.', ('cache', 'result'))
+WRITE_BYTES = metrics.REGISTRY.counter('atomic_write_bytes_total', 'Bytes written by atomic_write.', ('file',))
+BACKUP_SECONDS = metrics.REGISTRY.histogram('backup_duration_seconds', 'Time spent in backup_file.', ('file',))
+ACCESS_LOG_DROPPED = metrics.REGISTRY.counter('access_log_dropped_total', 'Access log records dropped because the queue was full.')
+
+# Requests slower than SLOW_REQUEST_SECONDS are written to SLOW_LOG_FILE with
+# sampled stacks and the storage operations they performed (0 disables it).
+# create_app() binds both logs to the data directory and the configuration.
+app.config.setdefault('SLOW_REQUEST_SECONDS', float(os.environ.get('GLOSSARY_SLOW_REQUEST_SECONDS', '2.0')))
+slow_log = slowlog.SlowRequestLog(str(SLOW_LOG_FILE), app.config['SLOW_REQUEST_SECONDS'])
+
+# One JSON line per request in ACCESS_LOG_FILE, written by a background thread
+# (see tools/access_log.py); requests never wait for the disk.
+app.config.setdefault('ACCESS_LOG', os.environ.get('GLOSSARY_ACCESS_LOG', '1') != '0')
+access_log = AccessLog(str(ACCESS_LOG_FILE))
+
+
+def set_data_dir(path):
+    """Point every data path at `path` (used by the offline tools)."""
+    global DATA_DIR, USER_FILE, BASE_FILE, IMAGES_DIR, IMAGES_FILE, EQUATIONS_FILE, REFERENCES_FILE, METHODS_FILE, BACKUPS_DIR, TILES_DIR, PROFILES_DIR, SLOW_LOG_FILE, ACCESS_LOG_FILE
+    DATA_DIR = Path(path)
+    USER_FILE = DATA_DIR / 'glossary_user.json'
+    BASE_FILE = DATA_DIR / 'glossary.json'
+    IMAGES_DIR = DATA_DIR / 'images'
+    IMAGES_FILE = DATA_DIR / 'images.json'
+    EQUATIONS_FILE = DATA_DIR / 'equations.json'
+    REFERENCES_FILE = DATA_DIR / 'references.json'
+    METHODS_FILE = DATA_DIR / 'methods.json'
+    BACKUPS_DIR = DATA_DIR / 'backups'
+    TILES_DIR = DATA_DIR / 'tiles'
+    PROFILES_DIR = DATA_DIR / 'profiles'
+    SLOW_LOG_FILE = DATA_DIR / 'slow_requests.jsonl'
+    ACCESS_LOG_FILE = DATA_DIR / 'logs' / 'requests.jsonl'
+
+
+def ensure_data_dirs():
+    for d in (DATA_DIR, IMAGES_DIR, BACKUPS_DIR):
+        d.mkdir(parents=True, exist_ok=True)
+
+
+@contextlib.contextmanager
+def collection_lock(path):
+    """Hold the file lock of the collection stored at `path`.
+
+    The same lock is taken by `python -m tools.admin` and the other offline
+    tools, so bulk jobs and edits through the API never interleave their
+    read-modify-write cycles. Keep slow work (file processing) outside it.
+    """
+    start = time.perf_counter()
+    with data_lock.locked(path):
+        slow_log.note('lock', path.name, time.perf_counter() - start)
+        yield
+
+
+def locked(collection):
+    """Hold the file lock of a collection (name of its path global) for the whole request."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with collection_lock(globals()[collection]):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
 
 def backup_file(source_path):
     """Create a timestamped backup of the source file and keep only MAX_BACKUPS recent ones."""
     if not source_path.exists():
         return
+    start = time.perf_counter()
     try:
         timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
         backup_name = f"{source_path.stem}_{timestamp}{source_path.suffix}"
@@ -40,6 +127,8 @@ def backup_file(source_path):
                     pass
     except Exception as e:
         print(f"Warning: backup failed - {e}")
+    BACKUP_SECONDS.observe(time.perf_counter() - start, file=source_path.name)
+    slow_log.note('backup', source_path.name, time.perf_counter() - start)
 
 
 def atomic_write(path, content):
@@ -49,8 +138,12 @@ def atomic_write(path, content):
         with tempfile.NamedTemporaryFile(mode='w', dir=path.parent, encoding='utf-8', delete=False, suffix='.tmp') as tmp:
             tmp.write(content)
             tmp_path = tmp.name
+        size = Path(tmp_path).stat().st_size
+        WRITE_BYTES.inc(size, file=path.name)
+        slow_log.note('write', path.name, bytes=size)
         # Atomic rename
         Path(tmp_path).replace(path)
+        data_lock.bump_version(path)
     except Exception as e:
         # Clean up temp file if it exists
         if tmp_path and Path(tmp_path).exists():
@@ -61,7 +154,9 @@ def atomic_write(path, content):
         raise e
 
 
+@slow_log.traced('load', 'terms')
 def load_items():
+    STORAGE_LOADS.inc(collection='terms')
     if USER_FILE.exists():
         try:
             raw = json.loads(USER_FILE.read_text(encoding='utf-8') or '[]')
@@ -138,13 +233,28 @@ def load_items():
             return []
     return []
 
+@slow_log.traced('save', 'terms')
 def save_items(items):
     backup_file(USER_FILE)  # Backup before writing
     content = json.dumps(items, ensure_ascii=False, indent=2)
     atomic_write(USER_FILE, content)
 
 
+@slow_log.traced('load', 'base')
+def load_base_glossary():
+    """The ECSS glossary generated by tools/parse_glossary.py (legacy `type` schema)."""
+    STORAGE_LOADS.inc(collection='base')
+    if BASE_FILE.exists():
+        try:
+            return json.loads(BASE_FILE.read_text(encoding='utf-8') or '[]')
+        except Exception:
+            return []
+    return []
+
+
+@slow_log.traced('load', 'images')
 def load_images():
+    STORAGE_LOADS.inc(collection='images')
     if IMAGES_FILE.exists():
         try:
             return json.loads(IMAGES_FILE.read_text(encoding='utf-8') or '[]')
@@ -153,13 +263,23 @@ def load_images():
     return []
 
 
+@slow_log.traced('save', 'images')
 def save_images(images):
     backup_file(IMAGES_FILE)  # Backup before writing
     content = json.dumps(images, ensure_ascii=False, indent=2)
     atomic_write(IMAGES_FILE, content)
 
 
+def find_image(image_id):
+    for it in load_images():
+        if it.get('id') == image_id:
+            return it
+    return None
+
+
+@slow_log.traced('load', 'equations')
 def load_equations():
+    STORAGE_LOADS.inc(collection='equations')
     if EQUATIONS_FILE.exists():
         try:
             return json.loads(EQUATIONS_FILE.read_text(encoding='utf-8') or '[]')
@@ -168,13 +288,16 @@ def load_equations():
     return []
 
 
+@slow_log.traced('save', 'equations')
 def save_equations(equations):
     backup_file(EQUATIONS_FILE)  # Backup before writing
     content = json.dumps(equations, ensure_ascii=False, indent=2)
     atomic_write(EQUATIONS_FILE, content)
 
 
+@slow_log.traced('load', 'references')
 def load_references():
+    STORAGE_LOADS.inc(collection='references')
     if REFERENCES_FILE.exists():
         try:
             return json.loads(REFERENCES_FILE.read_text(encoding='utf-8') or '[]')
@@ -183,13 +306,16 @@ def load_references():
     return []
 
 
+@slow_log.traced('save', 'references')
 def save_references(references):
     backup_file(REFERENCES_FILE)  # Backup before writing
     content = json.dumps(references, ensure_ascii=False, indent=2)
     atomic_write(REFERENCES_FILE, content)
 
 
+@slow_log.traced('load', 'methods')
 def load_methods():
+    STORAGE_LOADS.inc(collection='methods')
     if METHODS_FILE.exists():
         try:
             return json.loads(METHODS_FILE.read_text(encoding='utf-8') or '[]')
@@ -198,21 +324,400 @@ def load_methods():
     return []
 
 
+@slow_log.traced('save', 'methods')
 def save_methods(methods):
     backup_file(METHODS_FILE)  # Backup before writing
     content = json.dumps(methods, ensure_ascii=False, indent=2)
     atomic_write(METHODS_FILE, content)
 
 
-@app.route('/')
-def index():
-    return send_from_directory('web', 'index.html')
+@app.before_request
+def _start_request_metrics():
+    g.request_started = time.perf_counter()
+    HTTP_IN_FLIGHT.inc()
+
+
+@app.after_request
+def _record_request_metrics(response):
+    if 'request_started' in g:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_LATENCY.observe(time.perf_counter() - g.request_started, method=request.method, endpoint=endpoint)
+        HTTP_REQUESTS.inc(method=request.method, endpoint=endpoint, status=str(response.status_code))
+        if request.content_length:
+            HTTP_REQUEST_BYTES.inc(request.content_length, endpoint=endpoint)
+        if response.content_length:
+            HTTP_RESPONSE_BYTES.inc(response.content_length, endpoint=endpoint)
+    return response
+
+
+@app.after_request
+def _log_access(response):
+    if app.config['ACCESS_LOG'] and 'request_started' in g:
+        queued = access_log.log({
+            'time': datetime.utcnow().isoformat() + 'Z',
+            'method': request.method,
+            'route': request.url_rule.rule if request.url_rule else None,
+            'path': request.path,
+            'query': request.query_string.decode('latin-1'),
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - g.request_started) * 1000, 3),
+            'request_bytes': request.content_length or 0,
+            'response_bytes': response.content_length,
+            'remote_addr': request.remote_addr,
+            'user_agent': request.user_agent.string,
+        })
+        if not queued:
+            ACCESS_LOG_DROPPED.inc()
+    return response
+
+
+@app.teardown_request
+def _end_request_metrics(exc):
+    # the app context (and `g`) can outlive the request, so count it once
+    if g.pop('request_started', None) is not None:
+        HTTP_IN_FLIGHT.dec()
+
+
+@app.before_request
+def _watch_slow_request():
+    if not slow_log.threshold:
+        return
+    slow_log.begin(method=request.method, route=request.url_rule.rule if request.url_rule else None,
+                   path=request.path, params=request.args.to_dict(flat=False),
+                   request_bytes=request.content_length)
+
+
+@app.after_request
+def _note_slow_request_status(response):
+    g.response_status = response.status_code
+    return response
+
+
+@app.teardown_request
+def _log_slow_request(exc):
+    status = g.pop('response_status', None)
+    if exc is not None:
+        slow_log.end(status=500, error=repr(exc))
+    else:
+        slow_log.end(status=status)
+
+
+# On-demand profiling: with PROFILING on, a request sent with an `X-Profile: 1`
+# header or `?profile=1` is run under cProfile and a stack sampler; the
+# files land in PROFILES_DIR and the response carries `X-Profile-Id`.
+app.config.setdefault('PROFILING', os.environ.get('GLOSSARY_PROFILING') == '1')
+app.config.setdefault('PROFILING_MIN_INTERVAL', 10.0)  # seconds between two profiles
+app.config.setdefault('PROFILING_KEEP', 50)  # profiles kept on disk
+_profile_limiter = profiler.RateLimiter(app.config['PROFILING_MIN_INTERVAL'])
+
+
+def _profile_requested():
+    flag = request.headers.get('X-Profile') or request.args.get('profile')
+    return flag not in (None, '', '0', 'false')
+
+
+@app.before_request
+def _start_profile():
+    if not app.config['PROFILING'] or not _profile_requested():
+        return
+    _profile_limiter.min_interval = app.config['PROFILING_MIN_INTERVAL']
+    if not _profile_limiter.acquire():
+        g.profile_skipped = True
+        return
+    g.profile = profiler.RequestProfile()
+    g.profile.start()
+
+
+@app.after_request
+def _finish_profile(response):
+    prof = g.pop('profile', None)
+    if prof is not None:
+        try:
+            prof.stop(str(PROFILES_DIR), keep=app.config['PROFILING_KEEP'])
+            response.headers['X-Profile-Id'] = prof.id
+        finally:
+            _profile_limiter.release()
+    elif g.pop('profile_skipped', False):
+        response.headers['X-Profile-Skipped'] = 'rate-limited'
+    return response
+
+
+@app.teardown_request
+def _abandon_profile(exc):
+    # the request failed before after_request ran
+    prof = g.pop('profile', None)
+    if prof is not None:
+        prof.profile.disable()
+        prof.sampler.stop()
+        _profile_limiter.release()
+
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Request, storage and cache metrics in the Prometheus text format."""
+    return metrics.REGISTRY.render(), 200, {'Content-Type': metrics.CONTENT_TYPE}
+
+
+# Memory accounting (GLOSSARY_MEMORY_DEBUG=1): sizes of the collections and
+# in-memory indexes, and tracemalloc snapshots to compare before/after a change.
+app.config.setdefault('MEMORY_DEBUG', os.environ.get('GLOSSARY_MEMORY_DEBUG') == '1')
+_tracer = memory.Tracer()
+
+
+@app.route('/api/admin/memory', methods=['GET'])
+def memory_report():
+    """Approximate footprint of each collection (as loaded by a request) and of each cache."""
+    if not app.config['MEMORY_DEBUG']:
+        return jsonify({'error': 'memory debugging is disabled (GLOSSARY_MEMORY_DEBUG=1)'}), 404
+    collections = {
+        'terms': load_items(),
+        'base': load_base_glossary(),
+        'images': load_images(),
+        'equations': load_equations(),
+        'references': load_references(),
+        'methods': load_methods(),
+    }
+    caches = {
+        'links': _links_cache['graph'],
+        'clauses': _clause_cache['index'],
+        'phash': _phash_cache['tree'],
+        'index_page': _page_cache['variants'],
+        'metrics': metrics.REGISTRY,
+    }
+    report = {
+        'collections': {name: memory.describe(items) for name, items in collections.items()},
+        # None: not built yet in this process
+        'caches': {name: memory.describe(obj) if obj is not None else None for name, obj in caches.items()},
+        'tracemalloc': _tracer.status(),
+    }
+    try:
+        import resource
+        # kilobytes on Linux, bytes on macOS
+        report['max_rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        pass
+    return jsonify(report)
+
+
+@app.route('/api/admin/memory/tracemalloc', methods=['GET'])
+def tracemalloc_report():
+    """Status; `?top=<snapshot>` allocation sites or `?diff=<old>,<new>` (`limit`, `group_by`)."""
+    if not app.config['MEMORY_DEBUG']:
+        return jsonify({'error': 'memory debugging is disabled (GLOSSARY_MEMORY_DEBUG=1)'}), 404
+    limit = request.args.get('limit', 20, type=int)
+    group_by = request.args.get('group_by', 'lineno')
+    if group_by not in ('lineno', 'filename', 'traceback'):
+        return jsonify({'error': 'group_by must be lineno, filename or traceback'}), 400
+    out = _tracer.status()
+    try:
+        if request.args.get('top'):
+            out['top'] = _tracer.top(request.args['top'], limit, group_by)
+        if request.args.get('diff'):
+            old, _, new = request.args['diff'].partition(',')
+            out['diff'] = _tracer.diff(old, new, limit, group_by)
+    except KeyError as e:
+        return jsonify({'error': f'unknown snapshot {e.args[0]!r}'}), 404
+    return jsonify(out)
+
+
+@app.route('/api/admin/memory/tracemalloc', methods=['POST'])
+def tracemalloc_control():
+    """JSON `{"action": "start", "frames": 1}`, `{"action": "snapshot", "name": "before"}` or `{"action": "stop"}`."""
+    if not app.config['MEMORY_DEBUG']:
+        return jsonify({'error': 'memory debugging is disabled (GLOSSARY_MEMORY_DEBUG=1)'}), 404
+    data = request.get_json(silent=True) or {}
+    action = data.get('action')
+    if action == 'start':
+        frames = data.get('frames', 1)
+        if not isinstance(frames, int) or not 1 <= frames <= 100:
+            return jsonify({'error': 'frames must be an integer between 1 and 100'}), 400
+        _tracer.start(frames)
+    elif action == 'stop':
+        _tracer.stop()
+    elif action == 'snapshot':
+        name = data.get('name')
+        if not isinstance(name, str) or not name.strip():
+            return jsonify({'error': 'missing snapshot name'}), 400
+        try:
+            _tracer.snapshot(name.strip())
+        except RuntimeError as e:
+            return jsonify({'error': str(e)}), 409
+    else:
+        return jsonify({'error': 'action must be start, stop or snapshot'}), 400
+    return jsonify(_tracer.status())
+
+
 
 
 @app.route('/api/terms', methods=['GET'])
 def list_terms():
-    items = load_items()
-    return jsonify(items)
+    """The user glossary; its ETag is the `source` recorded in the matching search index."""
+    body = search_index.compact_json(load_items())
+    resp = Response(body, mimetype='application/json')
+    resp.set_etag(hashlib.sha1(body).hexdigest())
+    return resp.make_conditional(request)
+
+
+@app.route('/api/terms/index', methods=['GET'])
+def terms_search_index():
+    """Precomputed Fuse index of the user glossary, in /api/terms order.
+
+    Built on first request after a change and kept next to the glossary
+    file, so page loads parse it instead of re-indexing every entry.
+    """
+    fuse_path = fuse_index_path()
+    if fuse_path is None:
+        return jsonify({'error': 'no glossary'}), 404
+    return send_from_directory(str(fuse_path.parent.resolve()), fuse_path.name, mimetype='application/json', max_age=0)
+
+
+def fuse_index_path():
+    """Fuse index file of the user glossary, rewritten when stale; None without one."""
+    if not USER_FILE.exists():
+        return None
+    fresh = search_index.artefacts_fresh(str(USER_FILE))
+    CACHE_REQUESTS.inc(cache='search_index', result='hit' if fresh else 'miss')
+    if not fresh:
+        # stamped before loading: a write meanwhile makes the next request rebuild
+        stamp = search_index.source_stamp(str(USER_FILE))
+        search_index.write_artefacts(str(USER_FILE), load_items(), stamp)
+    return Path(search_index.artefact_paths(str(USER_FILE))['fuse'])
+
+
+_links_cache = {'version': None, 'graph': None}
+_links_lock = threading.RLock()
+
+
+def _terms_version():
+    try:
+        return str(USER_FILE), USER_FILE.stat().st_mtime_ns, data_lock.read_version(USER_FILE)
+    except FileNotFoundError:
+        return str(USER_FILE), None, None
+
+
+def link_graph():
+    """Cross-reference graph of the user glossary, rebuilt when the file changes."""
+    with _links_lock:
+        fresh = _links_cache['graph'] is not None and _links_cache['version'] == _terms_version()
+        CACHE_REQUESTS.inc(cache='links', result='hit' if fresh else 'miss')
+        if not fresh:
+            items = load_items()
+            _links_cache['graph'] = crossref.LinkGraph(it for it in items if it.get('id'))
+            _links_cache['version'] = _terms_version()
+        return _links_cache['graph']
+
+
+def relink_terms(version_before, updated=(), removed=()):
+    """Apply saved term changes to the cached graph instead of rebuilding it."""
+    with _links_lock:
+        if _links_cache['graph'] is None or _links_cache['version'] != version_before:
+            return
+        for item in updated:
+            _links_cache['graph'].update(item)
+        for term_id in removed:
+            _links_cache['graph'].remove(term_id)
+        _links_cache['version'] = _terms_version()
+
+
+@app.route('/api/terms/links', methods=['GET'])
+def terms_links():
+    """Every cross-reference: {id: {'out': [[target id, start, end]], 'in': [ids]}}.
+
+    `start`/`end` are character offsets of the mention in the definition.
+    """
+    with _links_lock:
+        return jsonify(link_graph().to_json())
+
+
+@app.route('/api/terms/<term_id>/links', methods=['GET'])
+def term_links(term_id):
+    with _links_lock:
+        graph = link_graph()
+        if term_id not in graph.items:
+            return jsonify({'error': 'not found'}), 404
+        return jsonify(graph.links(term_id))
+
+
+_clause_cache = {'version': None, 'index': None}
+_clause_lock = threading.Lock()
+
+
+def _base_version():
+    try:
+        return str(BASE_FILE), BASE_FILE.stat().st_mtime_ns, data_lock.read_version(BASE_FILE)
+    except FileNotFoundError:
+        return str(BASE_FILE), None, None
+
+
+def clause_index_of_base():
+    """Clause-number index of the base glossary, rebuilt when the file changes."""
+    version = _base_version()
+    with _clause_lock:
+        fresh = _clause_cache['index'] is not None and _clause_cache['version'] == version
+        CACHE_REQUESTS.inc(cache='clauses', result='hit' if fresh else 'miss')
+        if not fresh:
+            _clause_cache['index'] = clause_index.ClauseIndex(load_base_glossary())
+            _clause_cache['version'] = version
+        return _clause_cache['index']
+
+
+@app.route('/api/clauses', methods=['GET'])
+def browse_clauses():
+    """Base glossary entries in clause order.
+
+    `?prefix=2.3` lists clause 2.3 and its sub-clauses (paged with `offset`
+    and `limit`) together with the sub-clauses directly under it;
+    `?from=2.3.10&to=2.3.20` returns an inclusive range instead.
+    """
+    index = clause_index_of_base()
+    if 'from' in request.args or 'to' in request.args:
+        first = clause_index.clause_key(request.args['from']) if 'from' in request.args else ()
+        last = clause_index.clause_key(request.args['to']) if 'to' in request.args else ()
+        if first is None or last is None:
+            return jsonify({'error': 'from and to must be clause numbers like 2.3.10'}), 400
+        entries = index.between(first, last or None)
+        return jsonify({'from': clause_index.clause_str(first), 'to': clause_index.clause_str(last),
+                        'total': len(entries), 'entries': entries})
+    raw = request.args.get('prefix', '').strip()
+    prefix = clause_index.clause_key(raw) if raw else ()
+    if prefix is None:
+        return jsonify({'error': 'prefix must be a clause number like 2.3'}), 400
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = int(request.args['limit']) if 'limit' in request.args else None
+    except ValueError:
+        return jsonify({'error': 'offset and limit must be integers'}), 400
+    total, entries = index.prefix(prefix, offset, limit)
+    return jsonify({
+        'prefix': clause_index.clause_str(prefix),
+        'total': total,
+        'offset': offset,
+        'children': [{'clause': clause_index.clause_str(k), 'count': n} for k, n in index.children(prefix)],
+        'entries': entries,
+    })
+
+
+@app.route('/api/clauses/<clause>', methods=['GET'])
+def clause_entry(clause):
+    """One clause with its `n` (default 1) previous and next entries."""
+    key = clause_index.clause_key(clause)
+    if key is None:
+        return jsonify({'error': 'not a clause number'}), 400
+    try:
+        count = max(0, int(request.args.get('n', 1)))
+    except ValueError:
+        return jsonify({'error': 'n must be an integer'}), 400
+    index = clause_index_of_base()
+    i = index.find(key)
+    if i is None:
+        return jsonify({'error': 'not found'}), 404
+    previous, following = index.neighbours(key, count)
+    return jsonify({
+        'entry': index.entries[i],
+        'parent': clause_index.clause_str(key[:-1]),
+        'previous': previous,
+        'next': following,
+    })
 
 
 @app.route('/api/images', methods=['GET'])
@@ -221,15 +726,8 @@ def list_images():
     return jsonify(images)
 
 
-@app.route('/api/images', methods=['POST'])
-def upload_image():
-    # Expect multipart/form-data with 'file' and 'title' (optional)
-    if 'file' not in request.files:
-        return jsonify({'error': 'no file uploaded'}), 400
-    file = request.files['file']
-    title = request.form.get('title', '').strip() or file.filename
-    # Optional tags (comma-separated string or JSON list passed from form)
-    tags_input = request.form.get('tags', '')
+def parse_form_tags(tags_input):
+    """Parse tags sent in a form field (comma-separated string or JSON list)."""
     tags = []
     if isinstance(tags_input, str):
         # If provided as JSON list string, try to parse; else split by commas
@@ -243,32 +741,260 @@ def upload_image():
             tags = [t.strip() for t in tags_input.split(',') if t.strip()]
     elif isinstance(tags_input, list):
         tags = [str(t).strip() for t in tags_input if str(t).strip()]
+    return tags
+
+
+def store_image_file(file, title, tags):
+    """Save an uploaded file to the image store and build its metadata.
+
+    Returns (meta, None) on success or (None, (error_body, status)) on failure.
+    The caller is responsible for appending `meta` to images.json.
+    """
     if file.filename == '':
-        return jsonify({'error': 'no file selected'}), 400
+        return None, ({'error': 'no file selected'}, 400)
     # allow common image types and pdf
     allowed = {'.png', '.jpg', '.jpeg', '.gif', '.svg', '.pdf'}
     suffix = Path(file.filename).suffix.lower()
     if suffix not in allowed:
-        return jsonify({'error': f'file type not allowed: {suffix}'}), 400
-    # create unique filename
-    new_name = f"{uuid.uuid4().hex}{suffix}"
+        return None, ({'error': f'file type not allowed: {suffix}'}, 400)
+    # create unique filename, stored under its hash-prefix shard
+    new_name = image_store.shard_path(f"{uuid.uuid4().hex}{suffix}")
     dest = IMAGES_DIR / new_name
     try:
+        dest.parent.mkdir(parents=True, exist_ok=True)
         file.save(str(dest))
     except Exception as e:
-        return jsonify({'error': 'could not save file', 'detail': str(e)}), 500
-    images = load_images()
+        return None, ({'error': 'could not save file', 'detail': str(e)}, 500)
+    header = None
+    if suffix == '.png':
+        # refuse decompression bombs before anything inflates the image data
+        try:
+            with open(dest, 'rb') as fh:
+                header = png_codec.read_header(fh.read(64))
+            png_codec.stream_size(header)
+        except png_codec.PNGError as e:
+            dest.unlink()
+            return None, ({'error': 'invalid PNG', 'detail': str(e)}, 400)
     meta = {
         'id': str(uuid.uuid4()),
-        'title': title,
+        'title': title or file.filename,
         'filename': new_name,
         'original': file.filename,
-        'uploaded_at': __import__('datetime').datetime.utcnow().isoformat() + 'Z',
-        'tags': tags
+        'uploaded_at': datetime.utcnow().isoformat() + 'Z',
+        'tags': tags,
+        'size': dest.stat().st_size
     }
-    images.append(meta)
-    save_images(images)
-    return jsonify(meta), 201
+    # larger images are hashed after the response (hash_later)
+    if header and header.width * header.height <= app.config['PHASH_SYNC_PIXELS']:
+        try:
+            meta['phash'] = phash.dhash_file(str(dest))
+        except Exception as e:
+            print(f"Warning: perceptual hash failed - {e}")
+    return meta, None
+
+
+_phash_cache = {'version': None, 'tree': None}
+_phash_lock = threading.Lock()
+
+# dHash decodes every pixel in Python (over a second per megapixel for a
+# filtered PNG), and a bulk upload pays it once per file. Only small images
+# (up to 256x256, a few tens of ms) are hashed inline; larger ones go to a
+# background thread and their near duplicates are found later through
+# /api/images/<id>/similar. PNG recompression (optimize_later) runs on the
+# same thread.
+app.config.setdefault('PHASH_SYNC_PIXELS', 64 * 1024)
+_phash_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='glossary-phash')
+
+
+def _images_version():
+    try:
+        return str(IMAGES_FILE), IMAGES_FILE.stat().st_mtime_ns, data_lock.read_version(IMAGES_FILE)
+    except FileNotFoundError:
+        return str(IMAGES_FILE), None, None
+
+
+def phash_index():
+    """BK-tree over the perceptual hashes in images.json, rebuilt when the file changes."""
+    version = _images_version()
+    with _phash_lock:
+        fresh = _phash_cache['tree'] is not None and _phash_cache['version'] == version
+        CACHE_REQUESTS.inc(cache='phash', result='hit' if fresh else 'miss')
+        if not fresh:
+            _phash_cache['tree'] = phash.build_index(load_images())
+            _phash_cache['version'] = version
+        return _phash_cache['tree']
+
+
+def index_phashes(metas, version_before):
+    """Add freshly saved images to the cached index instead of rebuilding it."""
+    with _phash_lock:
+        if _phash_cache['tree'] is None or _phash_cache['version'] != version_before:
+            return
+        for meta in metas:
+            if meta.get('phash'):
+                _phash_cache['tree'].add(meta['phash'], phash.index_entry(meta))
+        _phash_cache['version'] = _images_version()
+
+
+def optimize_later(metas):
+    """Queue lossless recompression of the PNGs of `metas` (no re-filtering;
+    tools/optimize_images.py does the full pass offline)."""
+    for meta in metas:
+        if meta['filename'].lower().endswith('.png'):
+            _phash_pool.submit(_store_optimized, meta['id'], IMAGES_DIR / meta['filename'])
+
+
+def _store_optimized(image_id, path):
+    try:
+        old, new = optimize_images.optimize_file(path, refilter=False)
+    except Exception as e:
+        print(f"Warning: PNG optimization failed - {e}")
+        return
+    if new == old:
+        return
+    with collection_lock(IMAGES_FILE):
+        images = load_images()
+        meta = next((it for it in images if it.get('id') == image_id), None)
+        if meta is None:
+            return
+        meta['size'] = new
+        version_before = _images_version()
+        save_images(images)
+        index_phashes([], version_before)
+
+
+def hash_later(metas):
+    """Queue the PNGs of `metas` that were stored without a perceptual hash; return their ids."""
+    pending = [m for m in metas if not m.get('phash') and m['filename'].lower().endswith('.png')]
+    for meta in pending:
+        _phash_pool.submit(_store_phash, meta['id'], IMAGES_DIR / meta['filename'])
+    return {m['id'] for m in pending}
+
+
+def _store_phash(image_id, path):
+    try:
+        h = phash.dhash_file(str(path))
+    except Exception as e:
+        print(f"Warning: perceptual hash failed - {e}")
+        return
+    with collection_lock(IMAGES_FILE):
+        images = load_images()
+        meta = next((it for it in images if it.get('id') == image_id), None)
+        if meta is None or meta.get('phash'):
+            return  # deleted meanwhile, or hashed by `tools.admin reindex`
+        meta['phash'] = h
+        version_before = _images_version()
+        save_images(images)
+        index_phashes([meta], version_before)
+
+
+def near_duplicates(h, exclude_id=None, max_distance=phash.NEAR_DUPLICATE_DISTANCE):
+    found = []
+    for distance, entry in phash_index().search(h, max_distance):
+        if entry['id'] != exclude_id:
+            found.append(dict(entry, distance=distance))
+    return found
+
+
+@app.route('/api/images', methods=['POST'])
+def upload_image():
+    # Expect multipart/form-data with 'file' and 'title' (optional)
+    if 'file' not in request.files:
+        return jsonify({'error': 'no file uploaded'}), 400
+    file = request.files['file']
+    title = request.form.get('title', '').strip() or file.filename
+    # Optional tags (comma-separated string or JSON list passed from form)
+    tags = parse_form_tags(request.form.get('tags', ''))
+    meta, error = store_image_file(file, title, tags)
+    if error:
+        body, status = error
+        return jsonify(body), status
+    dups = near_duplicates(meta['phash']) if meta.get('phash') else []
+    # the file is stored and processed: lock only to append its metadata
+    with collection_lock(IMAGES_FILE):
+        images = load_images()
+        version_before = _images_version()
+        images.append(meta)
+        save_images(images)
+        index_phashes([meta], version_before)
+    optimize_later([meta])
+    pending = hash_later([meta])
+    tile_later([meta])
+    return jsonify(dict(meta, near_duplicates=dups, phash_pending=bool(pending))), 201
+
+
+@app.route('/api/images/bulk', methods=['POST'])
+def upload_images_bulk():
+    """Upload many files in one multipart request.
+
+    Form fields: repeated 'files', with optional 'titles' and 'tags' repeated
+    in the same order (a single 'tags' value applies to every file). Each file
+    is streamed to storage on its own; images.json is written once at the end.
+    """
+    files = request.files.getlist('files')
+    if not files:
+        return jsonify({'error': 'no file uploaded'}), 400
+    titles = request.form.getlist('titles')
+    tags_list = request.form.getlist('tags')
+    results = []
+    stored = []
+    for i, file in enumerate(files):
+        title = titles[i].strip() if i < len(titles) else ''
+        if len(tags_list) == 1:
+            tags = parse_form_tags(tags_list[0])
+        else:
+            tags = parse_form_tags(tags_list[i]) if i < len(tags_list) else []
+        meta, error = store_image_file(file, title, tags)
+        if error:
+            body, status = error
+            results.append({'index': i, 'original': file.filename, 'ok': False, 'status': status, **body})
+            continue
+        dups = []
+        if meta.get('phash'):
+            dups = near_duplicates(meta['phash'])
+            # also compare with earlier files of the same batch
+            for other in stored:
+                if other.get('phash'):
+                    d = phash.hamming(meta['phash'], other['phash'])
+                    if d <= phash.NEAR_DUPLICATE_DISTANCE:
+                        dups.append(dict(phash.index_entry(other), distance=d))
+        stored.append(meta)
+        results.append({'index': i, 'original': file.filename, 'ok': True, 'image': meta, 'near_duplicates': dups})
+    if stored:
+        with collection_lock(IMAGES_FILE):
+            images = load_images()
+            version_before = _images_version()
+            images.extend(stored)
+            save_images(images)
+            index_phashes(stored, version_before)
+        optimize_later(stored)
+        pending = hash_later(stored)
+        tile_later(stored)
+        for result in results:
+            if result['ok']:
+                result['phash_pending'] = result['image']['id'] in pending
+    return jsonify({'uploaded': len(stored), 'failed': len(files) - len(stored), 'results': results}), (201 if stored else 400)
+
+
+@app.route('/api/images/<image_id>/similar', methods=['GET'])
+def similar_images(image_id):
+    meta = find_image(image_id)
+    if not meta:
+        return jsonify({'error': 'not found'}), 404
+    h = meta.get('phash')
+    if not h:
+        fn = meta.get('filename') or ''
+        if not fn.lower().endswith('.png'):
+            return jsonify({'error': 'similarity is only available for PNG images'}), 415
+        try:
+            h = phash.dhash_file(str(IMAGES_DIR / fn))
+        except Exception as e:
+            return jsonify({'error': 'could not hash image', 'detail': str(e)}), 500
+    try:
+        max_distance = int(request.args.get('max_distance', phash.NEAR_DUPLICATE_DISTANCE))
+    except ValueError:
+        return jsonify({'error': 'max_distance must be an integer'}), 400
+    return jsonify(near_duplicates(h, exclude_id=image_id, max_distance=max_distance))
 
 
 @app.route('/images/<path:fn>')
@@ -277,17 +1003,88 @@ def serve_image(fn):
     return send_from_directory(str(IMAGES_DIR), fn)
 
 
+def ensure_tiles(meta):
+    """Return the tile pyramid info for an image, generating it on first use.
+
+    Uploaded PNGs are tiled in the background (tile_later), so this usually
+    finds the pyramid ready. One build per image runs at a time, across
+    threads and worker processes, under the flock of `data/tiles/<id>`.
+    Returns None when the image cannot be tiled (not a PNG, missing file).
+    """
+    fn = meta.get('filename') or ''
+    if not fn.lower().endswith('.png'):
+        return None
+    out_dir = TILES_DIR / meta['id']
+    info = tiles.load_info(str(out_dir))
+    if info:
+        return info
+    src = IMAGES_DIR / fn
+    if not src.exists():
+        return None
+    TILES_DIR.mkdir(parents=True, exist_ok=True)
+    with data_lock.locked(out_dir):
+        info = tiles.load_info(str(out_dir))
+        if info:
+            return info
+        # build into a scratch directory, then move into place
+        tmp_dir = TILES_DIR / f"{meta['id']}.{uuid.uuid4().hex}.tmp"
+        try:
+            info = tiles.build_pyramid(str(src), str(tmp_dir))
+            # leftovers of a build that died before writing info.json
+            shutil.rmtree(str(out_dir), ignore_errors=True)
+            try:
+                tmp_dir.replace(out_dir)
+            except OSError:
+                # another builder (without the lock, e.g. no fcntl) got there first
+                info = tiles.load_info(str(out_dir))
+                if not info:
+                    raise
+        except Exception as e:
+            print(f"Warning: tile generation failed - {e}")
+            return None
+        finally:
+            shutil.rmtree(str(tmp_dir), ignore_errors=True)
+    return info
+
+
+def tile_later(metas):
+    """Queue the tile pyramids of the PNGs of `metas`."""
+    for meta in metas:
+        if meta['filename'].lower().endswith('.png'):
+            _phash_pool.submit(ensure_tiles, meta)
+
+
+@app.route('/api/images/<image_id>/tiles', methods=['GET'])
+def image_tiles_info(image_id):
+    meta = find_image(image_id)
+    if not meta:
+        return jsonify({'error': 'not found'}), 404
+    info = ensure_tiles(meta)
+    if not info:
+        return jsonify({'error': 'tiles are only available for PNG images'}), 415
+    return jsonify(dict(info, url=f'/images/{image_id}/tiles/{{z}}/{{x}}/{{y}}'))
+
+
+@app.route('/images/<image_id>/tiles/<int:z>/<int:x>/<int:y>')
+def serve_image_tile(image_id, z, x, y):
+    tile = Path(image_id) / str(z) / f'{x}_{y}.png'
+    if not (TILES_DIR / tile).exists():
+        meta = find_image(image_id)
+        if not meta or not ensure_tiles(meta):
+            return jsonify({'error': 'not found'}), 404
+    return send_from_directory(str(TILES_DIR), tile.as_posix(), max_age=7 * 24 * 3600)
+
+
 @app.route('/api/images/<image_id>', methods=['DELETE'])
 def delete_image(image_id):
-    images = load_images()
-    found = None
-    for it in images:
-        if it.get('id') == image_id:
-            found = it
-            break
-    if not found:
-        return jsonify({'error': 'not found'}), 404
-    # remove file if exists
+    with collection_lock(IMAGES_FILE):
+        images = load_images()
+        found = next((it for it in images if it.get('id') == image_id), None)
+        if not found:
+            return jsonify({'error': 'not found'}), 404
+        new = [it for it in images if it.get('id') != image_id]
+        save_images(new)
+    # the entry is gone: its file and tiles can be removed without the lock
     fn = found.get('filename')
     if fn:
         p = IMAGES_DIR / fn
@@ -296,13 +1093,17 @@ def delete_image(image_id):
                 p.unlink()
         except Exception:
             pass
-    # remove metadata
-    new = [it for it in images if it.get('id') != image_id]
-    save_images(new)
+    if TILES_DIR.exists():
+        # waits for a build in progress
+        with data_lock.locked(TILES_DIR / image_id):
+            shutil.rmtree(str(TILES_DIR / image_id), ignore_errors=True)
+        with contextlib.suppress(OSError):
+            os.unlink(data_lock.lock_path(TILES_DIR / image_id))
     return jsonify({'deleted': True})
 
 
 @app.route('/api/terms', methods=['POST'])
+@locked('USER_FILE')
 def create_term():
     data = request.get_json(silent=True) or {}
     # New schema requires 'term' and 'definition'; 'abbreviation' is optional
@@ -329,11 +1130,14 @@ def create_term():
         'updated_at': now
     }
     items.append(item)
+    version_before = _terms_version()
     save_items(items)
+    relink_terms(version_before, updated=[item])
     return jsonify(item), 201
 
 
 @app.route('/api/terms/<term_id>', methods=['PUT'])
+@locked('USER_FILE')
 def update_term(term_id):
     data = request.get_json(silent=True) or {}
     items = load_items()
@@ -358,18 +1162,23 @@ def update_term(term_id):
             if 'created_at' not in it:
                 it['created_at'] = it['updated_at']
             items[i] = it
+            version_before = _terms_version()
             save_items(items)
+            relink_terms(version_before, updated=[it])
             return jsonify(it)
     return jsonify({'error': 'not found'}), 404
 
 
 @app.route('/api/terms/<term_id>', methods=['DELETE'])
+@locked('USER_FILE')
 def delete_term(term_id):
     items = load_items()
     new = [it for it in items if it.get('id') != term_id]
     if len(new) == len(items):
         return jsonify({'error': 'not found'}), 404
+    version_before = _terms_version()
     save_items(new)
+    relink_terms(version_before, removed=[term_id])
     return jsonify({'deleted': True})
 
 
@@ -381,6 +1190,7 @@ def list_equations():
 
 
 @app.route('/api/equations', methods=['POST'])
+@locked('EQUATIONS_FILE')
 def create_equation():
     data = request.get_json(silent=True) or {}
     required = ['name', 'content']
@@ -411,6 +1221,7 @@ def create_equation():
 
 
 @app.route('/api/equations/<eq_id>', methods=['PUT'])
+@locked('EQUATIONS_FILE')
 def update_equation(eq_id):
     data = request.get_json(silent=True) or {}
     equations = load_equations()
@@ -438,6 +1249,7 @@ def update_equation(eq_id):
 
 
 @app.route('/api/equations/<eq_id>', methods=['DELETE'])
+@locked('EQUATIONS_FILE')
 def delete_equation(eq_id):
     equations = load_equations()
     new = [eq for eq in equations if eq.get('id') != eq_id]
@@ -455,6 +1267,7 @@ def list_references():
 
 
 @app.route('/api/references', methods=['POST'])
+@locked('REFERENCES_FILE')
 def create_reference():
     data = request.get_json(silent=True) or {}
     required = ['title', 'type', 'author']
@@ -495,6 +1308,7 @@ def create_reference():
 
 
 @app.route('/api/references/<ref_id>', methods=['PUT'])
+@locked('REFERENCES_FILE')
 def update_reference(ref_id):
     data = request.get_json(silent=True) or {}
     references = load_references()
@@ -529,6 +1343,7 @@ def update_reference(ref_id):
 
 
 @app.route('/api/references/<ref_id>', methods=['DELETE'])
+@locked('REFERENCES_FILE')
 def delete_reference(ref_id):
     references = load_references()
     new = [ref for ref in references if ref.get('id') != ref_id]
@@ -546,6 +1361,7 @@ def list_methods():
 
 
 @app.route('/api/methods', methods=['POST'])
+@locked('METHODS_FILE')
 def create_method():
     data = request.get_json(silent=True) or {}
     required = ['title', 'definition']
@@ -577,6 +1393,7 @@ def create_method():
 
 
 @app.route('/api/methods/<method_id>', methods=['PUT'])
+@locked('METHODS_FILE')
 def update_method(method_id):
     data = request.get_json(silent=True) or {}
     methods = load_methods()
@@ -608,6 +1425,7 @@ def update_method(method_id):
 
 
 @app.route('/api/methods/<method_id>', methods=['DELETE'])
+@locked('METHODS_FILE')
 def delete_method(method_id):
     methods = load_methods()
     new = [it for it in methods if it.get('id') != method_id]
@@ -617,10 +1435,173 @@ def delete_method(method_id):
     return jsonify({'deleted': True})
 
 
+_assets_cache = {'version': None, 'manifest': None, 'files': None, 'fresh': False}
+_assets_lock = threading.Lock()
+
+
+def asset_manifest():
+    """(manifest, {hashed file: source name}) of web/dist, None when not built."""
+    path = WEB_DIR / build_assets.DIST / build_assets.MANIFEST
+    try:
+        version = str(path), path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None, None
+    with _assets_lock:
+        if _assets_cache['version'] != version:
+            manifest = build_assets.load_manifest(str(WEB_DIR))
+            _assets_cache['manifest'] = manifest
+            _assets_cache['files'] = {e['file']: rel for rel, e in (manifest or {}).items() if e['fingerprinted']}
+            _assets_cache['fresh'] = manifest is not None and build_assets.is_fresh(manifest, str(WEB_DIR))
+            _assets_cache['version'] = version
+        return _assets_cache['manifest'], _assets_cache['files']
+
+
+def assets_fresh(manifest):
+    """Whether web/ still matches the build `manifest`.
+
+    Walking web/ costs a stat per file, so it is checked once per build (when
+    the manifest is loaded; `tools.serve` rebuilds on start) and on every
+    request only in debug mode, where the sources are being edited.
+    """
+    if app.debug:
+        return build_assets.is_fresh(manifest, str(WEB_DIR))
+    with _assets_lock:
+        return _assets_cache['fresh'] and _assets_cache['manifest'] is manifest
+
+
+def negotiate_encoding(accept_encoding, available):
+    """Best of `available` ('br', 'gzip') accepted by the client, None for identity."""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    best = None
+    for enc in ('br', 'gzip'):
+        q = accepted.get(enc, accepted.get('*', 0.0))
+        if enc in available and q > 0 and (best is None or q > best[1]):
+            best = (enc, q)
+    return best[0] if best else None
+
+
+def send_asset(name):
+    """Serve `name` (source or hashed name under web/), pre-compressed when built."""
+    manifest, files = asset_manifest()
+    entry = None
+    if manifest:
+        if name in files:
+            # content-addressed: valid as long as the file is there
+            entry, immutable = manifest[files[name]], True
+        elif name in manifest and assets_fresh(manifest):
+            entry, immutable = manifest[name], False
+    if entry is None:
+        # no build, or web/ changed since: the files as they are
+        return send_from_directory(str(WEB_DIR), name)
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'), entry['encodings'])
+    filename = entry['file'] + {'br': '.br', 'gzip': '.gz', None: ''}[encoding]
+    etag = entry['etag'] + (f'-{encoding}' if encoding else '')
+    mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    resp = send_from_directory(str(WEB_DIR / build_assets.DIST), filename, mimetype=mimetype, etag=etag)
+    if encoding:
+        resp.headers['Content-Encoding'] = encoding
+    resp.headers['Vary'] = 'Accept-Encoding'
+    resp.headers['Cache-Control'] = 'public, max-age=31536000, immutable' if immutable else 'no-cache'
+    return resp
+
+
 @app.route('/web/<path:p>')
 def static_files(p):
-    return send_from_directory('web', p)
+    return send_asset(p)
+
+
+_page_cache = {'version': None, 'etag': None, 'variants': None}
+_page_lock = threading.Lock()
+
+
+def _page_template():
+    """Path of the index.html to render: the built one (hashed asset names) when fresh."""
+    manifest, _ = asset_manifest()
+    entry = (manifest or {}).get('index.html')
+    if entry is not None and assets_fresh(manifest):
+        return WEB_DIR / build_assets.DIST / entry['file']
+    return WEB_DIR / 'index.html'
+
+
+def rendered_index():
+    """(etag, {encoding: body}) of index.html with the first page of the glossary.
+
+    Rendered (and compressed) once per version of the glossary and of the
+    page, then served from memory.
+    """
+    template = _page_template()
+    version = str(template), template.stat().st_mtime_ns, _terms_version()
+    with _page_lock:
+        fresh = _page_cache['version'] == version
+        CACHE_REQUESTS.inc(cache='index_page', result='hit' if fresh else 'miss')
+        if not fresh:
+            page = prerender.render_page(template.read_text(encoding='utf-8'), load_items())
+            body = page.encode('utf-8')
+            variants = {None: body}
+            for enc in build_assets.encodings():
+                packed = build_assets.compress(body, enc)
+                if len(packed) < len(body):
+                    variants[enc] = packed
+            _page_cache.update(version=version, etag=build_assets.content_hash(body), variants=variants)
+        return _page_cache['etag'], _page_cache['variants']
+
+
+@app.route('/')
+def index():
+    """The UI with the first page of results and the tag bar already rendered (tools/prerender.py)."""
+    try:
+        etag, variants = rendered_index()
+    except FileNotFoundError:
+        return send_asset('index.html')
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'), variants)
+    resp = Response(variants[encoding], mimetype='text/html')
+    resp.set_etag(etag + (f'-{encoding}' if encoding else ''))
+    if encoding:
+        resp.headers['Content-Encoding'] = encoding
+    resp.headers['Vary'] = 'Accept-Encoding'
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp.make_conditional(request)
+
+
+def create_app(config=None):
+    """Configure the application and create its data directories.
+
+    `config` updates `app.config` (PROFILING, ACCESS_LOG, SLOW_REQUEST_SECONDS,
+    MEMORY_DEBUG, ...); a `DATA_DIR` entry points every data path at that
+    directory. The storage helpers use module-level paths, so a process
+    serves one data directory at a time: the last `create_app` call decides
+    it, and the logs are bound to it here rather than on every request.
+    The paths stay module-level because the routes are registered on the
+    one module `app` at import, and the helpers also run without an app
+    context (the background image thread, `tools.admin`). Separate apps
+    per directory would need a blueprint, and the app passed to every
+    helper. Use one process per data directory instead.
+    Used by `python -m tools.serve` and e.g. `gunicorn 'server:create_app()'`.
+    """
+    config = dict(config or {})
+    data_dir = config.pop('DATA_DIR', None)
+    if data_dir is not None:
+        set_data_dir(data_dir)
+    app.config.update(config)
+    ensure_data_dirs()
+    slow_log.path = str(SLOW_LOG_FILE)
+    slow_log.threshold = app.config['SLOW_REQUEST_SECONDS']
+    access_log.path = str(ACCESS_LOG_FILE)
+    return app
 
 
 if __name__ == '__main__':
-    app.run(host='127.0.0.1', port=5000, debug=True)
+    # Development server; `python -m tools.serve` runs several worker processes.
+    create_app().run(host='127.0.0.1', port=5000, threaded=True, debug=os.environ.get('GLOSSARY_DEBUG') == '1', use_reloader=False)
@@ -0,0 +1,50 @@
+import json
+import pathlib
+import sys
+
+repo = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(repo))
+
+from tools import access_log
+
+
+def test_batches_rotation_and_summary(tmp_path):
+    path = tmp_path / 'logs' / 'requests.jsonl'
+    log = access_log.AccessLog(str(path), max_bytes=300, keep=2)
+    for i in range(20):
+        assert log.log({'time': f'2024-01-01T00:00:{i:02d}Z', 'method': 'GET', 'route': '/api/terms',
+                        'status': 500 if i == 0 else 200, 'duration_ms': float(i), 'response_bytes': 10})
+        log.flush()
+    log.close()
+    rotated = access_log.rotated_files(str(path))
+    assert len(rotated) == 2
+    assert all(pathlib.Path(p).stat().st_size >= 300 for p in rotated)
+    records = list(access_log.iter_records(rotated + [str(path)]))
+    assert records[-1]['duration_ms'] == 19.0
+    assert len(records) < 20  # the oldest rotated files were deleted
+
+    summary = access_log.summarize(access_log.iter_records([str(path)], since='2024-01-01T00:00:19'))
+    assert summary == {'GET /api/terms': {'requests': 1, 'errors': 0, 'request_bytes': 0, 'response_bytes': 10,
+                                          'p50_ms': 19.0, 'p95_ms': 19.0}}
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    log = access_log.AccessLog(str(tmp_path / 'requests.jsonl'), queue_size=1)
+    log._thread = object()  # no writer: the queue never drains
+    assert log.log({'n': 1})
+    assert not log.log({'n': 2})
+    assert log.dropped == 1
+    log._thread = None
+
+
+def test_worker_files(tmp_path):
+    path = tmp_path / 'requests.jsonl'
+    (tmp_path / 'requests.20240101_000000.jsonl').write_text('{}\n')
+    log = access_log.AccessLog(str(path))
+    log.for_worker(2)
+    log.log({'n': 1})
+    log.flush()
+    log.close()
+    assert (tmp_path / 'requests.w2.jsonl').read_text() == '{"n": 1}\n' and not path.exists()
+    # the workers' files are not rotated copies of the main one
+    assert access_log.rotated_files(str(path)) == [str(tmp_path / 'requests.20240101_000000.jsonl')]
@@ -0,0 +1,104 @@
+import json
+import pathlib
+import sys
+import threading
+
+import pytest
+
+repo = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(repo))
+
+import server
+from tools import admin, data_lock
+
+
+@pytest.fixture
+def data(tmp_path, monkeypatch):
+    # admin points the server module at the directory; restore it afterwards
+    for name in ('DATA_DIR', 'USER_FILE', 'BASE_FILE', 'IMAGES_DIR', 'IMAGES_FILE', 'EQUATIONS_FILE',
+                 'REFERENCES_FILE', 'METHODS_FILE', 'BACKUPS_DIR', 'TILES_DIR', 'PROFILES_DIR', 'SLOW_LOG_FILE',
+                 'ACCESS_LOG_FILE'):
+        monkeypatch.setattr(server, name, getattr(server, name))
+    d = tmp_path / 'data'
+    (d / 'backups').mkdir(parents=True)
+    terms = [
+        {'id': 't1', 'term': 'space segment', 'abbreviation': '', 'definition': 'part, in space', 'tags': ['A', 'B'],
+         'created_at': '2024-01-01T00:00:00Z', 'updated_at': '2024-01-01T00:00:00Z'},
+        {'type': 'Abréviation', 'id': '1', 'term': 'ECSS', 'definition': 'European Cooperation for Space Standardization'},
+    ]
+    (d / 'glossary_user.json').write_text(json.dumps(terms), encoding='utf-8')
+    return d
+
+
+def run(data, *argv):
+    return admin.main(['-q', '--data-dir', str(data)] + list(argv))
+
+
+def test_export_import_round_trip(data, tmp_path, capsys):
+    assert run(data, 'migrate') == 0
+    migrated = json.loads((data / 'glossary_user.json').read_text(encoding='utf-8'))
+    assert migrated[1]['abbreviation'] == 'ECSS' and 'type' not in migrated[1]
+    assert data_lock.read_version(data / 'glossary_user.json') is not None
+
+    out = tmp_path / 'terms.csv'
+    assert run(data, 'export', 'terms', '-o', str(out)) == 0
+    assert out.read_text(encoding='utf-8').splitlines()[1].startswith('t1,space segment,,"part, in space","A, B",')
+
+    (tmp_path / 'more.jsonl').write_text(
+        json.dumps({'id': 't1', 'term': 'space segment', 'definition': 'updated'}) + '\n'
+        + json.dumps({'term': 'waiver', 'definition': 'formal authorization', 'tags': 'X, Y'}) + '\n'
+        + json.dumps({'term': 'no definition'}) + '\n', encoding='utf-8')
+    assert run(data, 'import', 'terms', str(tmp_path / 'more.jsonl'), '--strict') == 1
+    items = json.loads((data / 'glossary_user.json').read_text(encoding='utf-8'))
+    assert [it['term'] for it in items] == ['space segment', 'European Cooperation for Space Standardization', 'waiver']
+    assert items[0]['definition'] == 'updated' and items[2]['tags'] == ['X', 'Y']
+    assert list((data / 'backups').iterdir())
+
+    assert run(data, 'import', 'terms', str(out), '--mode', 'replace') == 0
+    assert json.loads((data / 'glossary_user.json').read_text(encoding='utf-8')) == migrated
+    capsys.readouterr()
+
+
+def test_import_modes_and_duplicate_ids(data, tmp_path, capsys):
+    batch = tmp_path / 'batch.jsonl'
+    batch.write_text(
+        json.dumps({'id': 'n1', 'term': 'orbit', 'definition': 'path'}) + '\n'
+        + json.dumps({'id': 'n2', 'term': 'apogee', 'definition': 'farthest point'}) + '\n'
+        + json.dumps({'id': 'n1', 'term': 'orbit', 'definition': 'trajectory'}) + '\n', encoding='utf-8')
+    # upsert: the last record of an id wins, at the place of its first one
+    assert run(data, 'import', 'terms', str(batch)) == 0
+    items = json.loads((data / 'glossary_user.json').read_text(encoding='utf-8'))
+    assert [(it['id'], it['definition']) for it in items[2:]] == [('n1', 'trajectory'), ('n2', 'farthest point')]
+    assert not list(data.glob('*.tmp')) and not list(data.glob('tmp*'))
+
+    # append: ids already present (or repeated in the input) are rejected
+    assert run(data, 'import', 'terms', str(batch), '--mode', 'append', '--strict') == 1
+    assert json.loads((data / 'glossary_user.json').read_text(encoding='utf-8')) == items
+    assert 'record n1: duplicate id' in capsys.readouterr().err
+
+
+def test_verify_and_compact(data, capsys):
+    (data / 'images.json').write_text(json.dumps([{'id': 'i1', 'filename': 'ab/missing.png'}, {'id': 'i1', 'filename': ''}]), encoding='utf-8')
+    (data / 'images').mkdir()
+    (data / 'images' / 'orphan.png').write_bytes(b'x')
+    assert run(data, 'verify') == 1
+    out = capsys.readouterr().out
+    assert 'error: images: i1 file missing: ab/missing.png' in out
+    assert 'error: images: duplicate id i1' in out
+    assert 'warning: images: orphan file orphan.png' in out
+
+    for i, content in enumerate(['a', 'a', 'b', 'c', 'c']):
+        (data / 'backups' / f'glossary_user_2024010{i + 1}_000000.json').write_text(content)
+    assert run(data, 'compact-backups', '--keep', '2') == 0
+    assert sorted(p.name for p in (data / 'backups').iterdir()) == [
+        'glossary_user_20240103_000000.json', 'glossary_user_20240105_000000.json']
+
+
+def test_admin_waits_for_the_server_lock(data):
+    released = threading.Event()
+    with data_lock.locked(data / 'glossary_user.json'):
+        t = threading.Thread(target=lambda: (run(data, 'migrate'), released.set()))
+        t.start()
+        assert not released.wait(0.3)
+    t.join(5)
+    assert released.is_set()
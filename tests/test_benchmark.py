@@ -0,0 +1,45 @@
+import json
+import pathlib
+import sys
+
+repo = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(repo))
+
+from benchmark import generate, loadtest, run
+
+
+def test_generator_is_deterministic(tmp_path):
+    a = generate.write_user_glossary(str(tmp_path / 'a.json'), 40, seed=7)
+    b = generate.write_user_glossary(str(tmp_path / 'b.json'), 40, seed=7)
+    assert pathlib.Path(a).read_bytes() == pathlib.Path(b).read_bytes()
+    entries = json.loads(pathlib.Path(a).read_text(encoding='utf-8'))
+    assert len(entries) == 40
+    assert len({e['id'] for e in entries}) == 40
+    rows = list(generate.iter_ecss_rows(40, seed=7))
+    assert {r[0] for r in rows} == {'Terme', 'Abréviation'}
+
+
+def test_small_run_and_compare():
+    report = run.run([30], repeat=1, ops=1, log=lambda *a: None)
+    scenarios = report['sizes']['30']
+    assert {'parse_full', 'parse_unchanged', 'list_cold', 'list_warm', 'create', 'update', 'delete',
+            'search_index_cold', 'search_query'} <= set(scenarios)
+    assert all(s['min'] <= s['median'] <= s['max'] for s in scenarios.values())
+    slower = {'sizes': {'30': {'list_cold': dict(scenarios['list_cold'], median=1.0)}}}
+    assert run.compare(slower, report) == [('30', 'list_cold', scenarios['list_cold']['median'], 1.0)]
+    assert run.compare(report, report) == []
+
+
+def test_loadtest_keeps_every_acknowledged_write():
+    with loadtest.in_process_app(20, seed=3) as (app, data_dir):
+        clients = [loadtest.InProcessClient(app) for _ in range(4)]
+        workers, elapsed = loadtest.run(clients, 120, seed=3)
+        report = loadtest.summarize(workers, elapsed)
+        assert report['requests'] == 120
+        assert report['errors'] == {}
+        assert loadtest.check_integrity(loadtest.InProcessClient(app), workers, data_dir) == []
+        # a write the server never made is reported
+        workers[0].owned['methods']['missing-id'] = 'x'
+        problems = loadtest.check_integrity(loadtest.InProcessClient(app), workers, data_dir)
+    assert problems == ['methods: acknowledged create missing-id is missing (lost update)']
+    assert loadtest.percentile([1, 2, 3, 4], 50) == 2 and loadtest.percentile([1, 2, 3, 4], 99) == 4
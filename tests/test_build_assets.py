@@ -0,0 +1,30 @@
+import gzip
+import pathlib
+import sys
+
+repo = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(repo))
+
+from tools import build_assets
+
+
+def test_build_prune_and_freshness(tmp_path):
+    web = tmp_path / 'web'
+    (web / 'img').mkdir(parents=True)
+    (web / 'app.js').write_text('let x = 1;\n' * 100)
+    (web / 'img' / 'logo.png').write_bytes(b'\x89PNG' + bytes(50))
+    first = build_assets.build(str(web))
+    assert set(first) == {'app.js', 'img/logo.png'}
+    dist = web / build_assets.DIST
+    name = first['app.js']['file']
+    assert name.startswith('app.') and name.endswith('.js')
+    assert gzip.decompress((dist / (name + '.gz')).read_bytes()) == (web / 'app.js').read_bytes()
+    assert first['img/logo.png']['encodings'] == {}  # not a text format
+    assert build_assets.is_fresh(build_assets.load_manifest(str(web)), str(web))
+
+    (web / 'app.js').write_text('let x = 2;\n' * 100)
+    assert not build_assets.is_fresh(first, str(web))
+    second = build_assets.build(str(web))
+    assert second['app.js']['file'] != name
+    assert not (dist / name).exists() and not (dist / (name + '.gz')).exists()
+    assert build_assets.build(str(web)) == build_assets.load_manifest(str(web)) == second
@@ -0,0 +1,24 @@
+import pathlib
+import sys
+
+repo = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(repo))
+
+from tools.clause_index import ClauseIndex, clause_key
+
+
+def test_clause_order_and_lookups():
+    assert clause_key('2.3.57') == (2, 3, 57) and clause_key('2.3.') == (2, 3)
+    assert clause_key('A/D') is None and clause_key('') is None
+    ids = ['2.3.10', '2.3.9', '2.2.1', '3.1', '2.3.1', '2.3.1.2', '2.4']
+    index = ClauseIndex({'id': i} for i in ids)
+    assert [e['id'] for e in index.entries] == ['2.2.1', '2.3.1', '2.3.1.2', '2.3.9', '2.3.10', '2.4', '3.1']
+    total, entries = index.prefix((2, 3))
+    assert total == 4 and [e['id'] for e in entries] == ['2.3.1', '2.3.1.2', '2.3.9', '2.3.10']
+    assert index.prefix((2, 3, 1))[0] == 2
+    assert index.prefix((9,)) == (0, [])
+    assert [e['id'] for e in index.between((2, 3, 2), (2, 4))] == ['2.3.9', '2.3.10', '2.4']
+    before, after = index.neighbours((2, 3, 9), 2)
+    assert [e['id'] for e in before] == ['2.3.1', '2.3.1.2'] and [e['id'] for e in after] == ['2.3.10', '2.4']
+    assert index.children((2,)) == [((2, 2), 1), ((2, 3), 4), ((2, 4), 1)]
+    assert index.children((2, 3)) == [((2, 3, 1), 2), ((2, 3, 9), 1), ((2, 3, 10), 1)]
@@ -0,0 +1,52 @@
+import pathlib
+import sys
+
+repo = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(repo))
+
+from tools import crossref
+
+ITEMS = [
+    {'id': 'seg', 'term': 'space segment', 'abbreviation': '', 'definition': 'part of a space system placed in space'},
+    {'id': 'sys', 'term': 'space system', 'abbreviation': '', 'definition': 'system that contains at least a space segment and a ground segment'},
+    {'id': 'elt', 'term': 'space segment element', 'abbreviation': 'SSE', 'definition': 'element within a space segment'},
+    {'id': 'cmp', 'term': 'Component', 'abbreviation': '', 'definition': 'see "part"; several components form an élément'},
+    {'id': 'is', 'term': 'information system', 'abbreviation': 'IS', 'definition': 'is a system; IS are listed per SSE'},
+]
+
+
+def test_links_are_whole_words_longest_first():
+    graph = crossref.LinkGraph(ITEMS)
+    assert graph.outgoing['seg'] == [('sys', 10, 22)]
+    assert graph.outgoing['sys'] == [('seg', 32, 45)]
+    # the abbreviation matches case-sensitively, "is a system" links nothing
+    assert graph.outgoing['is'] == [('elt', 31, 34)]
+    assert graph.outgoing['cmp'] == []
+    text = 'a space segment element, two components and the IS'
+    assert graph.find_links(text) == [('elt', 2, 23), ('cmp', 29, 39), ('is', 48, 50)]
+    assert graph.links('seg') == {
+        'outgoing': [{'id': 'sys', 'term': 'space system', 'start': 10, 'end': 22}],
+        'incoming': [{'id': 'elt', 'term': 'space segment element'}, {'id': 'sys', 'term': 'space system'}],
+    }
+
+
+def test_incremental_updates_match_a_rebuild():
+    graph = crossref.LinkGraph(ITEMS)
+    items = {it['id']: dict(it) for it in ITEMS}
+
+    items['new'] = {'id': 'new', 'term': 'ground segment', 'abbreviation': 'GS', 'definition': 'the ground part of a space system'}
+    graph.add(items['new'])
+    assert ('new', 52, 66) in graph.outgoing['sys']
+
+    items['seg'] = dict(items['seg'], term='flight segment')
+    graph.update(items['seg'])
+    items['cmp'] = dict(items['cmp'], definition='part of a flight segments assembly')
+    graph.update(items['cmp'])
+    del items['elt']
+    graph.remove('elt')
+
+    fresh = crossref.LinkGraph(items.values())
+    assert graph.outgoing == fresh.outgoing
+    assert graph.incoming == fresh.incoming
+    assert graph.to_json() == fresh.to_json()
+    assert graph.outgoing['cmp'] == [('seg', 10, 25)]
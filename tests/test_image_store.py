@@ -0,0 +1,78 @@
+import json
+import os
+import pathlib
+import sys
+
+# ensure repo import works
+repo = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(repo))
+
+from tools import data_lock, image_store
+from tools.json_stream import iter_json_array
+
+
+def make_store(tmp_path, names):
+    images = tmp_path / 'images'
+    images.mkdir()
+    meta = []
+    for i, name in enumerate(names):
+        (images / name).write_bytes(b'x' * (i + 1))
+        meta.append({'id': str(i), 'title': f'image {i}', 'filename': name})
+    metadata = tmp_path / 'images.json'
+    metadata.write_text(json.dumps(meta, indent=2), encoding='utf-8')
+    return images, metadata
+
+
+def test_iter_json_array_small_chunks(tmp_path):
+    path = tmp_path / 'a.json'
+    values = [{'id': i, 'text': 'é' * i} for i in range(50)] + [3.25, 'end']
+    path.write_text(json.dumps(values, ensure_ascii=False, indent=2), encoding='utf-8')
+    assert list(iter_json_array(path, chunk_size=7)) == values
+    assert list(iter_json_array(tmp_path / 'missing.json')) == []
+
+
+def test_migrate_moves_files_into_shards(tmp_path):
+    images, metadata = make_store(tmp_path, ['a.png', 'b.png'])
+    assert image_store.migrate(str(images), str(metadata)) == 2
+    entries = json.loads(metadata.read_text(encoding='utf-8'))
+    for entry in entries:
+        shard, name = entry['filename'].split('/')
+        assert shard == image_store.shard_of(name)
+        assert (images / shard / name).exists()
+    assert not (images / 'a.png').exists()
+    # backed up and versioned like a server write
+    assert len(list((tmp_path / 'backups').glob('*.json'))) == 1
+    version = data_lock.read_version(metadata)
+    assert version is not None
+    # idempotent
+    assert image_store.migrate(str(images), str(metadata)) == 0
+    assert json.loads(metadata.read_text(encoding='utf-8')) == entries
+    assert data_lock.read_version(metadata) == version
+
+
+def test_scan_reports_and_collects_orphans(tmp_path):
+    images, metadata = make_store(tmp_path, ['a.png', 'b.png', 'c.png'])
+    image_store.migrate(str(images), str(metadata))
+    entries = json.loads(metadata.read_text(encoding='utf-8'))
+    (images / entries[0]['filename']).unlink()
+    stray = images / image_store.shard_path('stray.png')
+    stray.parent.mkdir(exist_ok=True)
+    stray.write_bytes(b'orphan')
+    state = tmp_path / 'state.json'
+
+    report = image_store.scan(str(images), str(metadata), state_path=str(state))
+    assert report['missing'] == ['0']
+    assert report['orphans'] == [image_store.shard_path('stray.png')]
+
+    # fresh orphans survive gc inside the grace period
+    report = image_store.scan(str(images), str(metadata), state_path=str(state), gc=True)
+    assert stray.exists() and report['dropped'] == 1
+    assert [e['id'] for e in json.loads(metadata.read_text(encoding='utf-8'))] == ['1', '2']
+
+    report = image_store.scan(str(images), str(metadata), state_path=str(state), gc=True, grace=0)
+    assert not stray.exists() and report['orphans'] == []
+
+    # nothing changed since the last clean scan: every shard is skipped
+    report = image_store.scan(str(images), str(metadata), state_path=str(state))
+    assert report['orphans'] == [] and report['missing'] == []
+    assert report['skipped_shards'] == len([d for d in os.listdir(images) if (images / d).is_dir()]) + 1
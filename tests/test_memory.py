@@ -0,0 +1,47 @@
+import pathlib
+import sys
+import tracemalloc
+
+repo = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(repo))
+
+from tools import memory
+
+
+class Slotted:
+    __slots__ = ('payload',)
+
+    def __init__(self, payload):
+        self.payload = payload
+
+
+def test_deep_size_and_strings():
+    shared = 'x' * 1000
+    items = [{'tag': ''.join(['Pro', 'ject']), 'body': shared} for _ in range(10)]
+    size = memory.deep_size(items)
+    # the 1000-character string is counted once
+    assert sys.getsizeof(shared) < size < 2 * sys.getsizeof(shared) + 10 * 1000
+    assert memory.deep_size(Slotted(shared)) > sys.getsizeof(shared)
+    stats = memory.string_stats(items)
+    # 'tag'/'body' keys are interned, the ten 'Project' strings are separate objects
+    assert stats['distinct'] == 4
+    assert stats['interning_savings_bytes'] == 9 * sys.getsizeof('Project')
+    assert memory.describe(items)['records'] == 10
+
+
+def test_tracer_top_and_diff():
+    tracer = memory.Tracer()
+    tracer.start()
+    try:
+        tracer.snapshot('before')
+        blob = [bytearray(1000) for _ in range(200)]
+        tracer.snapshot('after')
+        top = tracer.top('after', limit=5)
+        assert any('test_memory.py' in t['site'][0] for t in top)
+        diff = tracer.diff('before', 'after', limit=5)
+        assert diff[0]['size_diff_bytes'] >= 200 * 1000
+        assert tracer.status()['snapshots'] == ['before', 'after']
+        del blob
+    finally:
+        tracer.stop()
+    assert not tracemalloc.is_tracing() and tracer.snapshots == {}
@@ -0,0 +1,76 @@
+import json
+import pathlib
+import sys
+
+# ensure repo import works
+repo = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(repo))
+
+
+def test_merge_base_into_user_glossary(tmp_path):
+    from tools import data_lock, merge_glossary
+
+    base = [
+        {'type': 'Terme', 'id': '2.3.1', 'term': 'requirement', 'definition': 'documented demand to be complied with'},
+        {'type': 'Terme', 'id': '2.3.2', 'term': 'space segment', 'definition': 'part of a space system, placed in space'},
+        {'type': 'Abréviation', 'id': '1', 'term': 'ECSS', 'definition': 'European Cooperation for Space Standardization'},
+        {'type': 'Terme', 'id': '2.3.3', 'term': 'waiver', 'definition': 'formal authorization to accept products'},
+    ]
+    user = [
+        {'id': 'u1', 'term': 'Requirements', 'abbreviation': '', 'definition': 'Documented demand, to be complied with.', 'tags': []},
+        {'id': 'u2', 'term': 'Space segment', 'abbreviation': '', 'definition': 'the bit in orbit', 'tags': ['Mine']},
+        {'id': 'u3', 'term': 'European Space Standards', 'abbreviation': 'E.C.S.S.', 'definition': 'standards', 'tags': []},
+    ]
+
+    items, report = merge_glossary.merge(base, user, now='2024-01-01T00:00:00Z')
+    assert [it['id'] for it in items][:3] == ['u1', 'u2', 'u3']
+    assert report['exact'] == [{'ecss_id': '2.3.1', 'user': 'u1'}]
+    assert [(n['kind'], n['ecss_id'], n['user']['id']) for n in report['near']] == [('term', '2.3.2', 'u2'), ('abbreviation', '1', 'u3')]
+    assert [a['term'] for a in report['added']] == ['waiver']
+    added = items[-1]
+    assert added['tags'] == ['ECSS'] and added['ecss_id'] == '2.3.3' and added['abbreviation'] == ''
+    assert user[0].get('ecss_id') is None and items[0]['ecss_id'] == '2.3.1'
+
+    # importing again adds nothing
+    again, report = merge_glossary.merge(base, items)
+    assert again == items and report['added'] == []
+
+    items, report = merge_glossary.merge(base, user, policy='prefer-base')
+    assert items[1]['definition'] == 'part of a space system, placed in space' and items[1]['tags'] == ['Mine']
+    assert items[2]['term'] == 'European Cooperation for Space Standardization' and items[2]['abbreviation'] == 'ECSS'
+
+    items, report = merge_glossary.merge(base, user, policy='keep-both')
+    assert len(items) == 6
+
+    base_file = tmp_path / 'glossary.json'
+    user_file = tmp_path / 'glossary_user.json'
+    base_file.write_text(json.dumps(base), encoding='utf-8')
+    user_file.write_text(json.dumps(user), encoding='utf-8')
+    merge_glossary.main(str(base_file), str(user_file), dry_run=True)
+    assert json.loads(user_file.read_text(encoding='utf-8')) == user
+    merge_glossary.main(str(base_file), str(user_file))
+    assert len(json.loads(user_file.read_text(encoding='utf-8'))) == 4
+    assert len(list((tmp_path / 'backups').iterdir())) == 1
+    assert data_lock.read_version(user_file) is not None
+
+
+def test_legacy_user_entries_are_matched(tmp_path):
+    from tools import merge_glossary
+
+    base = [
+        {'type': 'Abréviation', 'id': '1', 'term': 'ECSS', 'definition': 'European Cooperation for Space Standardization'},
+        {'type': 'Terme', 'id': '2.3.2', 'term': 'space segment', 'definition': 'part of a space system, placed in space'},
+    ]
+    # written before the user schema: abbreviation in `term`, expansion in `definition`
+    user = [
+        {'id': 'u1', 'type': 'Abréviation', 'term': 'ECSS', 'definition': 'European Cooperation for Space Standardization'},
+        {'id': 'u2', 'type': 'Terme', 'term': 'Space segment', 'definition': 'the bit in orbit'},
+    ]
+    items, report = merge_glossary.merge(base, user)
+    assert report['added'] == []
+    assert report['exact'] == [{'ecss_id': '1', 'user': 'u1'}]
+    assert [(n['kind'], n['user']['id']) for n in report['near']] == [('term', 'u2')]
+
+    items, report = merge_glossary.merge(base, user, policy='prefer-base')
+    assert items[1] == {'id': 'u2', 'term': 'space segment', 'abbreviation': '', 'ecss_id': '2.3.2',
+                        'definition': 'part of a space system, placed in space', 'updated_at': items[1]['updated_at']}
@@ -0,0 +1,39 @@
+import pathlib
+import sys
+
+repo = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(repo))
+
+from tools import metrics
+
+
+def test_render_prometheus_text():
+    registry = metrics.Registry()
+    requests = registry.counter('requests_total', 'Requests.', ('method',))
+    requests.inc(method='GET')
+    requests.inc(2, method='GET')
+    requests.inc(method='P"UT')
+    in_flight = registry.gauge('in_flight', 'In flight.')
+    in_flight.inc()
+    in_flight.dec()
+    latency = registry.histogram('latency_seconds', 'Latency.', ('route',), buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.observe(value, route='/a')
+    assert registry.counter('requests_total', 'again') is requests
+
+    assert registry.render().splitlines() == [
+        '# HELP requests_total Requests.',
+        '# TYPE requests_total counter',
+        'requests_total{method="GET"} 3',
+        'requests_total{method="P\\"UT"} 1',
+        '# HELP in_flight In flight.',
+        '# TYPE in_flight gauge',
+        'in_flight 0',
+        '# HELP latency_seconds Latency.',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{route="/a",le="0.1"} 2',
+        'latency_seconds_bucket{route="/a",le="1"} 3',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 4',
+        'latency_seconds_sum{route="/a"} 3.65',
+        'latency_seconds_count{route="/a"} 4',
+    ]
@@ -0,0 +1,74 @@
+import io
+import pathlib
+import sys
+import zlib
+
+import pytest
+
+# ensure repo import works
+repo = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(repo))
+
+from tools import data_lock, optimize_images, png_codec
+
+
+def make_png(width=64, height=48):
+    header = png_codec.Header(width, height, 8, 6, 0)
+    rows = []
+    for y in range(height):
+        rows.append(bytes((x * 4 + c * 40 + y) & 0xff for x in range(width) for c in range(4)))
+    text = (b'tEXt', b'Comment\x00made by a screenshot tool')
+    return png_codec.encode(header, rows, extra_chunks=[text], level=1, mode=0), rows
+
+
+def test_optimize_png_is_lossless_and_strips_text(tmp_path):
+    data, rows = make_png()
+    out = optimize_images.optimize_png(data)
+    assert out is not None and len(out) < len(data)
+    header, new_rows, chunks = png_codec.decode(out)
+    assert (header.width, header.height) == (64, 48)
+    assert new_rows == rows
+    assert b'tEXt' not in [ctype for ctype, _ in chunks]
+
+
+def test_optimize_file_replaces_and_updates_metadata(tmp_path):
+    images = tmp_path / 'images'
+    images.mkdir()
+    data, rows = make_png()
+    (images / 'a.png').write_bytes(data)
+    (images / 'notes.txt').write_text('not an image')
+    meta = tmp_path / 'images.json'
+    meta.write_text('[{"id": "1", "filename": "a.png"}]', encoding='utf-8')
+
+    sizes = optimize_images.main(str(images), str(meta), workers=1)
+
+    new_size = (images / 'a.png').stat().st_size
+    assert sizes == {'a.png': new_size}
+    assert new_size < len(data)
+    assert png_codec.decode((images / 'a.png').read_bytes())[1] == rows
+    assert '"size": %d' % new_size in meta.read_text(encoding='utf-8')
+    assert not list(images.glob('*.tmp'))
+    # written like the server's writes: backed up first, version bumped
+    assert [p.name for p in (tmp_path / 'backups').iterdir()][0].startswith('images_')
+    assert data_lock.read_version(meta) is not None
+
+
+def test_already_optimal_png_is_left_alone():
+    data, _rows = make_png()
+    out = optimize_images.optimize_png(data)
+    assert optimize_images.optimize_png(out) is None
+
+
+def test_inflating_stops_at_the_header_size():
+    header = png_codec.Header(16, 16, 8, 0, 0)
+    ihdr = (b'IHDR', png_codec.header_bytes(header))
+    bomb = (b'IDAT', zlib.compress(bytes(1 << 20)))
+    with pytest.raises(png_codec.PNGError):
+        optimize_images.optimize_png(png_codec.SIGNATURE + b''.join(
+            png_codec.make_chunk(*c) for c in (ihdr, bomb, (b'IEND', b''))))
+    huge = png_codec.Header(1 << 20, 1 << 20, 8, 6, 0)
+    with pytest.raises(png_codec.PNGError, match='too large'):
+        png_codec.stream_size(huge)
+    rows = png_codec.iter_file_rows(io.BytesIO(png_codec.SIGNATURE + b''.join(
+        png_codec.make_chunk(*c) for c in (ihdr, bomb, (b'IEND', b'')))), chunk_size=64)[2]
+    assert len(list(rows)) == 16
@@ -9,6 +9,8 @@ sys.path.insert(0, str(repo))
 
 from tools import parse_glossary
 
+HEADER = 'Type,Identifiant,Terme/Abréviation,Définition/Signification\n'
+
 
 def test_parse_creates_json_and_contains_known_entries(tmp_path):
     repo = pathlib.Path(__file__).resolve().parents[1]
@@ -30,3 +32,148 @@ def test_parse_creates_json_and_contains_known_entries(tmp_path):
 
     assert has_ecss, 'Expected abbreviation "ECSS" not found in parsed data'
     assert has_spacecraft, 'Expected term/definition containing "spacecraft" not found'
+
+
+def test_streaming_output_matches_json_dump(tmp_path):
+    repo = pathlib.Path(__file__).resolve().parents[1]
+    input_path = repo / 'ecss_glossaire.txt'
+    out_json = tmp_path / 'glossary.json'
+    out_jsonl = tmp_path / 'glossary.jsonl'
+
+    summary = parse_glossary.main(str(input_path), str(out_json))
+    parse_glossary.main(str(input_path), str(out_jsonl))
+
+    data = json.loads(out_json.read_text(encoding='utf-8'))
+    assert out_json.read_text(encoding='utf-8') == json.dumps(data, ensure_ascii=False, indent=2)
+    lines = out_jsonl.read_text(encoding='utf-8').splitlines()
+    assert [json.loads(line) for line in lines] == data
+    assert summary['entries'] == len(data)
+    assert summary['terms'] + summary['abbreviations'] == len(data)
+
+
+def test_entries_are_read_lazily():
+    pulled = []
+
+    def lines():
+        yield 'Type,Identifiant,Terme,Définition\n'
+        for i in range(1000):
+            pulled.append(i)
+            yield f'Terme,{i},t{i},definition {i}\n'
+
+    entries = parse_glossary.iter_entries(lines())
+    assert next(entries)['term'] == 't0'
+    # only the first data row has been read so far
+    assert pulled == [0]
+
+
+def test_unquoted_commas_stay_in_definition():
+    rows = ['Type,Identifiant,Terme/Abréviation,Définition/Signification\n',
+            'Terme,2.2.2,segment,a major, self-contained, subset\n']
+    entry = next(parse_glossary.iter_entries(rows))
+    assert entry['definition'] == 'a major, self-contained, subset'
+
+
+def test_rerun_applies_only_changes(tmp_path):
+    header = 'Type,Identifiant,Terme/Abréviation,Définition/Signification\n'
+    src = tmp_path / 'glossary.csv'
+    out = tmp_path / 'glossary.json'
+    src.write_text(header + 'Terme,1.1,a,first\nTerme,1.2,b,second\nTerme,1.3,c,third\n', encoding='utf-8')
+    first = parse_glossary.main(str(src), str(out))
+    assert first['added'] == 3
+    assert json.loads((tmp_path / 'glossary.diff.json').read_text(encoding='utf-8'))['full'] is True
+
+    # unchanged input: the output file is left alone
+    stamp = out.stat().st_mtime_ns
+    again = parse_glossary.main(str(src), str(out))
+    assert (again['added'], again['changed'], again['removed']) == (0, 0, 0)
+    assert out.stat().st_mtime_ns == stamp
+
+    # rows are matched by identifier: a swap is one move, a revision one change, an append one addition
+    src.write_text(header + 'Terme,1.2,b,second\nTerme,1.1,a,first\nTerme,1.3,c,third (revised)\n'
+                   'Terme,1.4,d,fourth\n', encoding='utf-8')
+    summary = parse_glossary.main(str(src), str(out))
+    assert (summary['added'], summary['changed'], summary['removed'], summary['moved']) == (1, 1, 0, 1)
+    diff = json.loads((tmp_path / 'glossary.diff.json').read_text(encoding='utf-8'))
+    assert diff['full'] is False
+    assert [it['id'] for it in diff['added']] == ['1.4']
+    assert [(c['before']['definition'], c['after']['definition']) for c in diff['changed']] == [('third', 'third (revised)')]
+    assert len(diff['moved']) == 1 and diff['moved'][0] in ('1.1', '1.2')
+    manifest = (tmp_path / 'glossary.manifest.json').read_text(encoding='utf-8').splitlines()
+    assert json.loads(manifest[1])[0] == '1.2' and len(manifest) == 5
+
+    # the patched file is what a full parse would have written
+    patched = out.read_text(encoding='utf-8')
+    parse_glossary.main(str(src), str(tmp_path / 'full.json'), full=True)
+    assert patched == (tmp_path / 'full.json').read_text(encoding='utf-8')
+
+    src.write_text(header + 'Terme,1.2,b,second\n', encoding='utf-8')
+    summary = parse_glossary.main(str(src), str(out))
+    assert (summary['added'], summary['changed'], summary['removed']) == (0, 0, 3)
+    assert sorted(it['id'] for it in json.loads((tmp_path / 'glossary.diff.json').read_text(encoding='utf-8'))['removed']) == ['1.1', '1.3', '1.4']
+    assert [it['id'] for it in json.loads(out.read_text(encoding='utf-8'))] == ['1.2']
+
+
+def test_row_inserted_mid_file_is_one_addition(tmp_path):
+    src = tmp_path / 'ecss_glossaire.txt'
+    out = tmp_path / 'glossary.json'
+    lines = (repo / 'ecss_glossaire.txt').read_text(encoding='utf-8').splitlines(keepends=True)
+    src.write_text(''.join(lines), encoding='utf-8')
+    parse_glossary.main(str(src), str(out))
+    middle = len(lines) // 2
+    src.write_text(''.join(lines[:middle] + ['Terme,9.9.9,inserted term,added in the middle\n'] + lines[middle:]),
+                   encoding='utf-8')
+    summary = parse_glossary.main(str(src), str(out))
+    assert (summary['added'], summary['changed'], summary['removed'], summary['moved']) == (1, 0, 0, 0)
+    diff = json.loads((tmp_path / 'glossary.diff.json').read_text(encoding='utf-8'))
+    assert [it['id'] for it in diff['added']] == ['9.9.9']
+
+
+def test_moved_records_are_the_fewest():
+    assert parse_glossary._moved([0, 1, 2, 3]) == []
+    assert parse_glossary._moved([1, 0, 2, 3]) in ([0], [1])
+    assert parse_glossary._moved([3, 0, 1, 2]) == [0]
+
+
+def test_ranges_respect_quoted_newlines(tmp_path):
+    rows = [f'Terme,1.{i},term {i},"line one\nline, two {i}"\n' for i in range(200)]
+    src = tmp_path / 'a.csv'
+    src.write_text(HEADER + ''.join(rows), encoding='utf-8')
+
+    fieldnames, ranges = parse_glossary.split_ranges(str(src), chunk_bytes=64)
+    assert fieldnames[1] == 'Identifiant'
+    assert len(ranges) > 10
+    entries = []
+    for start, end in ranges:
+        entries.extend(parse_glossary._parse_range((str(src), start, end, fieldnames)))
+    with open(src, newline='', encoding='utf-8') as fh:
+        assert entries == list(parse_glossary.iter_entries(fh))
+
+
+def test_ingest_merges_sources_deterministically(tmp_path):
+    (tmp_path / 'std').mkdir()
+    (tmp_path / 'std' / 'a.csv').write_text(HEADER + 'Terme,2.1,system,set of functions\nTerme,2.2,part,see "component"\n', encoding='utf-8')
+    (tmp_path / 'std' / 'b.csv').write_text(HEADER + 'Terme,2.2,part,piece\nAbréviation,3.1,ECSS,European Cooperation for Space Standardization\n', encoding='utf-8')
+    (tmp_path / 'c.csv').write_text(HEADER + 'Terme,2.1,system,set of functions\n', encoding='utf-8')
+    out = tmp_path / 'merged.json'
+
+    summary = parse_glossary.ingest([str(tmp_path / 'std' / '*.csv'), str(tmp_path / 'c.csv')], str(out), workers=2, chunk_bytes=16)
+
+    data = json.loads(out.read_text(encoding='utf-8'))
+    assert [it['id'] for it in data] == ['2.1', '2.2', '3.1']
+    assert data[0]['sources'] == ['a.csv:1', 'c.csv:1']
+    assert data[1]['definition'] == 'see "component"'
+    assert summary['entries'] == 5 and summary['unique'] == 3
+    conflicts = json.loads((tmp_path / 'merged.conflicts.json').read_text(encoding='utf-8'))
+    assert conflicts == [{
+        'id': '2.2',
+        'kept': {'source': 'a.csv:2', 'term': 'part', 'definition': 'see "component"'},
+        'others': [{'source': 'b.csv:1', 'term': 'part', 'definition': 'piece'}],
+    }]
+
+    # --jsonl and --index apply to the merged output too
+    jsonl = tmp_path / 'merged.jsonl'
+    parse_glossary.ingest([str(tmp_path / 'c.csv')], str(jsonl), workers=1)
+    assert [json.loads(line)['id'] for line in jsonl.read_text(encoding='utf-8').splitlines()] == ['2.1']
+    parse_glossary.ingest([str(tmp_path / 'c.csv')], str(out), workers=1, index=True)
+    assert (tmp_path / 'merged.fuse-index.json').exists()
+    assert not list(tmp_path.glob('*.tmp'))
@@ -0,0 +1,57 @@
+import json
+import pathlib
+import sys
+
+repo = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(repo))
+
+from tools import pdf_glossary, pdf_reader
+
+PDF = repo / 'ECSS-S-ST-00-01C_Rev.1(11October2023).pdf'
+
+
+def test_extracts_terms_and_abbreviations(tmp_path):
+    out_file = tmp_path / 'glossary.json'
+    summary = pdf_glossary.main(str(PDF), str(out_file), workers=2)
+    data = json.loads(out_file.read_text(encoding='utf-8'))
+    assert (summary['entries'], summary['terms'], summary['abbreviations']) == (415, 277, 138)
+    by_key = {(it['type'], it['id']): it for it in data}
+    assert len(by_key) == len(data)
+
+    # unnumbered terms of clause 2.2 are numbered in order
+    assert by_key[('Terme', '2.2.1')]['term'] == 'system'
+    # definitions are complete, commas included, notes left out
+    assert by_key[('Terme', '2.2.2')]['definition'] == (
+        'set of elements or combination of systems that fulfils a major, '
+        'self-contained, subset of the space mission objectives')
+    assert by_key[('Terme', '2.3.16')]['definition'].endswith('audit criteria are fulfilled')
+    # definitions running over a page break
+    assert by_key[('Terme', '2.3.12')]['definition'].endswith('provisions of the source document')
+    assert by_key[('Terme', '2.3.250')]['term'] == 'work package'
+    # a space the PDF leaves out, a list lead-in without its colon
+    assert 'prevents its failures from resulting' in by_key[('Terme', '2.3.87')]['definition']
+    assert by_key[('Terme', '2.3.6')]['definition'].startswith(
+        'undesired event arising from operation of any project-specific item that results in: a. human death')
+    assert ", or d. detrimental" in by_key[('Terme', '2.3.6')]['definition']
+    assert by_key[('Abréviation', '133')] == {
+        'type': 'Abréviation', 'id': '133', 'term': 'TT&C', 'definition': 'telemetry, tracking and command'}
+
+
+def test_pages_are_parsed_on_demand():
+    with pdf_reader.Document(str(PDF)) as doc:
+        assert len(doc.pages) == 61
+        parsed = len(doc._cache)
+        lines = pdf_glossary.page_lines(doc, 12)
+        # only the objects of that page (content, fonts) were read
+        assert len(doc._cache) - parsed < len(doc.offsets) // 50
+    assert lines[0][3] == '2.3 Terms and definitions'
+    assert lines[1][3] == '2.3.1 absorbed dose'
+
+
+def test_pdf_and_csv_give_the_committed_glossary(tmp_path):
+    from tools import parse_glossary
+    parse_glossary.main(str(repo / 'ecss_glossaire.txt'), str(tmp_path / 'csv.json'))
+    pdf_glossary.main(str(PDF), str(tmp_path / 'pdf.json'), workers=2)
+    committed = (repo / 'data' / 'glossary.json').read_text(encoding='utf-8')
+    assert (tmp_path / 'csv.json').read_text(encoding='utf-8') == committed
+    assert (tmp_path / 'pdf.json').read_text(encoding='utf-8') == committed
@@ -0,0 +1,28 @@
+import pathlib
+import random
+import sys
+
+# ensure repo import works
+repo = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(repo))
+
+from tools import phash
+
+
+def test_bktree_matches_brute_force():
+    rng = random.Random(7)
+    hashes = [f'{rng.getrandbits(64):016x}' for _ in range(300)]
+    # a few near copies
+    hashes += [f'{int(h, 16) ^ (1 << rng.randrange(64)):016x}' for h in hashes[:20]]
+    tree = phash.BKTree()
+    for i, h in enumerate(hashes):
+        tree.add(h, i)
+    assert tree.size == len(hashes)
+    for query in hashes[:40]:
+        expected = sorted((phash.hamming(query, h), i) for i, h in enumerate(hashes) if phash.hamming(query, h) <= 12)
+        assert sorted(tree.search(query, 12)) == expected
+
+
+def test_build_index_skips_entries_without_hash():
+    tree = phash.build_index([{'id': 'a', 'phash': '00ff00ff00ff00ff', 'title': 'A'}, {'id': 'b'}])
+    assert tree.search('00ff00ff00ff00fe', 1) == [(1, {'id': 'a', 'title': 'A', 'filename': None})]
@@ -0,0 +1,37 @@
+import json
+import pathlib
+import re
+import sys
+
+repo = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(repo))
+
+from tools import prerender
+
+TEMPLATE = ('<html><body><div id="tagFilterContainer" style="display:flex"></div>'
+            '<div id="results"></div><script src="/web/app.js"></script></body></html>')
+
+
+def test_first_page_order_and_size():
+    items = [{'id': str(i), 'term': t} for i, t in enumerate(['beta', 'Alpha', 'alpha', 'gamma'])]
+    assert [it['id'] for it in prerender.first_page(items, 3)] == ['1', '2', '0']
+    assert prerender.all_tags([{'tags': ['b', 'a']}, {'tags': ['a']}, {}]) == ['a', 'b']
+
+
+def test_render_page_escapes_and_embeds_state():
+    items = [{'id': 'x', 'term': '<b>T&C</b>', 'definition': 'see </script>', 'abbreviation': 'TC', 'tags': ['law']}]
+    page = prerender.render_page(TEMPLATE, items)
+    assert '<div id="results"><div class="item" data-id="x"><h3>&lt;b&gt;T&amp;C&lt;/b&gt; <small>TC</small></h3>' in page
+    assert '<div id="tagFilterContainer" style="display:flex"><button type="button" class="tagFilterBtn">law</button>' in page
+    assert page.count('</script>') == 2
+    state = re.search(r'<script id="initialState" type="application/json">(.*?)</script>', page).group(1)
+    assert json.loads(state) == {'terms': items}
+    assert page.index('initialState') < page.index('</body>')
+
+
+def test_state_holds_only_the_first_page():
+    items = [{'id': str(i), 'term': f'term {i:03d}', 'definition': 'x' * 100} for i in range(120)]
+    page = prerender.render_page(TEMPLATE, items, size=10)
+    state = json.loads(re.search(r'type="application/json">(.*?)</script>', page).group(1))
+    assert state == {'terms': items[:10]}
+    assert page.count('<div class="item"') == 10
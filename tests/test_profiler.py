@@ -0,0 +1,38 @@
+import pathlib
+import pstats
+import sys
+import time
+
+repo = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(repo))
+
+from tools import profiler
+
+
+def busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_request_profile_files(tmp_path):
+    for _ in range(3):
+        prof = profiler.RequestProfile(interval=0.001)
+        prof.start()
+        busy_wait(0.05)
+        paths = prof.stop(str(tmp_path), keep=2)
+    stats = pstats.Stats(paths['pstats'])
+    assert any(func[2] == 'busy_wait' for func in stats.stats)
+    lines = pathlib.Path(paths['collapsed']).read_text(encoding='utf-8').splitlines()
+    assert lines and all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+    assert any('busy_wait (test_profiler.py:' in line for line in lines)
+    assert len(list(tmp_path.iterdir())) == 4
+
+
+def test_rate_limiter():
+    limiter = profiler.RateLimiter(60)
+    assert limiter.acquire()
+    assert not limiter.acquire()
+    limiter.release()
+    assert not limiter.acquire()
+    assert profiler.RateLimiter(0).acquire()
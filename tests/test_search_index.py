@@ -0,0 +1,70 @@
+import gzip
+import json
+import os
+import pathlib
+import sys
+
+repo = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(repo))
+
+from tools import data_lock, parse_glossary, search_index
+
+DOCS = [
+    {'term': 'space segment', 'definition': 'part of a space system, placed in space', 'abbreviation': ''},
+    {'term': 'télémesure', 'definition': 'telemetry', 'abbreviation': 'TM'},
+    {'term': 'space system', 'definition': 'system that contains at least a space segment'},
+]
+
+
+def test_fuse_index_layout():
+    index = search_index.fuse_index(DOCS)
+    assert index['keys'][0] == {'path': ['term'], 'id': 'term', 'weight': 0.8, 'src': 'term'}
+    first, second, third = index['records']
+    assert first == {'i': 0, '$': {'0': {'v': 'space segment', 'n': 0.707},
+                                   '1': {'v': 'part of a space system, placed in space', 'n': 0.354}}}
+    assert second['$']['2'] == {'v': 'TM', 'n': 1.0}
+    # missing and blank fields are left out, as Fuse does
+    assert set(third['$']) == {'0', '1'}
+
+
+def test_inverted_index_and_trie():
+    inverted = search_index.inverted_index(DOCS)
+    assert search_index.postings(inverted, 'space') == [0, 2]
+    assert search_index.postings(inverted, 'telemesure') == [1]
+    trie = search_index.build_trie(DOCS)
+    assert search_index.trie_prefix(trie, 'spa') == [0, 2]
+    assert search_index.trie_prefix(trie, 'space seg') == [0]
+    assert search_index.trie_prefix(trie, 'Télé') == [1]
+    assert search_index.trie_prefix(trie, 'tm') == [1]
+    assert search_index.trie_prefix(trie, 'x') == []
+
+
+def test_parser_writes_artefacts_once(tmp_path):
+    src = tmp_path / 'glossary.csv'
+    out = tmp_path / 'glossary.json'
+    src.write_text('Type,Identifiant,Terme/Abréviation,Définition/Signification\n'
+                   'Terme,1.1,orbit,path of a body\nAbréviation,1,AIT,assembly, integration and test\n',
+                   encoding='utf-8')
+    parse_glossary.main(str(src), str(out), index=True)
+    paths = search_index.artefact_paths(str(out))
+    data = json.loads(out.read_text(encoding='utf-8'))
+    fuse = json.loads(pathlib.Path(paths['fuse']).read_text(encoding='utf-8'))
+    assert fuse == search_index.fuse_index(data)
+    assert gzip.decompress(pathlib.Path(paths['gzip']).read_bytes()) == out.read_bytes()
+
+    # an unchanged re-run leaves the artefacts alone
+    stamps = {k: pathlib.Path(p).stat().st_mtime_ns for k, p in paths.items()}
+    parse_glossary.main(str(src), str(out), index=True)
+    assert {k: pathlib.Path(p).stat().st_mtime_ns for k, p in paths.items()} == stamps
+
+
+def test_artefacts_follow_the_version_token(tmp_path):
+    path = tmp_path / 'glossary.json'
+    path.write_text(json.dumps(DOCS), encoding='utf-8')
+    search_index.write_artefacts(str(path))
+    assert search_index.artefacts_fresh(str(path))
+    # a locked write that keeps the size and the mtime is still noticed
+    st = path.stat()
+    data_lock.bump_version(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert not search_index.artefacts_fresh(str(path))
@@ -0,0 +1,64 @@
+import json
+import os
+import pathlib
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+import pytest
+
+repo = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(repo))
+
+from tools import serve
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs os.fork')
+def test_workers_share_the_data_directory(tmp_path):
+    proc = subprocess.Popen([sys.executable, '-m', 'tools.serve', '--workers', '2', '--threads', '2', '--port', '0',
+                             '--data-dir', str(tmp_path / 'data'), '--no-build'], cwd=repo, stderr=subprocess.PIPE, text=True)
+    try:
+        url = proc.stderr.readline().split()[2]
+        created = []
+        for i in range(6):
+            req = urllib.request.Request(url + '/api/methods', method='POST', headers={'Content-Type': 'application/json'},
+                                         data=json.dumps({'title': f'm{i}', 'definition': 'd'}).encode())
+            with urllib.request.urlopen(req, timeout=10) as resp:
+                created.append(json.load(resp)['id'])
+        for _ in range(4):  # whichever worker answers sees every write
+            with urllib.request.urlopen(url + '/api/methods', timeout=10) as resp:
+                assert [m['id'] for m in json.load(resp)] == created
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        assert proc.wait(timeout=10) == 0
+    # each worker wrote its own access log and flushed it on the way out
+    logs = {p.name for p in (tmp_path / 'data' / 'logs').iterdir()}
+    assert logs and logs <= {'requests.w1.jsonl', 'requests.w2.jsonl'}
+    assert sum(len(p.read_text(encoding='utf-8').splitlines()) for p in (tmp_path / 'data' / 'logs').iterdir()) == 10
+
+
+def test_waiting_requests_are_bounded():
+    server = serve.PooledWSGIServer('127.0.0.1', 0, None, threads=1, queue_size=1)
+    release = threading.Event()
+    server.finish_request = lambda request, client_address: release.wait(5)
+    server.shutdown_request = lambda request: None
+    accepted = []
+
+    def accept():
+        for n in range(3):
+            server.process_request(None, n)
+            accepted.append(n)
+    thread = threading.Thread(target=accept)
+    thread.start()
+    try:
+        time.sleep(0.2)
+        assert accepted == [0, 1]  # one running, one waiting; the third stays in the backlog
+    finally:
+        release.set()
+        thread.join(5)
+        server.pool.shutdown()
+        server.server_close()
+    assert accepted == [0, 1, 2]
@@ -0,0 +1,491 @@
+import gzip
+import io
+import json
+import os
+import pathlib
+import sys
+import time
+import zlib
+
+import pytest
+
+# ensure repo import works
+repo = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(repo))
+
+import server
+from tools import data_lock, image_store, png_codec, search_index
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    data = tmp_path / 'data'
+    for sub in ('images', 'backups'):
+        (data / sub).mkdir(parents=True)
+    monkeypatch.setattr(server, 'DATA_DIR', data)
+    monkeypatch.setattr(server, 'USER_FILE', data / 'glossary_user.json')
+    monkeypatch.setattr(server, 'BASE_FILE', data / 'glossary.json')
+    monkeypatch.setattr(server, 'IMAGES_DIR', data / 'images')
+    monkeypatch.setattr(server, 'IMAGES_FILE', data / 'images.json')
+    monkeypatch.setattr(server, 'EQUATIONS_FILE', data / 'equations.json')
+    monkeypatch.setattr(server, 'REFERENCES_FILE', data / 'references.json')
+    monkeypatch.setattr(server, 'METHODS_FILE', data / 'methods.json')
+    monkeypatch.setattr(server, 'BACKUPS_DIR', data / 'backups')
+    monkeypatch.setattr(server, 'TILES_DIR', data / 'tiles')
+    monkeypatch.setattr(server, 'PROFILES_DIR', data / 'profiles')
+    monkeypatch.setattr(server, 'SLOW_LOG_FILE', data / 'slow_requests.jsonl')
+    monkeypatch.setattr(server, 'ACCESS_LOG_FILE', data / 'logs' / 'requests.jsonl')
+    for name in ('path', 'threshold'):
+        monkeypatch.setattr(server.slow_log, name, getattr(server.slow_log, name))
+    monkeypatch.setattr(server.access_log, 'path', server.access_log.path)
+    server.create_app({'TESTING': True})
+    with server.app.test_client() as c:
+        yield c
+    # before the paths are restored
+    server._phash_pool.submit(lambda: None).result()
+    server.access_log.flush()
+
+
+def small_png():
+    header = png_codec.Header(32, 16, 8, 2, 0)
+    rows = [bytes((x + y) & 0xff for x in range(32 * 3)) for y in range(16)]
+    return png_codec.encode(header, rows, level=1, mode=0), rows
+
+
+def test_upload_png_is_optimized(client):
+    data, rows = small_png()
+    resp = client.post('/api/images', data={'file': (io.BytesIO(data), 'shot.png'), 'title': 'Shot', 'tags': 'a, b'},
+                       content_type='multipart/form-data')
+    assert resp.status_code == 201
+    meta = resp.get_json()
+    assert meta['tags'] == ['a', 'b']
+    shard, name = meta['filename'].split('/')
+    assert shard == image_store.shard_of(name)
+    assert meta['size'] == len(data)
+    server._phash_pool.submit(lambda: None).result()  # recompressed after the response
+    stored = server.IMAGES_DIR / meta['filename']
+    saved = json.loads(server.IMAGES_FILE.read_text(encoding='utf-8'))[0]
+    assert saved['id'] == meta['id']
+    assert saved['size'] == stored.stat().st_size < len(data)
+    assert png_codec.decode(stored.read_bytes())[1] == rows
+
+
+def test_png_bomb_is_refused(client):
+    header = png_codec.Header(100_000, 100_000, 8, 6, 0)
+    ihdr = png_codec.make_chunk(b'IHDR', png_codec.header_bytes(header))
+    bomb = png_codec.SIGNATURE + ihdr + png_codec.make_chunk(b'IDAT', zlib.compress(bytes(1 << 20), 9)) \
+        + png_codec.make_chunk(b'IEND', b'')
+    resp = client.post('/api/images', data={'file': (io.BytesIO(bomb), 'bomb.png')},
+                       content_type='multipart/form-data')
+    assert resp.status_code == 400 and 'too large' in resp.get_json()['detail']
+    assert not list(server.IMAGES_DIR.rglob('*.png'))
+
+
+def test_bulk_upload_writes_metadata_once(client, monkeypatch):
+    data, _rows = small_png()
+    saves = []
+    real_save = server.save_images
+    monkeypatch.setattr(server, 'save_images', lambda images: (saves.append(len(images)), real_save(images)))
+    monkeypatch.setattr(server, 'optimize_later', lambda metas: None)  # saves sizes later
+    resp = client.post('/api/images/bulk', data={
+        'files': [(io.BytesIO(data), 'one.png'), (io.BytesIO(b'text'), 'notes.txt'), (io.BytesIO(data), 'two.png')],
+        'titles': ['First', 'Notes', ''],
+        'tags': 'deck',
+    }, content_type='multipart/form-data')
+    assert resp.status_code == 201
+    body = resp.get_json()
+    assert (body['uploaded'], body['failed']) == (2, 1)
+    assert [r['ok'] for r in body['results']] == [True, False, True]
+    assert body['results'][1]['status'] == 400
+    assert saves == [2]
+    images = json.loads(server.IMAGES_FILE.read_text(encoding='utf-8'))
+    assert [it['title'] for it in images] == ['First', 'two.png']
+    assert all(it['tags'] == ['deck'] for it in images)
+
+
+def test_tiles_are_built_once(client, monkeypatch):
+    import threading
+    monkeypatch.setattr(server, 'tile_later', lambda metas: None)
+    data, _rows = small_png()
+    meta = client.post('/api/images', data={'file': (io.BytesIO(data), 'a.png')},
+                       content_type='multipart/form-data').get_json()
+    # an interrupted build left a directory without info.json
+    (server.TILES_DIR / meta['id'] / '0').mkdir(parents=True)
+    builds = []
+    real_build = server.tiles.build_pyramid
+
+    def build_pyramid(src, out_dir):
+        builds.append(out_dir)
+        time.sleep(0.05)
+        return real_build(src, out_dir)
+    monkeypatch.setattr(server.tiles, 'build_pyramid', build_pyramid)
+    infos = []
+    threads = [threading.Thread(target=lambda: infos.append(server.ensure_tiles(meta))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(builds) == 1
+    assert infos == [server.tiles.load_info(str(server.TILES_DIR / meta['id']))] * 4
+    assert not list(server.TILES_DIR.glob('*.tmp'))
+
+
+def test_tiles_are_generated_and_served(client):
+    header = png_codec.Header(600, 300, 8, 2, 0)
+    rows = [bytes((x // 3 + y) & 0xff for x in range(600 * 3)) for y in range(300)]
+    data = png_codec.encode(header, rows, mode=0)
+    meta = client.post('/api/images', data={'file': (io.BytesIO(data), 'big.png')},
+                       content_type='multipart/form-data').get_json()
+
+    info = client.get(f"/api/images/{meta['id']}/tiles").get_json()
+    assert (info['width'], info['height'], info['levels']) == (600, 300, 3)
+    assert info['url'] == f"/images/{meta['id']}/tiles/{{z}}/{{x}}/{{y}}"
+
+    resp = client.get(f"/images/{meta['id']}/tiles/2/2/1")
+    assert resp.status_code == 200
+    tile_header, tile_rows, _ = png_codec.decode(resp.data)
+    assert (tile_header.width, tile_header.height) == (600 - 512, 300 - 256)
+    # RGB source becomes opaque RGBA; first pixel of the tile is source pixel (512, 256)
+    assert tile_rows[0][:4] == bytes([rows[256][512 * 3], rows[256][512 * 3 + 1], rows[256][512 * 3 + 2], 255])
+    assert client.get(f"/images/{meta['id']}/tiles/0/0/0").status_code == 200
+    assert client.get(f"/images/{meta['id']}/tiles/0/5/5").status_code == 404
+    assert client.get('/images/nope/tiles/0/0/0').status_code == 404
+
+    client.delete(f"/api/images/{meta['id']}")
+    assert not (server.TILES_DIR / meta['id']).exists()
+
+
+def test_near_duplicates_are_reported(client):
+    header = png_codec.Header(90, 80, 8, 0, 0)
+    rows = [bytes((x * 3 + (y // 10) * 20) & 0xff for x in range(90)) for y in range(80)]
+    variant = [bytes(min(255, v + 2) for v in row) for row in rows]
+    other = [bytes(255 - ((x * 7 + y * 5) & 0xff) for x in range(90)) for y in range(80)]
+    ids = []
+    for name, r in (('a.png', rows), ('b.png', other), ('a-again.png', variant)):
+        resp = client.post('/api/images', data={'file': (io.BytesIO(png_codec.encode(header, r)), name)},
+                           content_type='multipart/form-data')
+        body = resp.get_json()
+        ids.append(body['id'])
+    assert [d['id'] for d in body['near_duplicates']] == [ids[0]]
+
+    similar = client.get(f'/api/images/{ids[0]}/similar').get_json()
+    assert [d['id'] for d in similar] == [ids[2]]
+    assert similar[0]['distance'] <= 6
+    assert client.get(f'/api/images/{ids[1]}/similar').get_json() == []
+    assert client.get(f'/api/images/{ids[1]}/similar?max_distance=64').status_code == 200
+    assert client.get('/api/images/nope/similar').status_code == 404
+
+
+def test_image_processing_runs_outside_the_lock(client, monkeypatch):
+    import fcntl
+    held = []
+
+    def optimize_file(path, refilter=True):
+        # another process could take the images lock right now
+        fd = os.open(data_lock.lock_path(server.IMAGES_FILE), os.O_RDWR | os.O_CREAT)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            held.append(False)
+        except BlockingIOError:
+            held.append(True)
+        finally:
+            os.close(fd)
+        return 1, 1
+    monkeypatch.setattr(server.optimize_images, 'optimize_file', optimize_file)
+    data, _rows = small_png()
+    assert client.post('/api/images', data={'file': (io.BytesIO(data), 'a.png')},
+                       content_type='multipart/form-data').status_code == 201
+    assert client.post('/api/images/bulk', data={'files': [(io.BytesIO(data), 'b.png')]},
+                       content_type='multipart/form-data').status_code == 201
+    server._phash_pool.submit(lambda: None).result()
+    assert held == [False, False]
+    assert len(json.loads(server.IMAGES_FILE.read_text(encoding='utf-8'))) == 2
+
+
+def test_large_png_is_hashed_in_the_background(client, monkeypatch):
+    monkeypatch.setitem(server.app.config, 'PHASH_SYNC_PIXELS', 100)
+    data, _rows = small_png()
+    body = client.post('/api/images', data={'file': (io.BytesIO(data), 'big.png')},
+                       content_type='multipart/form-data').get_json()
+    assert body['phash_pending'] and 'phash' not in body
+    server._phash_pool.submit(lambda: None).result()  # wait for the queued hash
+    stored = json.loads(server.IMAGES_FILE.read_text(encoding='utf-8'))[0]
+    assert stored['phash'] == server.phash.dhash_file(str(server.IMAGES_DIR / stored['filename']))
+
+
+def test_only_small_pngs_are_hashed_inline(client):
+    header = png_codec.Header(257, 256, 8, 0, 0)
+    data = png_codec.encode(header, [bytes(257)] * 256, level=1, mode=0)
+    body = client.post('/api/images', data={'file': (io.BytesIO(data), 'wide.png')},
+                       content_type='multipart/form-data').get_json()
+    assert body['phash_pending'] and 'phash' not in body
+    server._phash_pool.submit(lambda: None).result()
+    small, _rows = small_png()
+    body = client.post('/api/images', data={'file': (io.BytesIO(small), 'small.png')},
+                       content_type='multipart/form-data').get_json()
+    assert body['phash'] and not body['phash_pending']
+
+
+def test_terms_index_follows_the_glossary(client):
+    client.post('/api/terms', json={'term': 'orbit', 'definition': 'path of a body'})
+    first = client.get('/api/terms/index').get_json()
+    assert [r['$']['0']['v'] for r in first['records']] == ['orbit']
+
+    client.post('/api/terms', json={'term': 'apogee', 'definition': 'farthest point', 'abbreviation': 'AP'})
+    resp = client.get('/api/terms')
+    terms = resp.get_json()
+    index = client.get('/api/terms/index').get_json()
+    assert index == search_index.fuse_index(terms)
+    # the client pairs the two by version, not by entry count
+    assert resp.headers['ETag'] == f'"{index["source"]}"'
+    client.put(f"/api/terms/{terms[0]['id']}", json=dict(terms[0], definition='trajectory'))
+    edited = client.get('/api/terms')
+    assert edited.headers['ETag'] != resp.headers['ETag']
+    assert edited.headers['ETag'] == f'"{client.get("/api/terms/index").get_json()["source"]}"'
+
+
+def test_term_links_follow_edits(client):
+    seg = client.post('/api/terms', json={'term': 'space segment', 'definition': 'part of a space system'}).get_json()
+    assert client.get(f"/api/terms/{seg['id']}/links").get_json() == {'outgoing': [], 'incoming': []}
+    system = client.post('/api/terms', json={'term': 'space system', 'definition': 'contains a space segment'}).get_json()
+
+    links = client.get(f"/api/terms/{seg['id']}/links").get_json()
+    assert links['outgoing'] == [{'id': system['id'], 'term': 'space system', 'start': 10, 'end': 22}]
+    assert links['incoming'] == [{'id': system['id'], 'term': 'space system'}]
+
+    client.put(f"/api/terms/{seg['id']}", json={'term': 'flight segment'})
+    assert client.get('/api/terms/links').get_json() == {
+        seg['id']: {'out': [[system['id'], 10, 22]], 'in': []},
+        system['id']: {'out': [], 'in': [seg['id']]},
+    }
+    client.delete(f"/api/terms/{system['id']}")
+    assert client.get('/api/terms/links').get_json() == {}
+    assert client.get(f"/api/terms/{system['id']}/links").status_code == 404
+
+
+def test_browse_base_glossary_by_clause(client):
+    base = [
+        {'type': 'Terme', 'id': '2.3.10', 'term': 'ten', 'definition': '-'},
+        {'type': 'Terme', 'id': '2.2.1', 'term': 'system', 'definition': '-'},
+        {'type': 'Terme', 'id': '2.3.9', 'term': 'nine', 'definition': '-'},
+        {'type': 'Abréviation', 'id': '1', 'term': 'ECSS', 'definition': '-'},
+        {'type': 'Terme', 'id': '2.3.2', 'term': 'two', 'definition': '-'},
+    ]
+    server.BASE_FILE.write_text(json.dumps(base), encoding='utf-8')
+
+    body = client.get('/api/clauses?prefix=2').get_json()
+    assert body['total'] == 4
+    assert body['children'] == [{'clause': '2.2', 'count': 1}, {'clause': '2.3', 'count': 3}]
+    body = client.get('/api/clauses?prefix=2.3&offset=1&limit=1').get_json()
+    assert (body['total'], [e['id'] for e in body['entries']]) == (3, ['2.3.9'])
+    body = client.get('/api/clauses?from=2.2&to=2.3.9').get_json()
+    assert [e['id'] for e in body['entries']] == ['2.2.1', '2.3.2', '2.3.9']
+
+    body = client.get('/api/clauses/2.3.9').get_json()
+    assert body['entry']['term'] == 'nine' and body['parent'] == '2.3'
+    assert [e['id'] for e in body['previous']] == ['2.3.2'] and [e['id'] for e in body['next']] == ['2.3.10']
+    assert client.get('/api/clauses/2.3.11').status_code == 404
+    assert client.get('/api/clauses?prefix=abc').status_code == 400
+
+
+def test_metrics_endpoint(client):
+    before = server.HTTP_LATENCY.count(method='POST', endpoint='/api/terms')
+    writes = server.WRITE_BYTES.value(file='glossary_user.json')
+    client.post('/api/terms', json={'term': 'a', 'definition': 'b'})
+    client.get('/api/terms/links')
+    client.get('/api/terms/links')
+    client.get('/no/such/page')
+
+    resp = client.get('/metrics')
+    assert resp.status_code == 200 and resp.mimetype == 'text/plain'
+    text = resp.get_data(as_text=True)
+    assert '# TYPE http_request_duration_seconds histogram' in text
+    assert 'http_requests_total{method="GET",endpoint="unmatched",status="404"}' in text
+    in_flight = next(line for line in text.splitlines() if line.startswith('http_requests_in_flight '))
+    assert int(in_flight.split()[1]) >= 1  # the /metrics request itself
+    assert 'storage_loads_total{collection="terms"}' in text
+    assert 'cache_requests_total{cache="links",result="hit"}' in text
+    assert server.HTTP_LATENCY.count(method='POST', endpoint='/api/terms') == before + 1
+    assert server.WRITE_BYTES.value(file='glossary_user.json') > writes
+
+
+def test_profile_on_demand(client, monkeypatch):
+    from tools import profiler
+    assert 'X-Profile-Id' not in client.get('/api/terms?profile=1').headers
+    monkeypatch.setitem(server.app.config, 'PROFILING', True)
+    monkeypatch.setitem(server.app.config, 'PROFILING_MIN_INTERVAL', 60)
+    monkeypatch.setattr(server, '_profile_limiter', profiler.RateLimiter(60))
+
+    assert 'X-Profile-Id' not in client.get('/api/terms').headers
+    resp = client.get('/api/clauses', headers={'X-Profile': '1'})
+    profile_id = resp.headers['X-Profile-Id']
+    assert (server.PROFILES_DIR / f'{profile_id}.pstats').stat().st_size > 0
+    assert (server.PROFILES_DIR / f'{profile_id}.collapsed').exists()
+    # rate-limited: the request is served without profiling
+    resp = client.get('/api/clauses?profile=1')
+    assert resp.status_code == 200 and resp.headers['X-Profile-Skipped'] == 'rate-limited'
+
+
+def test_slow_request_log(client, monkeypatch):
+    monkeypatch.setattr(server.slow_log, 'threshold', 60)
+    client.post('/api/terms', json={'term': 'fast', 'definition': 'not logged'})
+    assert not server.SLOW_LOG_FILE.exists()
+
+    monkeypatch.setattr(server.slow_log, 'threshold', 0.05)
+    monkeypatch.setattr(server.slow_log, 'interval', 0.005)
+    backup_file = server.backup_file
+
+    def slow_backup(path):
+        time.sleep(0.1)
+        backup_file(path)
+
+    monkeypatch.setattr(server, 'backup_file', slow_backup)
+    resp = client.post('/api/terms?source=test', json={'term': 'slow', 'definition': 'logged'})
+    assert resp.status_code == 201
+    record = json.loads(server.SLOW_LOG_FILE.read_text(encoding='utf-8').splitlines()[-1])
+    assert record['route'] == '/api/terms' and record['method'] == 'POST' and record['status'] == 201
+    assert record['params'] == {'source': ['test']}
+    assert record['duration_ms'] >= 100
+    ops = [(op['op'], op['target']) for op in record['operations']]
+    assert ('lock', 'glossary_user.json') in ops and ('load', 'terms') in ops
+    assert ('save', 'terms') in ops and ('write', 'glossary_user.json') in ops
+    assert record['samples'] > 0
+    assert any('slow_backup (test_server.py:' in s['stack'] for s in record['stacks'])
+
+
+def test_access_log(client):
+    client.get('/api/terms?q=x')
+    client.post('/api/terms', json={'term': 'logged', 'definition': 'x'})
+    server.access_log.flush()
+    lines = server.ACCESS_LOG_FILE.read_text(encoding='utf-8').splitlines()
+    records = [json.loads(line) for line in lines][-2:]
+    assert [(r['method'], r['route'], r['status']) for r in records] == [('GET', '/api/terms', 200), ('POST', '/api/terms', 201)]
+    assert records[0]['query'] == 'q=x' and records[1]['request_bytes'] > 0
+    assert all(r['duration_ms'] >= 0 and r['time'].endswith('Z') for r in records)
+
+
+def test_memory_endpoints(client, monkeypatch):
+    assert client.get('/api/admin/memory').status_code == 404
+    monkeypatch.setitem(server.app.config, 'MEMORY_DEBUG', True)
+    client.post('/api/terms', json={'term': 'heap', 'definition': 'memory', 'tags': 'A'})
+    report = client.get('/api/admin/memory').get_json()
+    assert report['collections']['terms']['records'] == 1
+    assert report['collections']['terms']['bytes'] > 0
+    assert set(report['caches']) == {'links', 'clauses', 'phash', 'index_page', 'metrics'}
+
+    assert client.post('/api/admin/memory/tracemalloc', json={'action': 'snapshot', 'name': 'a'}).status_code == 409
+    try:
+        assert client.post('/api/admin/memory/tracemalloc', json={'action': 'start'}).get_json()['tracing']
+        client.post('/api/admin/memory/tracemalloc', json={'action': 'snapshot', 'name': 'a'})
+        client.get('/api/terms')
+        client.post('/api/admin/memory/tracemalloc', json={'action': 'snapshot', 'name': 'b'})
+        out = client.get('/api/admin/memory/tracemalloc?top=b&diff=a,b&limit=3').get_json()
+        assert out['snapshots'] == ['a', 'b'] and len(out['top']) <= 3 and 'size_diff_bytes' in out['diff'][0]
+        assert client.get('/api/admin/memory/tracemalloc?top=nope').status_code == 404
+    finally:
+        client.post('/api/admin/memory/tracemalloc', json={'action': 'stop'})
+
+
+def test_caches_follow_writes_from_other_processes(client):
+    client.post('/api/terms', json={'term': 'telemetry', 'definition': 'data sent down'})
+    client.post('/api/terms', json={'term': 'ground segment', 'definition': 'receives telemetry'})
+    assert len(client.get('/api/terms/links').get_json()) == 2
+    # another worker rewrites the file within the same mtime tick
+    stat = server.USER_FILE.stat()
+    items = json.loads(server.USER_FILE.read_text(encoding='utf-8'))
+    server.USER_FILE.write_text(json.dumps(items[:1]), encoding='utf-8')
+    os.utime(server.USER_FILE, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert len(client.get('/api/terms/links').get_json()) == 2  # stale, nothing says otherwise
+    data_lock.bump_version(server.USER_FILE)
+    assert client.get('/api/terms/links').get_json() == {}
+
+
+def test_create_app(tmp_path, monkeypatch):
+    for name in ('DATA_DIR', 'USER_FILE', 'BASE_FILE', 'IMAGES_DIR', 'IMAGES_FILE', 'EQUATIONS_FILE', 'REFERENCES_FILE',
+                 'METHODS_FILE', 'BACKUPS_DIR', 'TILES_DIR', 'PROFILES_DIR', 'SLOW_LOG_FILE', 'ACCESS_LOG_FILE'):
+        monkeypatch.setattr(server, name, getattr(server, name))
+    for name in ('path', 'threshold'):
+        monkeypatch.setattr(server.slow_log, name, getattr(server.slow_log, name))
+    monkeypatch.setattr(server.access_log, 'path', server.access_log.path)
+    monkeypatch.setitem(server.app.config, 'PROFILING', False)
+    monkeypatch.setitem(server.app.config, 'SLOW_REQUEST_SECONDS', server.app.config['SLOW_REQUEST_SECONDS'])
+    app = server.create_app({'DATA_DIR': tmp_path / 'd', 'PROFILING': True, 'SLOW_REQUEST_SECONDS': 5})
+    assert app is server.app and app.config['PROFILING']
+    assert server.USER_FILE == tmp_path / 'd' / 'glossary_user.json'
+    # the logs are bound once, not per request
+    assert server.access_log.path == str(tmp_path / 'd' / 'logs' / 'requests.jsonl')
+    assert server.slow_log.path == str(tmp_path / 'd' / 'slow_requests.jsonl') and server.slow_log.threshold == 5
+    assert (tmp_path / 'd' / 'images').is_dir() and (tmp_path / 'd' / 'backups').is_dir()
+
+
+def test_precompressed_assets(client, tmp_path, monkeypatch):
+    from tools import build_assets
+    web = tmp_path / 'web'
+    web.mkdir()
+    (web / 'index.html').write_text('<link href="/web/styles.css"><script src="/web/app.js"></script>' + ' ' * 500)
+    (web / 'app.js').write_text('console.log("glossary");\n' * 200)
+    (web / 'styles.css').write_text('body { margin: 0 }\n' * 100)
+    monkeypatch.setattr(server, 'WEB_DIR', web)
+    # not built: served as is
+    resp = client.get('/web/app.js', headers={'Accept-Encoding': 'gzip'})
+    assert resp.status_code == 200 and 'Content-Encoding' not in resp.headers
+
+    manifest = build_assets.build(str(web))
+    app_js = manifest['app.js']['file']
+    index = client.get('/', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert index.headers['Content-Encoding'] == 'gzip' and index.headers['Cache-Control'] == 'no-cache'
+    html = gzip.decompress(index.get_data()).decode()
+    assert f'src="/web/{app_js}"' in html
+
+    resp = client.get(f'/web/{app_js}', headers={'Accept-Encoding': 'br;q=1, gzip;q=0.5'})
+    assert resp.headers['Content-Encoding'] == 'gzip'  # no brotli build here
+    assert resp.headers['Vary'] == 'Accept-Encoding' and 'immutable' in resp.headers['Cache-Control']
+    assert resp.headers['Content-Type'].startswith('text/javascript')
+    assert len(resp.get_data()) < manifest['app.js']['size'] / 5
+    etag = resp.headers['ETag']
+    assert client.get(f'/web/{app_js}', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag}).status_code == 304
+    plain = client.get(f'/web/{app_js}', headers={'Accept-Encoding': 'gzip;q=0'})
+    assert 'Content-Encoding' not in plain.headers and plain.headers['ETag'] != etag
+    assert plain.get_data() == (web / 'app.js').read_bytes()
+
+    # an edit after the build: freshness is checked when the manifest loads, so the
+    # build is served until the next one; in debug mode, the source at once
+    (web / 'app.js').write_text('console.log("edited");\n')
+    with monkeypatch.context() as m:
+        m.setattr(build_assets, 'is_fresh', lambda *a: pytest.fail('checked per request'))
+        assert client.get('/web/app.js', headers={'Accept-Encoding': 'gzip;q=0'}).get_data() == plain.get_data()
+    monkeypatch.setitem(server.app.config, 'DEBUG', True)
+    assert client.get('/web/app.js', headers={'Accept-Encoding': 'gzip'}).get_data() == b'console.log("edited");\n'
+    monkeypatch.setitem(server.app.config, 'DEBUG', False)
+    build_assets.build(str(web))
+    assert client.get('/web/app.js', headers={'Accept-Encoding': 'gzip;q=0'}).get_data() == b'console.log("edited");\n'
+
+
+def test_index_renders_first_page(client, tmp_path, monkeypatch):
+    web = tmp_path / 'web'
+    web.mkdir()
+    (web / 'index.html').write_text('<body><div id="tagFilterContainer"></div><div id="results"></div></body>')
+    monkeypatch.setattr(server, 'WEB_DIR', web)
+    client.post('/api/terms', json={'term': 'orbit', 'definition': 'path of a body', 'tags': ['mission']})
+    client.post('/api/terms', json={'term': 'Apogee', 'definition': 'farthest point of the orbit'})
+    resp = client.get('/')
+    html = resp.get_data(as_text=True)
+    assert resp.headers['Cache-Control'] == 'no-cache'
+    assert html.index('<h3>Apogee') < html.index('<h3>orbit')
+    assert '<button type="button" class="tagFilterBtn">mission</button>' in html
+    state = json.loads(html.split('type="application/json">', 1)[1].split('</script>', 1)[0])
+    # only the records of the first page; app.js fetches the rest, the index and the links
+    assert state == {'terms': sorted(client.get('/api/terms').get_json(), key=lambda it: it['term'].lower())}
+    assert client.get('/', headers={'If-None-Match': resp.headers['ETag']}).status_code == 304
+
+    # rendered again after a change
+    client.post('/api/terms', json={'term': 'Zenith', 'definition': 'point above'})
+    assert '<h3>Zenith' in client.get('/').get_data(as_text=True)
+
+
+def test_negotiate_encoding():
+    assert server.negotiate_encoding('gzip, deflate, br', {'br': 1, 'gzip': 2}) == 'br'
+    assert server.negotiate_encoding('br;q=0.1, gzip', {'br': 1, 'gzip': 2}) == 'gzip'
+    assert server.negotiate_encoding('*', {'gzip': 2}) == 'gzip'
+    assert server.negotiate_encoding('identity', {'gzip': 2}) is None
+    assert server.negotiate_encoding(None, {'gzip': 2}) is None
@@ -0,0 +1,30 @@
+import json
+import pathlib
+import sys
+import time
+
+repo = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(repo))
+
+from tools import slowlog
+
+
+def test_only_slow_requests_are_written(tmp_path):
+    path = tmp_path / 'slow.jsonl'
+    log = slowlog.SlowRequestLog(str(path), threshold=0.05, interval=0.005)
+    log.note('load', 'terms')  # outside a request: ignored
+    log.begin(route='/fast')
+    assert log.end(status=200) is None
+    assert not path.exists()
+
+    log.begin(route='/slow')
+    for _ in range(slowlog.MAX_OPERATIONS + 3):
+        log.note('load', 'terms', 0.001)
+    time.sleep(0.1)
+    record = log.end(status=200)
+    assert record['route'] == '/slow' and record['status'] == 200
+    assert len(record['operations']) == slowlog.MAX_OPERATIONS and record['operations_dropped'] == 3
+    assert record['operations'][0] == {'op': 'load', 'target': 'terms', 'ms': 1.0}
+    assert record['samples'] > 0
+    assert any('test_only_slow_requests_are_written (test_slowlog.py:' in s['stack'] for s in record['stacks'])
+    assert json.loads(path.read_text(encoding='utf-8')) == record
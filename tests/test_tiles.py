@@ -0,0 +1,30 @@
+import pathlib
+import sys
+
+# ensure repo import works
+repo = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(repo))
+
+from tools import png_codec, tiles
+
+
+def test_pyramid_of_palette_image_with_odd_size(tmp_path):
+    # 1-bit palette image: black/white vertical stripes, 3 x 5 pixels
+    header = png_codec.Header(3, 5, 1, 3, 0)
+    rows = [bytes([0b01000000])] * 5
+    palette = [(b'PLTE', b'\x00\x00\x00\xff\xff\xff')]
+    src = tmp_path / 'p.png'
+    src.write_bytes(png_codec.encode(header, rows, extra_chunks=palette))
+
+    info = tiles.build_pyramid(str(src), str(tmp_path / 'out'), tile_size=2)
+    assert info == {'width': 3, 'height': 5, 'tile_size': 2, 'levels': 3}
+    assert tiles.load_info(str(tmp_path / 'out')) == info
+
+    full = png_codec.decode((tmp_path / 'out' / '2' / '0_0.png').read_bytes())[1]
+    assert full[0] == b'\x00\x00\x00\xff' + b'\xff\xff\xff\xff'
+    # level 1 is 2 x 3: first pixel averages black and white
+    h1, rows1, _ = png_codec.decode((tmp_path / 'out' / '1' / '0_1.png').read_bytes())
+    assert (h1.width, h1.height) == (2, 1)
+    assert rows1[0][:4] == bytes([128, 128, 128, 255])
+    assert (tmp_path / 'out' / '0' / '0_0.png').exists()
+    assert not (tmp_path / 'out' / '2' / '2_0.png').exists()
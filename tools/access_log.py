@@ -0,0 +1,205 @@
+"""Structured access log written off the request path.
+
+`AccessLog.log(record)` puts a dict on a bounded queue and returns at once;
+when the queue is full the record is dropped and counted rather than
+making the request wait. A background thread wakes on the first record,
+takes everything queued behind it (up to `batch_size` records; under load
+batches grow while the previous one is being written) and appends them as
+JSON lines to `path` with a single write.
+
+The file is rotated when it grows past `max_bytes` or this process has
+been writing to it for more than `max_age` seconds: `requests.jsonl` becomes
+`requests.20240101_120000.jsonl` and only the newest `keep` rotated files
+are kept. Under `python -m tools.serve` each worker process calls
+`for_worker(n)` after the fork and writes `requests.w<n>.jsonl` instead, so
+no process ever rotates a file another one is appending to.
+
+  python -m tools.access_log data/logs/requests*.jsonl [--since 2024-01-01]
+
+summarises the history per route: request counts, error counts, p50/p95
+latency and bytes.
+"""
+import argparse
+import atexit
+import glob
+import json
+import math
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+_STOP = object()
+
+
+class AccessLog:
+    def __init__(self, path, max_bytes=10 * 1024 * 1024, max_age=24 * 3600, keep=10,
+                 queue_size=10000, batch_size=500):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.keep = keep
+        self.batch_size = batch_size
+        self.dropped = 0
+        self.write_errors = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._opened = None  # (path, time the current file was started)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_writer(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='access-log-writer', daemon=True)
+                    self._thread.start()
+                    atexit.register(self.close)
+
+    def for_worker(self, n):
+        """Write to this worker's own file, `<stem>.w<n><ext>`; call in the worker right after fork."""
+        stem, ext = os.path.splitext(self.path)
+        self.path = f'{stem}.w{n}{ext}'
+        # the parent's writer thread (if any) did not survive the fork
+        self._queue = queue.Queue(maxsize=self._queue.maxsize)
+        self._opened = None
+        self._thread = None
+
+    def log(self, record):
+        """Queue `record` for writing; never blocks. False when it had to be dropped."""
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            batch = [] if first is _STOP else [first]
+            stop = first is _STOP
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+            if batch:
+                self._write(batch)
+            for _ in range(len(batch) + (1 if stop else 0)):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batch):
+        path = self.path
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._maybe_rotate(path)
+            lines = ''.join(json.dumps(r, ensure_ascii=False, default=str) + '\n' for r in batch)
+            with open(path, 'a', encoding='utf-8') as fh:
+                fh.write(lines)
+        except OSError:
+            self.write_errors += 1
+
+    def _maybe_rotate(self, path):
+        now = time.time()
+        if self._opened is None or self._opened[0] != path or not os.path.exists(path):
+            self._opened = (path, now)
+            return
+        size = os.path.getsize(path)
+        if size == 0 or (size < self.max_bytes and now - self._opened[1] < self.max_age):
+            return
+        stem, ext = os.path.splitext(path)
+        stamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+        target = f'{stem}.{stamp}{ext}'
+        n = 1
+        while os.path.exists(target):
+            target = f'{stem}.{stamp}_{n}{ext}'
+            n += 1
+        os.replace(path, target)
+        self._opened = (path, now)
+        for old in rotated_files(path)[:-self.keep] if self.keep else ():
+            try:
+                os.unlink(old)
+            except FileNotFoundError:
+                pass
+
+    def flush(self):
+        """Block until every queued record has been written (tests, shutdown)."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        self._thread = None
+
+
+def rotated_files(path):
+    """Rotated siblings of `path`, oldest first (not the `.w<n>` files of the workers)."""
+    stem, ext = os.path.splitext(path)
+    return sorted(glob.glob(glob.escape(stem) + '.[0-9]*' + ext), key=lambda p: (os.path.getmtime(p), p))
+
+
+def iter_records(paths, since=None):
+    for path in paths:
+        with open(path, encoding='utf-8') as fh:
+            for line in fh:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if since and record.get('time', '') < since:
+                    continue
+                yield record
+
+
+def summarize(records):
+    """{route: {requests, errors, p50_ms, p95_ms, request_bytes, response_bytes}}."""
+    routes = {}
+    for r in records:
+        key = f"{r.get('method')} {r.get('route') or r.get('path')}"
+        s = routes.setdefault(key, {'requests': 0, 'errors': 0, 'durations': [],
+                                    'request_bytes': 0, 'response_bytes': 0})
+        s['requests'] += 1
+        if (r.get('status') or 0) >= 500:
+            s['errors'] += 1
+        s['durations'].append(r.get('duration_ms') or 0.0)
+        s['request_bytes'] += r.get('request_bytes') or 0
+        s['response_bytes'] += r.get('response_bytes') or 0
+    out = {}
+    for key, s in sorted(routes.items()):
+        durations = sorted(s.pop('durations'))
+        s['p50_ms'] = durations[max(1, math.ceil(0.50 * len(durations))) - 1]
+        s['p95_ms'] = durations[max(1, math.ceil(0.95 * len(durations))) - 1]
+        out[key] = s
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Summarise access log files per route.')
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--since', help='ISO timestamp, e.g. 2024-01-01 or 2024-01-01T12:00')
+    parser.add_argument('--json', action='store_true', help='print the summary as JSON')
+    args = parser.parse_args(argv)
+    summary = summarize(iter_records(args.files, args.since))
+    if args.json:
+        json.dump(summary, sys.stdout, indent=2)
+        print()
+        return 0
+    print(f"{'route':<40} {'requests':>9} {'5xx':>6} {'p50 ms':>9} {'p95 ms':>9} {'bytes out':>12}")
+    for key, s in summary.items():
+        print(f"{key:<40} {s['requests']:>9} {s['errors']:>6} {s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} {s['response_bytes']:>12}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
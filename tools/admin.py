@@ -0,0 +1,525 @@
+#!/usr/bin/env python3
+"""Offline maintenance of the data directory, without going through HTTP.
+
+Each command works on the JSON files the server uses, under the same
+per-collection file locks (`tools.data_lock`), so it is safe to run while
+the server is up. Records are streamed from and to disk; progress goes to
+stderr.
+
+Collections: terms, images, equations, references, methods.
+
+  python -m tools.admin export terms --format csv -o terms.csv
+  python -m tools.admin import terms ecss.jsonl [--mode upsert|append|replace]
+  python -m tools.admin reindex
+  python -m tools.admin compact-backups [--keep 10]
+  python -m tools.admin migrate
+  python -m tools.admin verify
+
+`--data-dir` selects another data directory (default: data/ next to server.py).
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import data_lock, phash, search_index
+from tools.json_stream import iter_json_array, write_json_array, write_jsonl
+from tools.merge_glossary import to_user_schema
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# collection -> (server path global, required fields, CSV columns)
+COLLECTIONS = {
+    'terms': ('USER_FILE', ('term', 'definition'),
+              ('id', 'term', 'abbreviation', 'definition', 'tags', 'created_at', 'updated_at')),
+    'images': ('IMAGES_FILE', ('filename',),
+               ('id', 'title', 'filename', 'original', 'uploaded_at', 'tags', 'size', 'phash')),
+    'equations': ('EQUATIONS_FILE', ('name', 'content'),
+                  ('id', 'name', 'content', 'description', 'tags', 'created_at', 'updated_at')),
+    'references': ('REFERENCES_FILE', ('title', 'type', 'author'),
+                   ('id', 'title', 'type', 'author', 'description', 'url', 'tags', 'created_at', 'updated_at')),
+    'methods': ('METHODS_FILE', ('title', 'definition'),
+                ('id', 'title', 'definition', 'key_components', 'procedure', 'success_factors', 'created_at', 'updated_at')),
+}
+
+# List fields and the separator their CSV cells use (the server splits the
+# same way when given a string).
+LIST_FIELDS = {'tags': ',', 'key_components': '\n', 'procedure': '\n', 'success_factors': '\n'}
+
+FORMATS = ('json', 'jsonl', 'csv')
+
+_BACKUP_NAME = re.compile(r'^(?P<stem>.+)_(?P<stamp>\d{8}_\d{6})(?P<suffix>\.[^.]+)$')
+
+
+class Progress:
+    """Record counter printed to stderr at most every `interval` seconds."""
+
+    def __init__(self, label, enabled=True, interval=0.5):
+        self.label = label
+        self.enabled = enabled
+        self.interval = interval
+        self.count = 0
+        self.start = self.last = time.perf_counter()
+
+    def tick(self, n=1):
+        self.count += n
+        if self.enabled and sys.stderr.isatty():
+            now = time.perf_counter()
+            if now - self.last >= self.interval:
+                self.last = now
+                print(f'\r{self.label}: {self.count} records', end='', file=sys.stderr, flush=True)
+
+    def wrap(self, items):
+        for item in items:
+            self.tick()
+            yield item
+
+    def done(self, detail=''):
+        if self.enabled:
+            elapsed = time.perf_counter() - self.start
+            rate = self.count / elapsed if elapsed > 0 else 0
+            print(f'\r{self.label}: {self.count} records in {elapsed:.2f}s ({rate:.0f}/s){detail}', file=sys.stderr)
+
+
+def open_data_dir(data_dir=None):
+    """Import the server module with its paths pointed at `data_dir`."""
+    import server
+    server.set_data_dir(data_dir or os.path.join(REPO_ROOT, 'data'))
+    server.ensure_data_dirs()
+    return server
+
+
+def collection_path(server, name):
+    return getattr(server, COLLECTIONS[name][0])
+
+
+def iter_collection(path):
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return iter(())
+    return iter_json_array(str(path))
+
+
+def write_collection(path, items):
+    """Stream `items` to `path` atomically; return the number written."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as out:
+            count = write_json_array(items, out, flush_every=1000)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    data_lock.bump_version(path)
+    return count
+
+
+def _format_of(path, fmt):
+    if fmt:
+        return fmt
+    ext = os.path.splitext(path)[1].lower().lstrip('.')
+    return ext if ext in FORMATS else 'json'
+
+
+# records ---------------------------------------------------------------------
+
+def _split_list(value, sep):
+    if isinstance(value, list):
+        return [str(v).strip() for v in value if str(v).strip()]
+    if isinstance(value, str):
+        try:
+            parsed = json.loads(value)
+            if isinstance(parsed, list):
+                return [str(v).strip() for v in parsed if str(v).strip()]
+        except ValueError:
+            pass
+        return [v.strip() for v in value.split(sep) if v.strip()]
+    return []
+
+
+def normalize(name, record, now=None):
+    """Return `record` in the collection's current schema, or raise ValueError."""
+    required = COLLECTIONS[name][1]
+    rec = {k: v for k, v in record.items() if k is not None}
+    if name == 'terms':
+        rec = to_user_schema(rec)
+    for field in required:
+        value = rec.get(field)
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f'missing {field}')
+    for field, sep in LIST_FIELDS.items():
+        if field in rec or field in COLLECTIONS[name][2]:
+            rec[field] = _split_list(rec.get(field), sep)
+    if name == 'images' and isinstance(rec.get('size'), str) and rec['size'].isdigit():
+        rec['size'] = int(rec['size'])
+    if not rec.get('id'):
+        rec['id'] = str(uuid.uuid4())
+    if name != 'images':
+        now = now or datetime.utcnow().isoformat() + 'Z'
+        rec['created_at'] = rec.get('created_at') or now
+        rec['updated_at'] = rec.get('updated_at') or rec['created_at']
+    return {k: v for k, v in rec.items() if v is not None}
+
+
+def read_records(path, fmt):
+    """Yield (line or position, record) from a CSV, JSON or JSONL file ('-' = stdin)."""
+    if fmt == 'json':
+        yield from enumerate(json.load(sys.stdin) if path == '-' else iter_json_array(path), 1)
+        return
+    fh = sys.stdin if path == '-' else open(path, encoding='utf-8', newline='')
+    try:
+        if fmt == 'csv':
+            reader = csv.DictReader(fh)
+            for row in reader:
+                yield reader.line_num, {k: v for k, v in row.items() if v != ''}
+        else:
+            for n, line in enumerate(fh, 1):
+                if line.strip():
+                    yield n, json.loads(line)
+    finally:
+        if fh is not sys.stdin:
+            fh.close()
+
+
+def _csv_cell(field, value):
+    if field in LIST_FIELDS and isinstance(value, list):
+        return (LIST_FIELDS[field] + (' ' if LIST_FIELDS[field] == ',' else '')).join(str(v) for v in value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return '' if value is None else value
+
+
+# commands --------------------------------------------------------------------
+
+def cmd_export(server, args):
+    path = collection_path(server, args.collection)
+    fmt = args.format or (_format_of(args.output, None) if args.output and args.output != '-' else 'json')
+    out = sys.stdout if not args.output or args.output == '-' else open(args.output, 'w', encoding='utf-8', newline='')
+    progress = Progress(f'export {args.collection}', not args.quiet)
+    try:
+        with data_lock.locked(path):
+            items = progress.wrap(iter_collection(path))
+            if fmt == 'csv':
+                columns = COLLECTIONS[args.collection][2]
+                writer = csv.writer(out, lineterminator='\n')
+                writer.writerow(columns)
+                for item in items:
+                    writer.writerow([_csv_cell(c, item.get(c)) for c in columns])
+            elif fmt == 'jsonl':
+                write_jsonl(items, out, flush_every=1000)
+            else:
+                write_json_array(items, out, flush_every=1000)
+                out.write('\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    progress.done()
+    return 0
+
+
+def cmd_import(server, args):
+    name = args.collection
+    path = collection_path(server, name)
+    fmt = _format_of(args.input, args.format) if args.input != '-' else (args.format or 'jsonl')
+    progress = Progress(f'import {name}', not args.quiet)
+    rejected = []
+    now = datetime.utcnow().isoformat() + 'Z'
+
+    def incoming():
+        for where, record in read_records(args.input, fmt):
+            progress.tick()
+            try:
+                yield normalize(name, record, now)
+            except (ValueError, AttributeError) as e:
+                rejected.append((where, str(e)))
+
+    with data_lock.locked(path):
+        server.backup_file(path)
+        if args.mode == 'replace':
+            written = write_collection(path, incoming())
+        elif args.mode == 'append':
+            # only the ids are held in memory
+            ids = {item.get('id') for item in iter_collection(path)}
+
+            def new_records():
+                for rec in incoming():
+                    if rec['id'] in ids:
+                        rejected.append((rec['id'], 'duplicate id'))
+                        continue
+                    ids.add(rec['id'])
+                    yield rec
+            written = write_collection(path, _chain(iter_collection(path), new_records()))
+        else:
+            # upsert: imported records replace existing ones with the same id.
+            # They are spilled to a scratch file indexed by id, so only the
+            # ids and their offsets are held in memory.
+            with tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(path))) as spill:
+                offsets = _spill(incoming(), spill)
+
+                def merged():
+                    for item in iter_collection(path):
+                        offset = offsets.pop(item.get('id'), None)
+                        yield item if offset is None else _read_spilled(spill, offset)
+                    for offset in offsets.values():
+                        yield _read_spilled(spill, offset)
+                written = write_collection(path, merged())
+    progress.done(f', {len(rejected)} rejected')
+    for where, reason in rejected[:20]:
+        print(f'  record {where}: {reason}', file=sys.stderr)
+    print(f'{path}: {written} records')
+    return 1 if rejected and args.strict else 0
+
+
+def _spill(records, fh):
+    """Write `records` as JSON lines to the binary file `fh`; return {id: offset}.
+
+    The last record of an id wins; ids keep the order of their first record.
+    """
+    offsets = {}
+    for rec in records:
+        offsets[rec['id']] = fh.tell()
+        fh.write(json.dumps(rec, ensure_ascii=False).encode('utf-8') + b'\n')
+    return offsets
+
+
+def _read_spilled(fh, offset):
+    fh.seek(offset)
+    return json.loads(fh.readline())
+
+
+def _chain(*iterables):
+    for it in iterables:
+        yield from it
+
+
+def cmd_reindex(server, args):
+    user_file = server.USER_FILE
+    with data_lock.locked(user_file):
+        if user_file.exists():
+            search_index.write_artefacts(str(user_file))
+            print(f'Indexed {user_file}')
+    base = server.BASE_FILE
+    with data_lock.locked(base):
+        if base.exists():
+            search_index.write_artefacts(str(base))
+            print(f'Indexed {base}')
+
+    images_file = server.IMAGES_FILE
+    progress = Progress('reindex images', not args.quiet)
+    # hash without the lock: decoding is slow, and uploads would wait for it
+    hashes = {}
+    for meta in progress.wrap(iter_collection(images_file)):
+        fn = meta.get('filename') or ''
+        if not meta.get('phash') and meta.get('id') and fn.lower().endswith('.png') and (server.IMAGES_DIR / fn).exists():
+            try:
+                hashes[meta['id']] = phash.dhash_file(str(server.IMAGES_DIR / fn))
+            except Exception as e:
+                print(f'Warning: could not hash {fn} - {e}', file=sys.stderr)
+    hashed = 0
+
+    def with_phash(items):
+        nonlocal hashed
+        for meta in items:
+            h = hashes.get(meta.get('id'))
+            if h and not meta.get('phash'):
+                meta['phash'] = h
+                hashed += 1
+            yield meta
+
+    if hashes:
+        with data_lock.locked(images_file):
+            server.backup_file(images_file)
+            write_collection(images_file, with_phash(iter_collection(images_file)))
+    progress.done(f', {hashed} perceptual hashes added')
+    return 0
+
+
+def _file_digest(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def cmd_compact_backups(server, args):
+    groups = {}
+    for p in sorted(server.BACKUPS_DIR.iterdir()):
+        m = _BACKUP_NAME.match(p.name)
+        if m and p.is_file():
+            groups.setdefault((m.group('stem'), m.group('suffix')), []).append(p)
+    removed = freed = 0
+    for (stem, suffix), backups in groups.items():
+        with data_lock.locked(server.DATA_DIR / f'{stem}{suffix}'):
+            drop = []
+            keep = []
+            previous = None
+            # oldest first: of consecutive identical backups only the newest is kept
+            for p in backups:
+                digest = _file_digest(p)
+                if digest == previous:
+                    drop.append(keep.pop())
+                keep.append(p)
+                previous = digest
+            drop.extend(keep[:-args.keep] if args.keep else keep)
+            for p in drop:
+                freed += p.stat().st_size
+                p.unlink()
+                removed += 1
+    print(f'Removed {removed} backups ({freed / 1024:.0f} KiB) from {server.BACKUPS_DIR}')
+    return 0
+
+
+def cmd_migrate(server, args):
+    changed = []
+    for name in COLLECTIONS:
+        path = collection_path(server, name)
+        if not path.exists():
+            continue
+        progress = Progress(f'migrate {name}', not args.quiet)
+        with data_lock.locked(path):
+            before = _file_digest(path)
+            rejected = []
+
+            def migrated():
+                for n, item in enumerate(progress.wrap(iter_collection(path)), 1):
+                    try:
+                        yield normalize(name, item)
+                    except (ValueError, AttributeError) as e:
+                        rejected.append(n)
+                        yield item
+            fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as out:
+                    write_json_array(migrated(), out)
+                if _file_digest(tmp_path) != before:
+                    server.backup_file(path)
+                    os.chmod(tmp_path, 0o644)
+                    os.replace(tmp_path, path)
+                    data_lock.bump_version(path)
+                    changed.append(name)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+        progress.done(f', {len(rejected)} left as-is (invalid)' if rejected else '')
+    print(f"Migrated: {', '.join(changed) or 'nothing to do'}")
+    return 0
+
+
+def verify(server, quiet=True):
+    """Return (errors, warnings) found in the data directory."""
+    errors = []
+    warnings = []
+    referenced = set()
+    for name, (_, required, _) in COLLECTIONS.items():
+        path = collection_path(server, name)
+        if not path.exists():
+            continue
+        progress = Progress(f'verify {name}', not quiet)
+        ids = set()
+        try:
+            for n, item in enumerate(progress.wrap(iter_collection(path)), 1):
+                if not isinstance(item, dict):
+                    errors.append(f'{name}: record {n} is not an object')
+                    continue
+                item_id = item.get('id')
+                if not item_id:
+                    errors.append(f'{name}: record {n} has no id')
+                elif item_id in ids:
+                    errors.append(f'{name}: duplicate id {item_id}')
+                ids.add(item_id)
+                for field in required:
+                    if not isinstance(item.get(field), str) or not item[field].strip():
+                        errors.append(f'{name}: {item_id or n} has no {field}')
+                for field in LIST_FIELDS:
+                    if field in item and not isinstance(item[field], list):
+                        errors.append(f'{name}: {item_id or n} has a non-list {field}')
+                if name == 'images' and item.get('filename'):
+                    referenced.add(item['filename'])
+                    f = server.IMAGES_DIR / item['filename']
+                    if not f.exists():
+                        errors.append(f'images: {item_id} file missing: {item["filename"]}')
+                    elif isinstance(item.get('size'), int) and f.stat().st_size != item['size']:
+                        warnings.append(f'images: {item_id} size {f.stat().st_size} != recorded {item["size"]}')
+        except ValueError as e:
+            errors.append(f'{name}: invalid JSON - {e}')
+        progress.done()
+        if name == 'terms' and not search_index.artefacts_fresh(str(path)):
+            warnings.append('terms: search artefacts are missing or stale (run reindex)')
+    if server.IMAGES_DIR.exists():
+        for root, _, files in os.walk(server.IMAGES_DIR):
+            for fn in files:
+                rel = os.path.relpath(os.path.join(root, fn), server.IMAGES_DIR).replace(os.sep, '/')
+                if rel not in referenced:
+                    warnings.append(f'images: orphan file {rel}')
+    return errors, warnings
+
+
+def cmd_verify(server, args):
+    errors, warnings = verify(server, args.quiet)
+    for w in warnings:
+        print(f'warning: {w}')
+    for e in errors:
+        print(f'error: {e}')
+    print(f'{len(errors)} error(s), {len(warnings)} warning(s)')
+    return 1 if errors else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m tools.admin', description='Offline maintenance of the data directory.')
+    parser.add_argument('--data-dir', help='data directory (default: data/ next to server.py)')
+    parser.add_argument('-q', '--quiet', action='store_true', help='no progress output')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('export', help='write a collection as JSON, JSONL or CSV')
+    p.add_argument('collection', choices=COLLECTIONS)
+    p.add_argument('-o', '--output', help="output file (default: '-' for stdout)")
+    p.add_argument('--format', choices=FORMATS, help='default: from the output extension, else json')
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser('import', help='load JSON, JSONL or CSV records into a collection')
+    p.add_argument('collection', choices=COLLECTIONS)
+    p.add_argument('input', help="input file, or '-' for stdin")
+    p.add_argument('--format', choices=FORMATS, help='default: from the input extension')
+    p.add_argument('--mode', choices=('upsert', 'append', 'replace'), default='upsert',
+                   help='upsert replaces records with the same id (default)')
+    p.add_argument('--strict', action='store_true', help='exit with status 1 if any record was rejected')
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser('reindex', help='rebuild search artefacts and missing perceptual hashes')
+    p.set_defaults(func=cmd_reindex)
+
+    p = sub.add_parser('compact-backups', help='drop duplicate backups and keep the most recent ones')
+    p.add_argument('--keep', type=int, help='backups kept per collection (default: the server setting)')
+    p.set_defaults(func=cmd_compact_backups)
+
+    p = sub.add_parser('migrate', help='bring every collection to the current schema')
+    p.set_defaults(func=cmd_migrate)
+
+    p = sub.add_parser('verify', help='check the integrity of the data directory')
+    p.set_defaults(func=cmd_verify)
+
+    args = parser.parse_args(argv)
+    server = open_data_dir(args.data_dir)
+    if getattr(args, 'keep', 0) is None:
+        args.keep = server.MAX_BACKUPS
+    try:
+        return args.func(server, args)
+    except BrokenPipeError:
+        # stdout piped into e.g. `head`
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""Fingerprint and pre-compress the web UI for the server.
+
+For every file under `web/` this writes into `web/dist/`:
+
+- `<name>.<hash>.<ext>`: the file under a content-hashed name, so it can be
+  cached forever (`Cache-Control: immutable`);
+- the same with `.gz` (gzip -9) and, when the `brotli` module is installed,
+  `.br` (quality 11), kept only when smaller than the original;
+- HTML pages under their own name, with `/web/...` references rewritten to
+  the hashed names;
+- `manifest.json`: source name -> hashed file, ETag, available encodings and
+  the source's size and mtime (so the server can tell a stale build).
+
+The server picks a variant from `Accept-Encoding` and never compresses at
+request time. Without a build (or with a stale one) it serves `web/` as is;
+freshness is checked when the manifest is loaded (on every request in debug
+mode), so rebuild after editing `web/`.
+
+  python -m tools.build_assets [--web-dir web]
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+WEB_DIR = os.path.join(REPO_ROOT, 'web')
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+COMPRESSIBLE = {'.html', '.js', '.css', '.svg', '.json', '.txt', '.map', '.ttf', '.otf', '.eot'}
+HASH_LENGTH = 12
+
+_REFERENCE = re.compile(r'''(["'(])/web/([^"'()?#\s]+)''')
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def hashed_name(rel, digest):
+    stem, ext = os.path.splitext(rel)
+    return f'{stem}.{digest}{ext}'
+
+
+def compress(data, encoding):
+    if encoding == 'gzip':
+        # mtime=0: identical input gives identical output
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    raise ValueError(encoding)
+
+
+def encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def _sources(web_dir):
+    for root, dirs, files in os.walk(web_dir):
+        if root == web_dir:
+            dirs[:] = [d for d in dirs if d != DIST]
+        dirs.sort()
+        for fn in sorted(files):
+            if not fn.startswith('.'):
+                path = os.path.join(root, fn)
+                yield os.path.relpath(path, web_dir).replace(os.sep, '/'), path
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def build(web_dir=WEB_DIR, log=None):
+    """Build `web_dir/dist`; return the manifest."""
+    out_dir = os.path.join(web_dir, DIST)
+    sources = list(_sources(web_dir))
+    pages = [(rel, path) for rel, path in sources if rel.endswith('.html')]
+    assets = [(rel, path) for rel, path in sources if not rel.endswith('.html')]
+    manifest = {}
+    urls = {}
+
+    def emit(rel, path, data, fingerprinted):
+        digest = content_hash(data)
+        name = hashed_name(rel, digest) if fingerprinted else rel
+        _write(os.path.join(out_dir, name), data)
+        variants = {}
+        if os.path.splitext(rel)[1].lower() in COMPRESSIBLE:
+            for enc in encodings():
+                packed = compress(data, enc)
+                if len(packed) < len(data):
+                    _write(os.path.join(out_dir, f"{name}.{'br' if enc == 'br' else 'gz'}"), packed)
+                    variants[enc] = len(packed)
+        st = os.stat(path)
+        manifest[rel] = {'file': name, 'etag': digest, 'size': len(data), 'encodings': variants,
+                         'fingerprinted': fingerprinted, 'source_size': st.st_size, 'source_mtime_ns': st.st_mtime_ns}
+        urls[rel] = name
+        if log:
+            sizes = ', '.join(f'{enc} {n}' for enc, n in variants.items())
+            log(f'{rel} -> {name} ({len(data)} bytes{", " + sizes if sizes else ""})')
+
+    for rel, path in assets:
+        with open(path, 'rb') as fh:
+            emit(rel, path, fh.read(), True)
+    for rel, path in pages:
+        with open(path, encoding='utf-8') as fh:
+            html = fh.read()
+        html = _REFERENCE.sub(lambda m: f'{m.group(1)}/web/{urls.get(m.group(2), m.group(2))}', html)
+        emit(rel, path, html.encode('utf-8'), False)
+
+    _write(os.path.join(out_dir, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    _prune(out_dir, manifest)
+    return manifest
+
+
+def _prune(out_dir, manifest):
+    """Remove files of earlier builds."""
+    keep = {MANIFEST}
+    for entry in manifest.values():
+        keep.add(entry['file'])
+        keep.update(f"{entry['file']}.{'br' if enc == 'br' else 'gz'}" for enc in entry['encodings'])
+    for root, _, files in os.walk(out_dir):
+        for fn in files:
+            rel = os.path.relpath(os.path.join(root, fn), out_dir).replace(os.sep, '/')
+            if rel not in keep:
+                os.unlink(os.path.join(root, fn))
+
+
+def load_manifest(web_dir=WEB_DIR):
+    """The manifest of the last build, or None when there is none."""
+    try:
+        with open(os.path.join(web_dir, DIST, MANIFEST), encoding='utf-8') as fh:
+            return json.load(fh)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def is_fresh(manifest, web_dir=WEB_DIR):
+    """True when no source file was added, changed or removed since the build."""
+    seen = 0
+    for rel, path in _sources(web_dir):
+        entry = manifest.get(rel)
+        if entry is None:
+            return False
+        st = os.stat(path)
+        if (st.st_size, st.st_mtime_ns) != (entry['source_size'], entry['source_mtime_ns']):
+            return False
+        seen += 1
+    return seen == len(manifest)
+
+
+def clean(web_dir=WEB_DIR):
+    shutil.rmtree(os.path.join(web_dir, DIST), ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fingerprint and pre-compress the web UI.')
+    parser.add_argument('--web-dir', default=WEB_DIR)
+    parser.add_argument('--clean', action='store_true', help='remove the build instead')
+    args = parser.parse_args(argv)
+    if args.clean:
+        clean(args.web_dir)
+        return 0
+    if brotli is None:
+        print('brotli is not installed: gzip variants only (pip install brotli)', file=sys.stderr)
+    manifest = build(args.web_dir, log=print)
+    total = sum(e['size'] for e in manifest.values())
+    packed = sum(min([e['size']] + list(e['encodings'].values())) for e in manifest.values())
+    print(f'{len(manifest)} files, {total} bytes, {packed} bytes compressed')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
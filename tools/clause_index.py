@@ -0,0 +1,104 @@
+"""Sorted index of glossary entries by ECSS clause number.
+
+Clause identifiers (`2.2.1`, `2.3.57`) are parsed once into tuples of
+ints, so `2.3.9` sorts before `2.3.10`, and kept in one sorted list. Every
+lookup is a binary search:
+
+- `prefix((2, 3))`: all entries of clause 2.3, in clause order;
+- `between((2, 3, 10), (2, 3, 20))`: an inclusive range;
+- `neighbours((2, 3, 57), 2)`: the entries just before and after;
+- `children((2,))`: the sub-clauses directly under a clause, with counts.
+
+Abbreviations are left out: their identifiers in the base glossary are row
+numbers of the abbreviation table, not clause numbers.
+"""
+import re
+from bisect import bisect_left, bisect_right
+
+ABBREVIATION_TYPE = 'Abréviation'
+
+_CLAUSE = re.compile(r'^\d+(?:\.\d+)*$')
+
+
+def clause_key(ident):
+    """`'2.3.57'` -> `(2, 3, 57)`; None when `ident` is not a clause number."""
+    ident = (ident or '').strip().rstrip('.')
+    if not _CLAUSE.match(ident):
+        return None
+    return tuple(int(part) for part in ident.split('.'))
+
+
+def clause_str(key):
+    return '.'.join(str(n) for n in key)
+
+
+def _after(prefix):
+    # smallest key greater than every key starting with `prefix`
+    return prefix[:-1] + (prefix[-1] + 1,)
+
+
+class ClauseIndex:
+    def __init__(self, entries):
+        keyed = []
+        for entry in entries:
+            if entry.get('type') == ABBREVIATION_TYPE:
+                continue
+            key = clause_key(entry.get('id'))
+            if key is not None:
+                keyed.append((key, entry))
+        keyed.sort(key=lambda pair: pair[0])
+        self.keys = [key for key, _ in keyed]
+        self.entries = [entry for _, entry in keyed]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _span(self, prefix):
+        if not prefix:
+            return 0, len(self.keys)
+        return bisect_left(self.keys, prefix), bisect_left(self.keys, _after(prefix))
+
+    def prefix(self, prefix, offset=0, limit=None):
+        """(total, entries) of the clause `prefix` and its sub-clauses."""
+        lo, hi = self._span(prefix)
+        start = lo + offset
+        stop = hi if limit is None else min(hi, start + limit)
+        return hi - lo, self.entries[start:stop]
+
+    def between(self, first, last=None):
+        """Entries with `first` <= clause <= `last` (sub-clauses of `last` included;
+        no `last` means up to the end)."""
+        stop = len(self.keys) if last is None else bisect_left(self.keys, _after(last))
+        return self.entries[bisect_left(self.keys, first):stop]
+
+    def find(self, key):
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return i
+        return None
+
+    def neighbours(self, key, count=1):
+        """(previous entries, next entries) around `key`, nearest last / first.
+
+        `key` does not have to exist; the entries around its position are returned.
+        """
+        lo = bisect_left(self.keys, key)
+        hi = bisect_right(self.keys, key)
+        return self.entries[max(0, lo - count):lo], self.entries[hi:hi + count]
+
+    def children(self, prefix=()):
+        """[(sub-clause key, entry count)] directly under `prefix`, in order."""
+        lo, hi = self._span(prefix)
+        depth = len(prefix) + 1
+        out = []
+        i = lo
+        while i < hi:
+            key = self.keys[i]
+            if len(key) < depth:
+                i += 1
+                continue
+            child = key[:depth]
+            j = bisect_left(self.keys, _after(child), i, hi)
+            out.append((child, j - i))
+            i = j
+        return out
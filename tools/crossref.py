@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""Cross-references between glossary entries, found with an Aho-Corasick automaton.
+
+Every term and abbreviation is a pattern; each definition is scanned once
+and the mentions of other entries become links (`entry -> entries its
+definition mentions`), with the reverse `used by` lists kept alongside.
+
+- Terms match case- and accent-insensitively at word boundaries, with an
+  optional plural `s` (`components` links to `component`).
+- Abbreviations must match exactly (`IS` does not link every `is`).
+- Overlapping mentions resolve leftmost-longest: `space segment element`
+  links `space segment element` rather than `space segment`.
+
+`LinkGraph` is updated in place when an entry is added, edited or removed:
+only its own definition and the definitions that mention its old or new
+names (found through a word index) are rescanned.
+
+Usage:
+  python tools/crossref.py [data/glossary_user.json] [output.json]
+"""
+import argparse
+import json
+import os
+import sys
+import unicodedata
+from collections import deque
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.json_stream import iter_json_array
+
+# Names shorter than this (after trimming) are never linked.
+MIN_NAME_LENGTH = 2
+
+
+def _fold_char(c):
+    base = unicodedata.normalize('NFKD', c)[:1] or c
+    folded = base.lower()
+    return folded if len(folded) == 1 else c
+
+
+def fold(text):
+    """Lower-case and strip accents, one output character per input character
+    so that positions in the folded text are positions in `text`."""
+    return ''.join(_fold_char(c) for c in text)
+
+
+def _words(text):
+    """Folded words of `text`, plurals also given in the singular."""
+    word = []
+    for c in fold(text):
+        if c.isalnum():
+            word.append(c)
+        elif word:
+            yield from _forms(''.join(word))
+            word = []
+    if word:
+        yield from _forms(''.join(word))
+
+
+def _forms(word):
+    yield word
+    if len(word) > 3 and word.endswith('s'):
+        yield word[:-1]
+
+
+class Automaton:
+    """Aho-Corasick automaton over folded patterns, each with a list of payloads."""
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for pattern, payloads in patterns.items():
+            node = 0
+            for c in pattern:
+                nxt = self.goto[node].get(c)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][c] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                node = nxt
+            self.out[node].extend((len(pattern), p) for p in payloads)
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for c, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and c not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(c, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def finditer(self, folded):
+        """Yield (start, end, payload) for every pattern occurrence."""
+        node = 0
+        goto, fail, out = self.goto, self.fail, self.out
+        for i, c in enumerate(folded):
+            while node and c not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(c, 0)
+            for length, payload in out[node]:
+                yield i + 1 - length, i + 1, payload
+
+
+def names(item):
+    """(kind, name) pairs an entry can be mentioned by."""
+    out = []
+    for kind in ('term', 'abbreviation'):
+        value = (item.get(kind) or '').strip()
+        if len(value) >= MIN_NAME_LENGTH:
+            out.append((kind, value))
+    return out
+
+
+class LinkGraph:
+    """Outgoing and incoming links between the entries of a glossary."""
+
+    def __init__(self, items=()):
+        self.items = {}
+        self.outgoing = {}      # id -> [(target id, start, end)] in definition order
+        self.incoming = {}      # id -> set of ids whose definition links to it
+        self.words = {}         # word -> ids whose definition contains it
+        self.patterns = {}      # folded name -> [(kind, name, id)] in insertion order
+        self._automaton = None
+        for item in items:
+            self._register(item)
+        for item_id in self.items:
+            self._scan(item_id)
+
+    # names -----------------------------------------------------------------
+
+    def _add_names(self, item):
+        for kind, name in names(item):
+            self.patterns.setdefault(fold(name), []).append((kind, name, item['id']))
+        self._automaton = None
+
+    def _drop_names(self, item):
+        for kind, name in names(item):
+            key = fold(name)
+            left = [p for p in self.patterns.get(key, []) if p[2] != item['id']]
+            if left:
+                self.patterns[key] = left
+            else:
+                self.patterns.pop(key, None)
+        self._automaton = None
+
+    @property
+    def automaton(self):
+        # rebuilding costs the total length of the names, not of the definitions
+        if self._automaton is None:
+            self._automaton = Automaton(self.patterns)
+        return self._automaton
+
+    # definitions -----------------------------------------------------------
+
+    def _register(self, item):
+        item_id = item['id']
+        self.items[item_id] = item
+        self.incoming.setdefault(item_id, set())
+        for word in set(_words(item.get('definition') or '')):
+            self.words.setdefault(word, set()).add(item_id)
+        self._add_names(item)
+
+    def _unregister(self, item_id):
+        item = self.items.pop(item_id)
+        for word in set(_words(item.get('definition') or '')):
+            ids = self.words.get(word)
+            if ids:
+                ids.discard(item_id)
+                if not ids:
+                    del self.words[word]
+        self._drop_names(item)
+        self._set_outgoing(item_id, [])
+        del self.outgoing[item_id]
+        return item
+
+    def find_links(self, text, exclude=None):
+        """Non-overlapping mentions in `text` as [(target id, start, end)].
+
+        Mentions of the entry `exclude` (and of its duplicates, by name) are
+        not links.
+        """
+        folded = fold(text)
+        own = {fold(name) for _, name in names(self.items[exclude])} if exclude in self.items else set()
+        found = []
+        for start, end, (kind, name, target) in self.automaton.finditer(folded):
+            if target == exclude or folded[start:end] in own:
+                continue
+            if start > 0 and folded[start - 1].isalnum():
+                continue
+            if end < len(folded) and folded[end] == 's' and (end + 1 == len(folded) or not folded[end + 1].isalnum()):
+                end += 1
+            elif end < len(folded) and folded[end].isalnum():
+                continue
+            if folded[start:end] in own:
+                continue
+            if kind == 'abbreviation' and not text.startswith(name, start):
+                continue
+            found.append((start, -end, len(found), target))
+        links = []
+        last_end = 0
+        for start, neg_end, _, target in sorted(found):
+            if start >= last_end:
+                links.append((target, start, -neg_end))
+                last_end = -neg_end
+        return links
+
+    def _set_outgoing(self, item_id, links):
+        for target, _, _ in self.outgoing.get(item_id, ()):
+            if target in self.incoming:
+                self.incoming[target].discard(item_id)
+        self.outgoing[item_id] = links
+        for target, _, _ in links:
+            self.incoming[target].add(item_id)
+
+    def _scan(self, item_id):
+        item = self.items[item_id]
+        self._set_outgoing(item_id, self.find_links(item.get('definition') or '', exclude=item_id))
+
+    def _mentioning(self, item):
+        """Ids whose definition contains every word of one of `item`'s names."""
+        ids = set()
+        for _, name in names(item):
+            words = set(_words(name))
+            if not words:
+                continue
+            candidates = None
+            for word in words:
+                found = self.words.get(word, set())
+                candidates = set(found) if candidates is None else candidates & found
+                if not candidates:
+                    break
+            ids |= candidates or set()
+        return ids
+
+    # updates ---------------------------------------------------------------
+
+    def add(self, item):
+        self._register(item)
+        self._scan(item['id'])
+        for other in self._mentioning(item) - {item['id']}:
+            self._scan(other)
+
+    def update(self, item):
+        """Replace the entry with the same id (term, abbreviation or definition changed)."""
+        old = self.items.get(item['id'])
+        if old is None:
+            return self.add(item)
+        renamed = names(old) != names(item)
+        stale = set(self.incoming.get(item['id'], ())) if renamed else set()
+        self._unregister(item['id'])
+        self._register(item)
+        self._scan(item['id'])
+        if renamed:
+            stale |= self._mentioning(item)
+        for other in stale - {item['id']}:
+            if other in self.items:
+                self._scan(other)
+
+    def remove(self, item_id):
+        if item_id not in self.items:
+            return
+        stale = self.incoming.pop(item_id, set())
+        self._unregister(item_id)
+        for other in stale:
+            self._scan(other)
+
+    # queries ---------------------------------------------------------------
+
+    def links(self, item_id):
+        """{'outgoing': [{id, term, start, end}], 'incoming': [{id, term}]} for one entry."""
+        outgoing = [{'id': t, 'term': self.items[t].get('term'), 'start': s, 'end': e}
+                    for t, s, e in self.outgoing.get(item_id, ())]
+        incoming = [{'id': i, 'term': self.items[i].get('term')}
+                    for i in sorted(self.incoming.get(item_id, ()), key=lambda i: (self.items[i].get('term') or '').lower())]
+        return {'outgoing': outgoing, 'incoming': incoming}
+
+    def to_json(self):
+        """Compact form for the whole glossary: {id: {'out': [[id, start, end]], 'in': [ids]}},
+        listing only entries that have links."""
+        out = {}
+        for item_id in self.items:
+            links = self.outgoing.get(item_id) or []
+            used_by = self.incoming.get(item_id) or ()
+            if links or used_by:
+                out[item_id] = {'out': [list(link) for link in links], 'in': sorted(used_by)}
+        return out
+
+
+def main(path=None, output_path=None):
+    if path is None:
+        path = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')), 'data', 'glossary_user.json')
+    items = [it for it in iter_json_array(path) if it.get('id')]
+    graph = LinkGraph(items)
+    data = json.dumps(graph.to_json(), ensure_ascii=False, indent=2)
+    if output_path:
+        with open(output_path, 'w', encoding='utf-8') as fh:
+            fh.write(data)
+    else:
+        print(data)
+    linked = sum(1 for links in graph.outgoing.values() if links)
+    print(f'{linked} of {len(items)} definitions link to other entries.', file=sys.stderr)
+    return graph
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Find cross-references between glossary entries.')
+    parser.add_argument('input', nargs='?', help='glossary JSON in the user schema (default: data/glossary_user.json)')
+    parser.add_argument('output', nargs='?', help='write the link graph here instead of stdout')
+    args = parser.parse_args()
+    main(args.input, args.output)
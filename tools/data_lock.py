@@ -0,0 +1,91 @@
+"""Advisory per-collection file locks shared by the server and offline tools.
+
+`locked(path)` holds an exclusive `flock` on `<path>.lock` for the duration
+of a read-modify-write of `path`. The lock is per open file, so it also
+serializes threads of the same process. On platforms without `fcntl` the
+lock is a no-op.
+
+Every write of a collection also replaces `<path>.version` with a fresh
+random token (`bump_version`). Processes that cache something derived from
+the collection key the cache on `read_version(path)` as well as the file's
+mtime, so a write by another worker or by `tools.admin` invalidates it even
+when both writes land within the filesystem's timestamp resolution.
+
+Offline tools that rewrite a collection copy it first with `backup(path)`,
+under the same name the server's backups use.
+"""
+import contextlib
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+
+def lock_path(path):
+    return f'{os.fspath(path)}.lock'
+
+
+@contextlib.contextmanager
+def locked(path):
+    """Hold the exclusive lock of the collection stored at `path`."""
+    if fcntl is None:
+        yield
+        return
+    fd = os.open(lock_path(path), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+def version_path(path):
+    return f'{os.fspath(path)}.version'
+
+
+def bump_version(path):
+    """Mark the collection at `path` as changed; return the new token."""
+    token = uuid.uuid4().hex
+    target = version_path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(target)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+            fh.write(token)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, target)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    return token
+
+
+def read_version(path):
+    """Token of the last `bump_version(path)`, None if it was never bumped."""
+    try:
+        with open(version_path(path), encoding='utf-8') as fh:
+            return fh.read()
+    except FileNotFoundError:
+        return None
+
+
+def backup(path, backups_dir=None):
+    """Copy `path` to `<backups_dir>/<stem>_<UTC timestamp><suffix>`; return the copy.
+
+    `backups_dir` defaults to `backups/` next to `path` (`data/backups/`).
+    Old copies are pruned by the server and `tools.admin compact-backups`.
+    """
+    path = os.fspath(path)
+    if not os.path.exists(path):
+        return None
+    backups_dir = backups_dir or os.path.join(os.path.dirname(os.path.abspath(path)), 'backups')
+    os.makedirs(backups_dir, exist_ok=True)
+    stem, suffix = os.path.splitext(os.path.basename(path))
+    target = os.path.join(backups_dir, f"{stem}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}{suffix}")
+    shutil.copy2(path, target)
+    return target
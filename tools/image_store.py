@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""Sharded layout and integrity checks for `data/images/`.
+
+Uploaded files are stored under a two-hex-digit shard directory derived from
+a hash of their name (`data/images/3f/<uuid>.png`); the `filename` recorded in
+`images.json` is that relative path, so `/images/<filename>` keeps working.
+
+Usage:
+  python tools/image_store.py migrate [--dry-run]
+  python tools/image_store.py scan [--gc] [--grace SECONDS] [--full]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import data_lock
+from tools.json_stream import iter_json_array, write_json_array
+
+SHARD_CHARS = 2
+
+# Orphan files younger than this are left alone by --gc: an upload writes the
+# file before it commits the metadata.
+GC_GRACE_SECONDS = 3600
+
+SCAN_STATE_NAME = '.images_scan.json'
+
+
+def shard_of(name):
+    """Shard directory for a bare file name."""
+    return hashlib.sha1(name.encode('utf-8')).hexdigest()[:SHARD_CHARS]
+
+
+def shard_path(name):
+    """Relative (posix) storage path for a bare file name."""
+    return f'{shard_of(name)}/{name}'
+
+
+def _split(filename):
+    """Return (shard, name) for a stored filename; shard is '' for flat files."""
+    if '/' in filename:
+        shard, name = filename.split('/', 1)
+        return shard, name
+    return '', filename
+
+
+def _write_json_atomic(path, value):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as tmp:
+            tmp.write(json.dumps(value, ensure_ascii=False, indent=2))
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def _rewrite_metadata(metadata_path, transform):
+    """Stream metadata through `transform(meta) -> meta or None` into a new file.
+
+    Entries are written one at a time, so memory use does not grow with the
+    collection. The rewrite holds the collection's lock (`tools.data_lock`),
+    so it never interleaves with a write by the server; a changed file is
+    backed up first and its version bumped. Returns the number of entries
+    changed or dropped.
+    """
+    changed = 0
+
+    def entries():
+        nonlocal changed
+        for meta in iter_json_array(metadata_path):
+            new = transform(meta)
+            if new is not meta:
+                changed += 1
+            if new is not None:
+                yield new
+
+    with data_lock.locked(metadata_path):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(metadata_path) or '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as out:
+                write_json_array(entries(), out)
+            if changed:
+                data_lock.backup(metadata_path)
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, metadata_path)
+                data_lock.bump_version(metadata_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+    return changed
+
+
+def migrate(images_dir, metadata_path, dry_run=False):
+    """Move flat files into their shard and rewrite their metadata filenames.
+
+    Safe to re-run after an interruption: files are moved first, and entries
+    whose flat file is gone but whose sharded copy exists are still updated.
+    """
+    moved = 0
+
+    def transform(meta):
+        nonlocal moved
+        fn = meta.get('filename')
+        if not fn or '/' in fn:
+            return meta
+        rel = shard_path(fn)
+        src = os.path.join(images_dir, fn)
+        dest = os.path.join(images_dir, *rel.split('/'))
+        if os.path.exists(src):
+            if not dry_run:
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                os.replace(src, dest)
+            moved += 1
+        elif not os.path.exists(dest):
+            return meta
+        new = dict(meta)
+        new['filename'] = rel
+        return new
+
+    if dry_run:
+        changed = sum(1 for meta in iter_json_array(metadata_path) if transform(meta) is not meta)
+    else:
+        changed = _rewrite_metadata(metadata_path, transform)
+    print(f'Migrated {moved} files, updated {changed} metadata entries{" (dry run)" if dry_run else ""}.')
+    return moved
+
+
+def _load_state(path):
+    try:
+        with open(path, encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def scan(images_dir, metadata_path, state_path=None, gc=False, grace=GC_GRACE_SECONDS, full=False):
+    """Reconcile the metadata file with the files on disk.
+
+    Returns a report with `missing` (metadata ids whose file is absent) and
+    `orphans` (stored files no entry refers to). Shards whose directory mtime
+    and set of referenced names are unchanged since the last clean scan are
+    not listed again unless `full` is set. With `gc`, orphan files older than
+    `grace` seconds are deleted and entries with missing files are dropped.
+    """
+    if state_path is None:
+        state_path = os.path.join(os.path.dirname(os.path.abspath(images_dir)), SCAN_STATE_NAME)
+    state = {} if full else _load_state(state_path)
+
+    # Pass 1: stream the metadata, keeping only names grouped per shard.
+    referenced = {}
+    missing = []
+    entries = 0
+    for meta in iter_json_array(metadata_path):
+        entries += 1
+        fn = meta.get('filename')
+        if not fn:
+            continue
+        shard, name = _split(fn)
+        referenced.setdefault(shard, set()).add(name)
+        if not os.path.exists(os.path.join(images_dir, *fn.split('/'))):
+            missing.append(meta.get('id'))
+
+    # Pass 2: list shard directories that may have changed.
+    orphans = []
+    new_state = {}
+    skipped = 0
+    now = time.time()
+    shards = {''}
+    with os.scandir(images_dir) as it:
+        for entry in it:
+            if entry.is_dir():
+                shards.add(entry.name)
+    shards.update(referenced)
+    for shard in sorted(shards):
+        shard_dir = os.path.join(images_dir, shard) if shard else images_dir
+        try:
+            mtime = os.stat(shard_dir).st_mtime_ns
+        except FileNotFoundError:
+            continue
+        names = referenced.get(shard, set())
+        digest = hashlib.sha1('\n'.join(sorted(names)).encode('utf-8')).hexdigest()
+        prev = state.get(shard)
+        if prev and prev.get('mtime') == mtime and prev.get('refs') == digest:
+            new_state[shard] = prev
+            skipped += 1
+            continue
+        shard_orphans = []
+        with os.scandir(shard_dir) as it:
+            for entry in it:
+                if entry.is_file() and not entry.name.endswith('.tmp') and entry.name not in names:
+                    rel = f'{shard}/{entry.name}' if shard else entry.name
+                    shard_orphans.append((rel, entry.path, entry.stat().st_mtime))
+        clean = True
+        for rel, path, file_mtime in shard_orphans:
+            if gc and now - file_mtime >= grace:
+                try:
+                    os.unlink(path)
+                    continue
+                except OSError:
+                    pass
+            orphans.append(rel)
+            clean = False
+        if clean:
+            new_state[shard] = {'mtime': os.stat(shard_dir).st_mtime_ns, 'refs': digest}
+
+    dropped = 0
+    if gc and missing:
+        gone = set(missing)
+        dropped = _rewrite_metadata(metadata_path, lambda meta: None if meta.get('id') in gone else meta)
+        for shard in list(new_state):
+            # metadata changed: re-check these shards next time
+            new_state.pop(shard)
+        missing = []
+    try:
+        _write_json_atomic(state_path, new_state)
+    except OSError as e:
+        print(f'Warning: could not save scan state - {e}')
+    return {
+        'entries': entries,
+        'missing': missing,
+        'orphans': orphans,
+        'dropped': dropped,
+        'skipped_shards': skipped,
+    }
+
+
+def main(argv=None):
+    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    parser = argparse.ArgumentParser(description='Maintain the data/images store.')
+    parser.add_argument('--images-dir', default=os.path.join(repo_root, 'data', 'images'))
+    parser.add_argument('--metadata', default=None)
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_migrate = sub.add_parser('migrate', help='move flat files into hash-prefix shards')
+    p_migrate.add_argument('--dry-run', action='store_true')
+    p_scan = sub.add_parser('scan', help='report (or remove) orphans')
+    p_scan.add_argument('--gc', action='store_true', help='delete orphan files and drop entries with missing files')
+    p_scan.add_argument('--grace', type=int, default=GC_GRACE_SECONDS)
+    p_scan.add_argument('--full', action='store_true', help='ignore the incremental scan state')
+    args = parser.parse_args(argv)
+    metadata = args.metadata or os.path.join(os.path.dirname(os.path.abspath(args.images_dir)), 'images.json')
+
+    if args.command == 'migrate':
+        migrate(args.images_dir, metadata, dry_run=args.dry_run)
+        return 0
+    report = scan(args.images_dir, metadata, gc=args.gc, grace=args.grace, full=args.full)
+    for rel in report['orphans']:
+        print(f'orphan file: {rel}')
+    for image_id in report['missing']:
+        print(f'missing file for entry: {image_id}')
+    print(f"Scanned {report['entries']} entries ({report['skipped_shards']} unchanged shards skipped): "
+          f"{len(report['orphans'])} orphan files, {len(report['missing'])} missing files, "
+          f"{report['dropped']} entries dropped.")
+    return 1 if report['orphans'] or report['missing'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
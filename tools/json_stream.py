@@ -0,0 +1,117 @@
+"""Incremental reading and writing of large top-level JSON arrays.
+
+The data files (`data/*.json`) are JSON arrays of objects. `iter_json_array`
+yields the elements one by one while reading the file in chunks, so callers
+that only need a field or two never hold the whole collection in memory;
+`write_json_array` and `write_jsonl` are the matching writers.
+"""
+import json
+
+CHUNK_SIZE = 1 << 16
+
+_WS = ' \t\r\n'
+
+
+def iter_json_array(path, chunk_size=CHUNK_SIZE):
+    """Yield the elements of the JSON array stored at `path`.
+
+    An empty or missing file yields nothing. Raises ValueError when the file
+    is not a JSON array.
+    """
+    decoder = json.JSONDecoder()
+    try:
+        fh = open(path, encoding='utf-8')
+    except FileNotFoundError:
+        return
+    with fh:
+        buf = ''
+        pos = 0
+        eof = False
+
+        def fill():
+            nonlocal buf, pos, eof
+            data = fh.read(chunk_size)
+            if not data:
+                eof = True
+            buf = buf[pos:] + data
+            pos = 0
+
+        def skip_ws():
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in _WS:
+                    pos += 1
+                if pos < len(buf) or eof:
+                    return
+                fill()
+
+        fill()
+        skip_ws()
+        if pos >= len(buf):
+            return
+        if buf[pos] != '[':
+            raise ValueError(f'{path}: expected a JSON array')
+        pos += 1
+        first = True
+        while True:
+            skip_ws()
+            if pos >= len(buf):
+                raise ValueError(f'{path}: unterminated JSON array')
+            if buf[pos] == ']':
+                return
+            if not first:
+                if buf[pos] != ',':
+                    raise ValueError(f'{path}: expected "," at offset {pos}')
+                pos += 1
+                skip_ws()
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    fill()
+                    continue
+                if end >= len(buf) and not eof:
+                    # a scalar may continue in the next chunk
+                    fill()
+                    continue
+                break
+            pos = end
+            first = False
+            yield value
+
+
+def write_json_array(items, fh, indent=2, flush_every=0):
+    """Write `items` to `fh` as a JSON array, one element at a time.
+
+    The output is identical to `json.dump(list(items), fh, indent=indent,
+    ensure_ascii=False)`, but the items are never held in memory together.
+    With `flush_every`, the file is flushed after that many elements so a
+    reader can consume the first records while writing continues.
+    Returns the number of elements written.
+    """
+    pad = ' ' * indent
+    count = 0
+    fh.write('[')
+    for item in items:
+        fh.write('\n' if count == 0 else ',\n')
+        fh.write(pad + json.dumps(item, ensure_ascii=False, indent=indent).replace('\n', '\n' + pad))
+        count += 1
+        if flush_every and count % flush_every == 0:
+            fh.flush()
+    fh.write('\n]' if count else ']')
+    fh.flush()
+    return count
+
+
+def write_jsonl(items, fh, flush_every=0):
+    """Write one compact JSON object per line; return the number written."""
+    count = 0
+    for item in items:
+        fh.write(json.dumps(item, ensure_ascii=False) + '\n')
+        count += 1
+        if flush_every and count % flush_every == 0:
+            fh.flush()
+    fh.flush()
+    return count
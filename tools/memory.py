@@ -0,0 +1,130 @@
+"""Approximate memory footprint of Python objects, plus tracemalloc snapshots.
+
+`deep_size(obj)` walks containers, instance `__dict__`s and `__slots__`
+and adds up `sys.getsizeof` of every object reached once (shared objects
+are counted once per walk, modules, classes and functions not at all).
+
+`string_stats(obj)` counts the strings reachable from `obj` and how many
+bytes would be saved if equal strings were one object (`sys.intern`):
+repeated tags, types and field values in the JSON collections are the
+usual candidates.
+
+`Tracer` wraps tracemalloc: `start()`, `snapshot(name)`, `top()` of the
+allocation sites of a snapshot and `diff(a, b)` between two of them.
+"""
+import sys
+import tracemalloc
+import types
+
+_SKIP = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+
+def _referents(obj):
+    if isinstance(obj, dict):
+        yield from obj.keys()
+        yield from obj.values()
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        yield from obj
+    else:
+        d = getattr(obj, '__dict__', None)
+        if isinstance(d, dict):
+            yield d
+        for cls in type(obj).__mro__:
+            for slot in cls.__dict__.get('__slots__', ()):
+                if hasattr(obj, slot):
+                    yield getattr(obj, slot)
+
+
+def _walk(obj, seen):
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, _SKIP):
+            continue
+        seen.add(id(o))
+        yield o
+        if not isinstance(o, (str, bytes, int, float, bool)):
+            stack.extend(_referents(o))
+
+
+def deep_size(obj, seen=None):
+    """Bytes of `obj` and everything it references (not already in `seen`)."""
+    return sum(sys.getsizeof(o) for o in _walk(obj, set() if seen is None else seen))
+
+
+def string_stats(obj):
+    """{'strings', 'distinct', 'bytes', 'interning_savings_bytes'} of the strings under `obj`."""
+    count = 0
+    total = 0
+    first = {}  # value -> size of the first object seen with it
+    savings = 0
+    for o in _walk(obj, set()):
+        if type(o) is not str:
+            continue
+        size = sys.getsizeof(o)
+        count += 1
+        total += size
+        if o in first:
+            savings += size
+        else:
+            first[o] = size
+    return {'strings': count, 'distinct': len(first), 'bytes': total, 'interning_savings_bytes': savings}
+
+
+def describe(obj):
+    """{'records', 'bytes'} plus `string_stats()` of a collection or index."""
+    out = {'records': len(obj) if hasattr(obj, '__len__') else None, 'bytes': deep_size(obj)}
+    out.update(string_stats(obj))
+    return out
+
+
+class Tracer:
+    MAX_SNAPSHOTS = 10
+
+    def __init__(self):
+        self.snapshots = {}  # name -> tracemalloc.Snapshot, oldest first
+
+    def status(self):
+        current, peak = tracemalloc.get_traced_memory()
+        return {'tracing': tracemalloc.is_tracing(), 'frames': tracemalloc.get_traceback_limit(),
+                'current_bytes': current, 'peak_bytes': peak, 'snapshots': list(self.snapshots)}
+
+    def start(self, frames=1):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop(self):
+        tracemalloc.stop()
+        self.snapshots.clear()
+
+    def snapshot(self, name):
+        """Take a snapshot (tracing must be on) and keep it under `name`."""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError('tracemalloc is not running')
+        snap = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        self.snapshots.pop(name, None)
+        self.snapshots[name] = snap
+        while len(self.snapshots) > self.MAX_SNAPSHOTS:
+            self.snapshots.pop(next(iter(self.snapshots)))
+        return snap
+
+    def _get(self, name):
+        if name not in self.snapshots:
+            raise KeyError(name)
+        return self.snapshots[name]
+
+    def top(self, name, limit=20, group_by='lineno'):
+        stats = self._get(name).statistics(group_by)
+        return [{'site': _site(s.traceback), 'size_bytes': s.size, 'count': s.count} for s in stats[:limit]]
+
+    def diff(self, old, new, limit=20, group_by='lineno'):
+        stats = self._get(new).compare_to(self._get(old), group_by)
+        return [{'site': _site(s.traceback), 'size_bytes': s.size, 'size_diff_bytes': s.size_diff,
+                 'count': s.count, 'count_diff': s.count_diff} for s in stats[:limit]]
+
+
+def _site(traceback):
+    return [f'{frame.filename}:{frame.lineno}' for frame in traceback]
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""Import the ECSS base glossary into the user glossary, without duplicates.
+
+`data/glossary.json` uses the legacy schema (`type`, `id`, `term`,
+`definition`, abbreviations stored as `term` = short form); the user
+glossary uses `term`, `definition`, `abbreviation`, though entries written
+before that schema may still carry `type`. Entries of both files are keyed
+through the same mapping to the user schema (the one `load_items` applies in
+the server), then every base entry is looked up in hash tables built over
+the user glossary:
+
+- by term key: lower-case, accents and punctuation stripped, simple plurals
+  folded (`Requirements` and `requirement` share a key);
+- by abbreviation key: letters and digits only, upper-case (`E.C.S.S.`).
+
+A base entry whose term, abbreviation and definition keys all match a user
+entry is an exact duplicate; one that only shares its term key, or shares its
+abbreviation key with a different expansion, is a near duplicate and goes
+through the merge policy. "Near" only means equal normalized keys: there is
+no fuzzy matching, so a misspelt or reworded term is imported as a new entry.
+The policies:
+
+- `keep-user`: leave the user entry alone (default);
+- `prefer-base`: overwrite the user entry's term, definition and abbreviation
+  with the standard's wording (id, tags and creation date are kept);
+- `keep-both`: import the base entry next to the user entry.
+
+Each input is read once and each entry costs a few dict lookups, so the
+merge runs in linear time. Entries with no match are appended, tagged `ECSS`
+and given an id derived from their ECSS identifier, so importing the same
+standard twice adds nothing.
+
+Usage:
+  python tools/merge_glossary.py [data/glossary.json] [data/glossary_user.json]
+  python tools/merge_glossary.py --policy prefer-base --dry-run
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import uuid
+from datetime import datetime
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import data_lock
+from tools.parse_glossary import _iter_output, _write_atomic
+from tools.search_index import tokenize
+
+POLICIES = ('keep-user', 'prefer-base', 'keep-both')
+
+ABBREVIATION_TYPE = 'Abréviation'
+IMPORT_TAG = 'ECSS'
+
+# Namespace of the ids given to imported entries (uuid5 of 'type:id').
+ECSS_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, 'https://ecss.nl/glossary')
+
+_PLURAL = re.compile(r'(?<=[a-z]{3})(?<!s)s$')
+
+
+def to_user_schema(entry):
+    """Return `entry` in the user schema (legacy `type` entries are mapped)."""
+    if 'abbreviation' in entry or 'type' not in entry:
+        new = dict(entry)
+        new.setdefault('abbreviation', '')
+        return new
+    new = {k: v for k, v in entry.items() if k != 'type'}
+    if entry.get('type') == ABBREVIATION_TYPE:
+        new['term'] = entry.get('definition') or entry.get('term')
+        new['abbreviation'] = entry.get('term')
+    else:
+        new['abbreviation'] = ''
+    return new
+
+
+def term_key(text):
+    return ' '.join(_PLURAL.sub('', t) for t in tokenize(text or ''))
+
+
+def abbreviation_key(text):
+    return ''.join(tokenize(text or '')).upper()
+
+
+def text_key(text):
+    return ' '.join(tokenize(text or ''))
+
+
+def _imported_entry(base, now):
+    item = to_user_schema(base)
+    ecss_id = base.get('id')
+    item['id'] = str(uuid.uuid5(ECSS_NAMESPACE, f"{base.get('type', '')}:{ecss_id}"))
+    item['ecss_id'] = ecss_id
+    item['tags'] = [IMPORT_TAG]
+    item['created_at'] = now
+    item['updated_at'] = now
+    return item
+
+
+class UserIndex:
+    """Term and abbreviation hash tables over the user glossary (positions).
+
+    `views` holds each item in the user schema; keys are computed on it, so
+    legacy `type` entries are matched like the rest.
+    """
+
+    def __init__(self, items):
+        self.items = items
+        self.views = []
+        self.terms = {}
+        self.abbreviations = {}
+        self.ids = {}
+        for pos, it in enumerate(items):
+            self.add(pos, it)
+
+    def add(self, pos, it):
+        it = to_user_schema(it)
+        self.views.append(it)
+        self.ids[it.get('id')] = pos
+        key = term_key(it.get('term'))
+        if key:
+            self.terms.setdefault(key, []).append(pos)
+        key = abbreviation_key(it.get('abbreviation'))
+        if key:
+            self.abbreviations.setdefault(key, []).append(pos)
+
+    def duplicates(self):
+        """Groups of user entries that already share a term or abbreviation key."""
+        out = []
+        for kind, table in (('term', self.terms), ('abbreviation', self.abbreviations)):
+            for key, positions in table.items():
+                if len(positions) > 1:
+                    out.append({'kind': kind, 'key': key, 'ids': [self.items[p].get('id') for p in positions]})
+        return out
+
+
+def _summary(item):
+    return {k: item.get(k) for k in ('id', 'term', 'abbreviation', 'definition')}
+
+
+def merge(base_entries, user_items, policy='keep-user', now=None):
+    """Merge `base_entries` into `user_items`; return (items, report).
+
+    `user_items` is not modified. The report lists the added, exact and near
+    duplicates (with the policy's decision) and pre-existing duplicate groups
+    inside the user glossary.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f'unknown merge policy: {policy!r} (expected one of {", ".join(POLICIES)})')
+    now = now or datetime.utcnow().isoformat() + 'Z'
+    items = [dict(it) for it in user_items]
+    index = UserIndex(items)
+    report = {'policy': policy, 'added': [], 'exact': [], 'near': [], 'user_duplicates': index.duplicates()}
+
+    for base in base_entries:
+        candidate = to_user_schema(base)
+        tkey = term_key(candidate.get('term'))
+        akey = abbreviation_key(candidate.get('abbreviation'))
+        dkey = text_key(candidate.get('definition'))
+        by_term = index.terms.get(tkey, []) if tkey else []
+        by_abbr = index.abbreviations.get(akey, []) if akey else []
+
+        views = index.views
+        exact = next((p for p in by_term
+                      if abbreviation_key(views[p].get('abbreviation')) == akey
+                      and text_key(views[p].get('definition')) == dkey), None)
+        if exact is not None:
+            report['exact'].append({'ecss_id': base.get('id'), 'user': items[exact].get('id')})
+            if not items[exact].get('ecss_id'):
+                items[exact]['ecss_id'] = base.get('id')
+            continue
+
+        near = []
+        for p in by_term:
+            near.append((p, 'term'))
+        for p in by_abbr:
+            if term_key(views[p].get('term')) != tkey:
+                near.append((p, 'abbreviation'))
+        imported = _imported_entry(base, now)
+        if imported['id'] in index.ids:
+            # imported by an earlier run and edited since
+            near = near or [(index.ids[imported['id']], 'id')]
+
+        if not near or policy == 'keep-both':
+            if imported['id'] not in index.ids:
+                items.append(imported)
+                index.add(len(items) - 1, imported)
+                report['added'].append(_summary(imported))
+        if near:
+            action = {'keep-user': 'kept user', 'prefer-base': 'updated', 'keep-both': 'added'}[policy]
+            for p, kind in near:
+                report['near'].append({'kind': kind, 'ecss_id': base.get('id'), 'base': _summary(candidate),
+                                       'user': _summary(views[p]), 'action': action})
+            if policy == 'prefer-base':
+                p = near[0][0]
+                items[p] = views[p]  # a legacy entry is rewritten in the user schema
+                items[p].update(term=candidate.get('term'), definition=candidate.get('definition'),
+                                abbreviation=candidate.get('abbreviation'), ecss_id=base.get('id'), updated_at=now)
+    return items, report
+
+
+def main(base_path=None, user_path=None, policy='keep-user', dry_run=False, report_path=None):
+    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    base_path = base_path or os.path.join(repo_root, 'data', 'glossary.json')
+    user_path = user_path or os.path.join(repo_root, 'data', 'glossary_user.json')
+    fmt = 'jsonl' if base_path.endswith('.jsonl') else 'json'
+    # the server's lock on the user glossary: no API edit lands between the read and the write
+    with data_lock.locked(user_path):
+        user_items = []
+        if os.path.exists(user_path):
+            with open(user_path, encoding='utf-8') as fh:
+                user_items = json.loads(fh.read() or '[]')
+
+        items, report = merge(_iter_output(base_path, fmt), user_items, policy)
+
+        if not dry_run and items != user_items:
+            data_lock.backup(user_path)
+            _write_atomic(user_path, lambda out: out.write(json.dumps(items, ensure_ascii=False, indent=2)))
+            data_lock.bump_version(user_path)
+    if report_path:
+        with open(report_path, 'w', encoding='utf-8') as fh:
+            json.dump(report, fh, ensure_ascii=False, indent=2)
+    verb = 'Would merge' if dry_run else 'Merged'
+    print(f"{verb} {base_path} into {user_path} ({policy}): {len(report['added'])} added, "
+          f"{len(report['exact'])} exact duplicates, {len(report['near'])} near duplicates, "
+          f"{len(report['user_duplicates'])} duplicate groups already in the user glossary.")
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Merge the ECSS base glossary into the user glossary.')
+    parser.add_argument('base', nargs='?', help='base glossary (default: data/glossary.json)')
+    parser.add_argument('user', nargs='?', help='user glossary to update (default: data/glossary_user.json)')
+    parser.add_argument('--policy', choices=POLICIES, default='keep-user', help='what to do with near duplicates')
+    parser.add_argument('--dry-run', action='store_true', help='report only, leave the user glossary untouched')
+    parser.add_argument('--report', help='write the full JSON report to this file')
+    args = parser.parse_args()
+    main(args.base, args.user, args.policy, dry_run=args.dry_run, report_path=args.report)
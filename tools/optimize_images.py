@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""Lossless PNG recompression for the diagrams stored in `data/images/`.
+
+Each PNG is re-encoded with the smallest of several zlib settings and scanline
+filter choices, ancillary metadata chunks are stripped, the decoded pixels are
+checked against the original, and the file is replaced atomically. Files are
+processed in parallel with a process pool and `data/images.json` is updated
+with the new sizes.
+
+Usage:
+  python tools/optimize_images.py [--images-dir DIR] [--metadata FILE] [--workers N] [--no-refilter]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import data_lock, png_codec
+
+# Text/EXIF metadata and Apple's iDOT (which stores IDAT offsets and becomes
+# invalid once the image data is rewritten).
+STRIP_CHUNKS = {b'tEXt', b'zTXt', b'iTXt', b'eXIf', b'tIME', b'iDOT'}
+
+# Re-filtering decodes every pixel in Python; skip it for very large images.
+MAX_REFILTER_PIXELS = 4_000_000
+
+ZLIB_STRATEGIES = (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED)
+
+
+def _compress(stream, strategy):
+    co = zlib.compressobj(9, zlib.DEFLATED, 15, 9, strategy)
+    return co.compress(stream) + co.flush()
+
+
+def optimize_png(data, refilter=True, max_refilter_pixels=MAX_REFILTER_PIXELS):
+    """Return a smaller, pixel-identical encoding of `data`, or None if no gain."""
+    chunks = list(png_codec.iter_chunks(data))
+    if not chunks or chunks[0][0] != b'IHDR':
+        raise png_codec.PNGError('IHDR must be the first chunk')
+    header = png_codec.parse_header(chunks[0][1])
+    stream = png_codec.idat_stream(chunks, header)
+
+    candidates = [stream]
+    rows = None
+    if refilter and not header.interlace and header.width * header.height <= max_refilter_pixels:
+        rows = png_codec.unfilter(stream, header)
+        for mode in ('adaptive', 0):
+            refiltered = png_codec.filter_rows(rows, header, mode)
+            if refiltered != stream:
+                candidates.append(refiltered)
+
+    best = None
+    for candidate in candidates:
+        for strategy in ZLIB_STRATEGIES:
+            payload = _compress(candidate, strategy)
+            if best is None or len(payload) < len(best[1]):
+                best = (candidate, payload)
+    candidate, payload = best
+
+    # verify: the new IDAT must decode to exactly the same pixels
+    decoded = png_codec.inflate(payload, len(stream))
+    if decoded != stream:
+        if rows is None or png_codec.unfilter(decoded, header) != rows:
+            raise png_codec.PNGError('pixel verification failed')
+
+    parts = [png_codec.SIGNATURE]
+    idat_written = False
+    for ctype, body in chunks:
+        if ctype in STRIP_CHUNKS:
+            continue
+        if ctype == b'IDAT':
+            if not idat_written:
+                parts.append(png_codec.make_chunk(b'IDAT', payload))
+                idat_written = True
+            continue
+        parts.append(png_codec.make_chunk(ctype, body))
+    out = b''.join(parts)
+    if len(out) >= len(data):
+        return None
+    return out
+
+
+def optimize_file(path, refilter=True):
+    """Optimize one PNG in place. Return (old_size, new_size)."""
+    path = str(path)
+    with open(path, 'rb') as fh:
+        data = fh.read()
+    out = optimize_png(data, refilter=refilter)
+    if out is None:
+        return len(data), len(data)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(out)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return len(data), len(out)
+
+
+def _optimize_worker(args):
+    path, refilter = args
+    try:
+        old, new = optimize_file(path, refilter=refilter)
+        return path, old, new, None
+    except Exception as e:
+        return path, None, None, str(e)
+
+
+def update_metadata(metadata_path, sizes):
+    """Record new file sizes ({filename: bytes}) in the images metadata file.
+
+    Runs under the collection's lock (`tools.data_lock`), like the server's
+    writes, after a backup copy.
+    """
+    if not sizes or not os.path.exists(metadata_path):
+        return
+    with data_lock.locked(metadata_path):
+        with open(metadata_path, encoding='utf-8') as fh:
+            images = json.loads(fh.read() or '[]')
+        now = datetime.utcnow().isoformat() + 'Z'
+        changed = False
+        for meta in images:
+            fn = meta.get('filename')
+            if fn in sizes:
+                meta['size'] = sizes[fn]
+                meta['optimized_at'] = now
+                changed = True
+        if not changed:
+            return
+        data_lock.backup(metadata_path)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(metadata_path) or '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as tmp:
+                tmp.write(json.dumps(images, ensure_ascii=False, indent=2))
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, metadata_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        data_lock.bump_version(metadata_path)
+
+
+def main(images_dir=None, metadata_path=None, workers=None, refilter=True):
+    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if images_dir is None:
+        images_dir = os.path.join(repo_root, 'data', 'images')
+    if metadata_path is None:
+        metadata_path = os.path.join(os.path.dirname(os.path.abspath(images_dir)), 'images.json')
+
+    paths = []
+    for root, _dirs, files in os.walk(images_dir):
+        paths.extend(os.path.join(root, f) for f in files if f.lower().endswith('.png'))
+    paths.sort()
+
+    sizes = {}
+    total_old = total_new = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path, old, new, err in pool.map(_optimize_worker, [(p, refilter) for p in paths]):
+            if err:
+                print(f'Skipped {path}: {err}')
+                continue
+            total_old += old
+            total_new += new
+            if new < old:
+                sizes[os.path.relpath(path, images_dir).replace(os.sep, '/')] = new
+    update_metadata(metadata_path, sizes)
+
+    saved = total_old - total_new
+    pct = (100.0 * saved / total_old) if total_old else 0.0
+    print(f'Optimized {len(sizes)} of {len(paths)} PNG files, saved {saved} bytes ({pct:.1f}%).')
+    return sizes
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Losslessly recompress PNG diagrams.')
+    parser.add_argument('--images-dir')
+    parser.add_argument('--metadata')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--no-refilter', action='store_true', help='only recompress, keep the original filters')
+    args = parser.parse_args()
+    main(args.images_dir, args.metadata, args.workers, refilter=not args.no_refilter)
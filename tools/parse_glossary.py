@@ -1,16 +1,314 @@
 #!/usr/bin/env python3
 """Parse le fichier `ecss_glossaire.txt` (CSV) et produit `data/glossary.json`.
 
+Les lignes sont lues et écrites au fil de l'eau : la mémoire reste constante
+quelle que soit la taille de l'export, et les premiers enregistrements sont
+lisibles avant la fin du traitement.
+
+Plusieurs glossaires (fichiers ou motifs glob) peuvent être fusionnés avec
+`--merge` : chaque fichier est découpé en plages d'octets alignées sur les
+enregistrements, analysées en parallèle, puis fusionnées de façon
+déterministe (le premier fichier cité l'emporte, les conflits sont signalés).
+
+Un manifeste (`glossary.manifest.json`) garde l'empreinte de chaque ligne par
+identifiant : une nouvelle exécution ne réécrit le fichier de sortie que si
+des entrées ont été ajoutées, modifiées, supprimées ou déplacées, décrites
+dans `glossary.diff.json` (les déplacements à part des modifications).
+Avec `--index`, les index de recherche précalculés (voir `search_index.py`)
+sont écrits à côté de la sortie.
+
 Usage:
   python tools/parse_glossary.py [path/to/ecss_glossaire.txt] [output/path]
+  python tools/parse_glossary.py --jsonl ecss_glossaire.txt data/glossary.jsonl
+  python tools/parse_glossary.py ecss_glossaire.txt - | head    # JSON on stdout
+  python tools/parse_glossary.py --merge 'glossaries/*.csv' extra.csv -o data/glossary.json
 """
+import argparse
 import csv
+import glob
+import hashlib
+import io
 import json
+import mmap
 import os
+import shutil
 import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import search_index
+from tools.json_stream import iter_json_array, write_json_array, write_jsonl
+
+# Flush the output every N records so downstream readers see progress.
+FLUSH_EVERY = 100
+
+# Target size of the byte ranges parsed by each worker in --merge mode.
+CHUNK_BYTES = 8 * 1024 * 1024
+
+
+def normalize_row(row):
+    """Map one CSV row (French or English headers) to a glossary entry."""
+    typ = row.get('Type') or row.get('type') or ''
+    ident = row.get('Identifiant') or row.get('identifiant') or ''
+    term = row.get('Terme/Abréviation') or row.get('Terme') or row.get('terme') or ''
+    definition = row.get('Définition/Signification') or row.get('Définition') or row.get('definition') or ''
+    extra = row.get(None)
+    if extra:
+        # unquoted commas in the last column split it into extra fields
+        definition = ','.join([definition] + extra)
+    return {
+        'type': typ.strip(),
+        'id': ident.strip(),
+        'term': term.strip(),
+        'definition': definition.strip(),
+    }
+
+
+def iter_entries(fh):
+    """Yield normalized entries from an open CSV file, one row at a time."""
+    for row in csv.DictReader(fh):
+        yield normalize_row(row)
+
+
+def entry_key(entry):
+    """Identifier of an entry in the manifest (its clause number when it has one)."""
+    return entry['id'] or f"{entry['type']}:{entry['term']}"
+
+
+def row_hash(entry):
+    return hashlib.sha1(json.dumps(entry, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _keyed(entries):
+    """Yield (key, entry); repeated identifiers get a `#2`, `#3`... suffix."""
+    seen = {}
+    for it in entries:
+        key = entry_key(it)
+        n = seen.get(key, 0) + 1
+        seen[key] = n
+        yield (key if n == 1 else f'{key}#{n}'), it
+
+
+def sidecar_path(output_path, kind):
+    """`data/glossary.json` -> `data/glossary.<kind>.json`."""
+    return os.path.splitext(output_path)[0] + f'.{kind}.json'
+
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def _load_manifest(path, fmt, output_path):
+    """{key: (position, hash)} of the previous run's manifest; None when unusable.
+
+    The manifest is JSON Lines: a header (`format`, `keys`, `output` stamp)
+    then one `[key, hash]` row per output record, in output order. Only the
+    keys and hashes are held in memory, not the records.
+    """
+    try:
+        fh = open(path, encoding='utf-8')
+    except OSError:
+        return None
+    with fh:
+        try:
+            header = json.loads(fh.readline() or 'null')
+        except ValueError:
+            return None
+        # an older manifest, or the output was edited or replaced since
+        if (not isinstance(header, dict) or header.get('keys') != 'id' or header.get('format') != fmt
+                or header.get('output') != _stamp(output_path)):
+            return None
+        rows = {}
+        for line in fh:
+            if line.strip():
+                key, digest = json.loads(line)
+                rows[key] = (len(rows), digest)
+        return rows
+
+
+def _moved(positions):
+    """Indexes of `positions` outside one longest increasing subsequence.
+
+    `positions` are the old positions of the records kept, in their new
+    order; the records left out are the fewest that must have moved for the
+    others to keep their relative order (an insertion moves none).
+    """
+    tails = []  # tails[k]: index ending the best increasing run of length k + 1
+    prev = [-1] * len(positions)
+    for i, pos in enumerate(positions):
+        lo, hi = 0, len(tails)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if positions[tails[mid]] < pos:
+                lo = mid + 1
+            else:
+                hi = mid
+        prev[i] = tails[lo - 1] if lo else -1
+        if lo == len(tails):
+            tails.append(i)
+        else:
+            tails[lo] = i
+    keep = set()
+    i = tails[-1] if tails else -1
+    while i >= 0:
+        keep.add(i)
+        i = prev[i]
+    return [i for i in range(len(positions)) if i not in keep]
+
+
+def _iter_output(path, fmt):
+    if fmt == 'jsonl':
+        with open(path, encoding='utf-8') as fh:
+            for line in fh:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        yield from iter_json_array(path)
+
+
+def _write_atomic(path, write):
+    """Write `path` through a temporary file; `write(out)` may return False to leave it untouched."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as out:
+            keep = write(out)
+        if keep is not False:
+            # mkstemp creates the file private to the owner
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def write_entries(entries, output_path, fmt=None, full=False, index=False):
+    """Stream `entries` to `output_path` ('-' for stdout) as JSON or JSON Lines.
+
+    A file output gets a sidecar manifest (`<name>.manifest.json`) with the
+    hash of every row keyed by identifier. On the next run the rows are
+    compared with it: the output is rewritten only when a record was added,
+    changed, removed or moved, and `<name>.diff.json` reports them (moves
+    apart from content changes, so inserting a row changes nothing else).
+    Without a usable manifest, or with `full`, the diff is marked `full`.
+    With `index`, the search artefacts of `tools.search_index` are written
+    next to a JSON output (and rebuilt only when it changed).
 
+    Returns {'entries', 'terms', 'abbreviations', 'added', 'changed',
+    'removed', 'moved'} and prints the summary (to stderr when the records
+    go to stdout).
+    """
+    if fmt is None:
+        fmt = 'jsonl' if output_path.endswith('.jsonl') else 'json'
+    writer = write_jsonl if fmt == 'jsonl' else write_json_array
 
-def main(input_path=None, output_path=None):
+    # counts are computed while the entries stream through
+    summary = {'entries': 0, 'terms': 0, 'abbreviations': 0}
+
+    def counted(entries):
+        for it in entries:
+            summary['entries'] += 1
+            typ = it['type'].lower()
+            if typ.startswith('ter'):
+                summary['terms'] += 1
+            elif typ.startswith('abr'):
+                summary['abbreviations'] += 1
+            yield it
+
+    if output_path == '-':
+        writer(counted(entries), sys.stdout, flush_every=FLUSH_EVERY)
+        log = sys.stderr
+        print(f"Parsed {summary['entries']} entries ({summary['terms']} terms, {summary['abbreviations']} abbreviations).", file=log)
+        print(f'Wrote {output_path}', file=log)
+        return summary
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    manifest_path = sidecar_path(output_path, 'manifest')
+    diff_path = sidecar_path(output_path, 'diff')
+    old = None if full else _load_manifest(manifest_path, fmt, output_path)
+    diff = {'full': old is None, 'added': [], 'changed': [], 'removed': [], 'moved': []}
+
+    # Each new row is looked up by key in the previous manifest; the old
+    # output is only read back for the records of the diff (changed and
+    # removed ones). The new rows go to a scratch file that becomes the
+    # manifest once the output is in place.
+    changed = {}  # key -> new record
+    kept = []  # (old position, key) of the records still there, in the new order
+    rows_fd, rows_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(manifest_path)), suffix='.tmp')
+    try:
+        with os.fdopen(rows_fd, 'w', encoding='utf-8') as rows_out:
+            def compared():
+                for key, it in _keyed(counted(entries)):
+                    digest = row_hash(it)
+                    rows_out.write(json.dumps([key, digest], ensure_ascii=False) + '\n')
+                    yield it
+                    if old is None:
+                        continue
+                    # what is left in `old` at the end was removed
+                    prev = old.pop(key, None)
+                    if prev is None:
+                        diff['added'].append(it)
+                        continue
+                    if prev[1] != digest:
+                        changed[key] = it
+                    kept.append((prev[0], key))
+
+            def write_output(out):
+                writer(compared(), out, flush_every=FLUSH_EVERY)
+                if diff['full']:
+                    return True
+                diff['moved'] = [kept[i][1] for i in _moved([pos for pos, _ in kept])]
+                if changed or old:
+                    # the previous records, from the old output (still in place)
+                    before = {}
+                    for key, it in _keyed(_iter_output(output_path, fmt)):
+                        if key in changed:
+                            before[key] = it
+                        elif key in old:
+                            diff['removed'].append(it)
+                    diff['changed'] = [{'before': before[k], 'after': it} for k, it in changed.items()]
+                # nothing changed: the output is left alone
+                return bool(diff['added'] or diff['changed'] or diff['removed'] or diff['moved'])
+            _write_atomic(output_path, write_output)
+
+        # after the output, so a crash in between leaves a manifest that no longer matches it
+        def write_manifest(out):
+            out.write(json.dumps({'format': fmt, 'keys': 'id', 'output': _stamp(output_path)}) + '\n')
+            with open(rows_path, encoding='utf-8') as rows_in:
+                shutil.copyfileobj(rows_in, out)
+        _write_atomic(manifest_path, write_manifest)
+    finally:
+        if os.path.exists(rows_path):
+            os.unlink(rows_path)
+    _write_atomic(diff_path, lambda out: json.dump(diff, out, ensure_ascii=False, indent=2))
+    if diff['full']:
+        summary.update(added=summary['entries'], changed=0, removed=0, moved=0)
+    else:
+        summary.update(added=len(diff['added']), changed=len(diff['changed']), removed=len(diff['removed']),
+                       moved=len(diff['moved']))
+
+    if index and fmt == 'json' and not search_index.artefacts_fresh(output_path):
+        search_index.write_artefacts(output_path)
+
+    # summary
+    print(f"Parsed {summary['entries']} entries ({summary['terms']} terms, {summary['abbreviations']} abbreviations).")
+    if diff['full']:
+        print(f'Wrote {output_path}')
+    elif summary['added'] or summary['changed'] or summary['removed'] or summary['moved']:
+        print(f"Updated {output_path}: {summary['added']} added, {summary['changed']} changed, "
+              f"{summary['removed']} removed, {summary['moved']} moved.")
+    else:
+        print(f'{output_path} is up to date.')
+    return summary
+
+
+def main(input_path=None, output_path=None, fmt=None, full=False, index=False):
     if input_path is None:
         # default: repository root / ecss_glossaire.txt
         repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -19,38 +317,164 @@ def main(input_path=None, output_path=None):
     if output_path is None:
         output_path = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')), 'data', 'glossary.json')
 
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-
-    items = []
     with open(input_path, newline='', encoding='utf-8') as fh:
-        reader = csv.DictReader(fh)
-        for row in reader:
-            # Normalize keys
-            typ = row.get('Type') or row.get('type') or ''
-            ident = row.get('Identifiant') or row.get('identifiant') or ''
-            term = row.get('Terme/Abréviation') or row.get('Terme') or row.get('terme') or ''
-            definition = row.get('Définition/Signification') or row.get('Définition') or row.get('definition') or ''
-
-            item = {
-                'type': typ.strip(),
-                'id': ident.strip(),
-                'term': term.strip(),
-                'definition': definition.strip(),
-            }
-            items.append(item)
-
-    # write JSON
-    with open(output_path, 'w', encoding='utf-8') as out:
-        json.dump(items, out, ensure_ascii=False, indent=2)
+        return write_entries(iter_entries(fh), output_path, fmt, full=full, index=index)
 
-    # summary
-    cnt_terms = sum(1 for it in items if it['type'].lower().startswith('ter'))
-    cnt_abbr = sum(1 for it in items if it['type'].lower().startswith('abr'))
-    print(f'Parsed {len(items)} entries ({cnt_terms} terms, {cnt_abbr} abbreviations).')
+
+def expand_inputs(patterns):
+    """Expand files and glob patterns, keeping the given order (globs sorted)."""
+    paths = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern))
+            if not matches:
+                raise FileNotFoundError(f'no file matches {pattern}')
+            paths.extend(matches)
+        else:
+            if not os.path.exists(pattern):
+                raise FileNotFoundError(pattern)
+            paths.append(pattern)
+    seen = set()
+    return [p for p in paths if not (p in seen or seen.add(p))]
+
+
+def _next_boundary(buf, start, target):
+    """Offset of the first record boundary at or after `target`.
+
+    `start` must be a record boundary; quotes are counted from there so that
+    newlines inside quoted fields are not mistaken for record ends.
+    """
+    parity = buf[start:target].count(b'"') & 1
+    pos = target
+    while True:
+        nl = buf.find(b'\n', pos)
+        if nl < 0:
+            return len(buf)
+        parity ^= buf[pos:nl].count(b'"') & 1
+        if not parity:
+            return nl + 1
+        pos = nl + 1
+
+
+def split_ranges(path, chunk_bytes=CHUNK_BYTES):
+    """Return (fieldnames, [(start, end), ...]) covering the data records of a CSV."""
+    if os.path.getsize(path) == 0:
+        return [], []
+    with open(path, 'rb') as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        header_end = _next_boundary(buf, 0, 0)
+        fieldnames = next(csv.reader(io.StringIO(buf[:header_end].decode('utf-8'), newline='')), [])
+        ranges = []
+        start = header_end
+        size = len(buf)
+        while start < size:
+            end = size if start + chunk_bytes >= size else _next_boundary(buf, start, start + chunk_bytes)
+            ranges.append((start, end))
+            start = end
+    return fieldnames, ranges
+
+
+def _parse_range(args):
+    path, start, end, fieldnames = args
+    with open(path, 'rb') as fh:
+        fh.seek(start)
+        text = fh.read(end - start).decode('utf-8')
+    return [normalize_row(row) for row in csv.DictReader(io.StringIO(text, newline=''), fieldnames=fieldnames)]
+
+
+def _merge_key(it):
+    if it['id']:
+        return it['id']
+    return (it['type'].lower(), it['term'].lower())
+
+
+def merge_entries(sources):
+    """Merge [(source_name, entries)] in order; the first occurrence of an id wins.
+
+    Returns (merged, conflicts). Every merged entry gets a `sources` list of
+    "file:row" strings (row counted from 1 after the header). A conflict is
+    recorded when the same identifier appears with a different type, term
+    or definition.
+    """
+    merged = {}
+    conflicts = {}
+    for name, entries in sources:
+        for row, it in enumerate(entries, start=1):
+            where = f'{name}:{row}'
+            key = _merge_key(it)
+            kept = merged.get(key)
+            if kept is None:
+                merged[key] = dict(it, sources=[where])
+                continue
+            kept['sources'].append(where)
+            if any(kept[k] != it[k] for k in ('type', 'term', 'definition')):
+                conflict = conflicts.setdefault(key, {
+                    'id': it['id'],
+                    'kept': {'source': kept['sources'][0], 'term': kept['term'], 'definition': kept['definition']},
+                    'others': [],
+                })
+                conflict['others'].append({'source': where, 'term': it['term'], 'definition': it['definition']})
+    return list(merged.values()), list(conflicts.values())
+
+
+def ingest(inputs, output_path=None, workers=None, chunk_bytes=CHUNK_BYTES, fmt=None, index=False):
+    """Parse many glossary CSVs in parallel and write the merged result.
+
+    A `<output>.conflicts.json` report is written next to the output when
+    identifiers disagree between sources. `fmt` and `index` are those of
+    `write_entries`.
+    """
+    if output_path is None:
+        output_path = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')), 'data', 'glossary.json')
+    if fmt is None:
+        fmt = 'jsonl' if output_path.endswith('.jsonl') else 'json'
+    writer = write_jsonl if fmt == 'jsonl' else write_json_array
+    paths = expand_inputs(inputs)
+    tasks = []
+    for path in paths:
+        fieldnames, ranges = split_ranges(path, chunk_bytes)
+        tasks.extend((path, start, end, fieldnames) for start, end in ranges)
+
+    per_source = {path: [] for path in paths}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map() yields in submission order, which keeps the merge deterministic
+        for task, entries in zip(tasks, pool.map(_parse_range, tasks)):
+            per_source[task[0]].extend(entries)
+
+    # provenance uses base names unless two inputs share one
+    short = len({os.path.basename(p) for p in paths}) == len(paths)
+    merged, conflicts = merge_entries((os.path.basename(p) if short else p, per_source[p]) for p in paths)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    _write_atomic(output_path, lambda out: writer(merged, out))
+    conflicts_path = os.path.splitext(output_path)[0] + '.conflicts.json'
+    if conflicts:
+        _write_atomic(conflicts_path, lambda out: json.dump(conflicts, out, ensure_ascii=False, indent=2))
+    elif os.path.exists(conflicts_path):
+        os.unlink(conflicts_path)
+    if index and fmt == 'json' and not search_index.artefacts_fresh(output_path):
+        search_index.write_artefacts(output_path)
+
+    total = sum(len(v) for v in per_source.values())
+    print(f'Parsed {total} entries from {len(paths)} files in {len(tasks)} chunks; '
+          f'{len(merged)} unique, {len(conflicts)} conflicting identifiers.')
     print(f'Wrote {output_path}')
+    if conflicts:
+        print(f'Wrote {conflicts_path}')
+    return {'entries': total, 'unique': len(merged), 'conflicts': conflicts, 'files': paths}
 
 
 if __name__ == '__main__':
-    inp = sys.argv[1] if len(sys.argv) > 1 else None
-    outp = sys.argv[2] if len(sys.argv) > 2 else None
-    main(inp, outp)
+    parser = argparse.ArgumentParser(description='Convert the ECSS glossary CSV to JSON.')
+    parser.add_argument('input', nargs='?')
+    parser.add_argument('output', nargs='?', help="output file, or '-' for stdout")
+    parser.add_argument('--jsonl', action='store_true', help='write one JSON object per line')
+    parser.add_argument('--full', action='store_true', help='rewrite the output instead of applying the changes')
+    parser.add_argument('--index', action='store_true', help='also write precomputed search artefacts (JSON output)')
+    parser.add_argument('--merge', nargs='+', metavar='INPUT', help='parse and merge several files or glob patterns')
+    parser.add_argument('-o', '--out', help='output file for --merge')
+    parser.add_argument('--workers', type=int, help='worker processes for --merge (default: CPU count)')
+    args = parser.parse_args()
+    if args.merge:
+        ingest(args.merge, args.out or args.output, workers=args.workers,
+               fmt='jsonl' if args.jsonl else None, index=args.index)
+    else:
+        main(args.input, args.output, 'jsonl' if args.jsonl else None, full=args.full, index=args.index)
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""Extract the terms and abbreviations of an ECSS glossary standard from its PDF.
+
+The text of each page is read with `tools.pdf_reader` (no external
+dependency) in parallel worker processes; the lines are then walked in
+document order:
+
+- clause headings (`2.3 Terms and definitions`, `2.4 Abbreviated terms`)
+  select the section;
+- term headings are the lines set slightly larger than the body text, either
+  numbered (`2.3.12 applicable document`) or not, in which case they are
+  numbered in order within their clause (`2.2.1`, `2.2.2`, ...);
+- the definition is the first body paragraph under a term (lettered and
+  bulleted list items included); notes and `[ISO ...]` source lines are left out;
+- the abbreviation table is split on the x position of its `Meaning` column;
+- a list introduced without its colon gets one, and a word the PDF sets
+  against the next one across a font change (`failuresfrom`) is split when
+  both halves, but not the pair, occur elsewhere in the standard;
+- typographic apostrophes and dashes inside words become ASCII, as in
+  `ecss_glossaire.txt`, so both sources give the same glossary.
+
+The output uses the same schema as `parse_glossary.py`
+(`type`, `id`, `term`, `definition`).
+
+Usage:
+  python tools/pdf_glossary.py [standard.pdf] [output.json|output.jsonl|-]
+"""
+import argparse
+import glob
+import os
+import re
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import pdf_reader
+from tools.parse_glossary import write_entries
+
+# Font sizes (points) of the ECSS Word template: body text is 10 pt, term
+# headings 11 pt, sub-clause headings 14 pt and clause headings 16 pt.
+TERM_MIN_SIZE = 10.5
+SUBCLAUSE_MIN_SIZE = 13
+CLAUSE_MIN_SIZE = 15
+
+# Running headers and footers sit within these margins (points) of the
+# top and bottom edges, on portrait and landscape pages alike.
+HEADER_MARGIN = 65
+FOOTER_MARGIN = 60
+
+# Horizontal gap (fraction of the font size) between two runs that stands
+# for a word space.
+WORD_GAP = 0.15
+
+# Pages handed to a worker at a time.
+PAGES_PER_TASK = 8
+
+TERM_TYPE = 'Terme'
+ABBREVIATION_TYPE = 'Abréviation'
+
+_NUMBERED = re.compile(r'^(\d+(?:\.\d+)+)\s+(.*)$')
+_CLAUSE = re.compile(r'^(\d+(?:\.\d+)*)\.?\s+(.*)$')
+_LIST_ITEM = re.compile(r'^([a-z0-9]\.\s|[•–-]\s)')
+_CAPTION = re.compile(r'^(Figure|Table) [A-Z]?\d')
+_SPACES = re.compile(r'\s+')
+_WORD = re.compile(r'[A-Za-z]+')
+_WORD_END = re.compile(r'[A-Za-z]+$')
+_WORD_START = re.compile(r'^[A-Za-z]+')
+_INNER_DASH = re.compile(r'(?<=\w)[\u2010\u2011\u2013](?=\w)')
+_PUNCTUATED = re.compile(r'[:;,.]$')
+
+
+def _clean(text):
+    return _SPACES.sub(' ', text).strip()
+
+
+def _plain(text):
+    """`text` with typographic apostrophes and in-word dashes in ASCII."""
+    return _INNER_DASH.sub('-', text.replace('\u2019', "'").replace('\u2018', "'"))
+
+
+def page_lines(doc, index):
+    """Return the text lines of a page as (x, y, size, text, runs, joins), top to bottom.
+
+    Runs whose baselines are within a few points (superscripts, kerned
+    fragments) are merged into one line; `runs` keeps the (x, text) pieces
+    for table splitting, and `joins` the (left, right) words of two runs
+    set against each other without a gap (see `split_run_together`).
+    """
+    page = doc.pages[index]
+    box = page.get('MediaBox') or [0, 0, 595, 842]
+    top = box[3] - HEADER_MARGIN
+    bottom = box[1] + FOOTER_MARGIN
+    runs = [r for r in doc.page_text_runs(index) if bottom < r[1] < top]
+    runs.sort(key=lambda r: (-r[1], r[0]))
+    lines = []
+    current = []
+    for run in runs:
+        if current and abs(current[0][1] - run[1]) > 3:
+            lines.append(current)
+            current = []
+        current.append(run)
+    if current:
+        lines.append(current)
+    out = []
+    for line in lines:
+        line.sort(key=lambda r: r[0])
+        pieces = []
+        joins = []
+        end = None
+        for rx, _, size, rtext, width in line:
+            if end is not None and rx - end > WORD_GAP * size:
+                # justified text places words apart without a space character
+                if pieces[-1][-1:] != ' ' and rtext[:1] != ' ':
+                    pieces.append(' ')
+            elif end is not None:
+                left, right = _WORD_END.search(pieces[-1]), _WORD_START.match(rtext)
+                if left and right:
+                    joins.append((left.group(0), right.group(0)))
+            pieces.append(rtext)
+            end = rx + width
+        text = _clean(''.join(pieces))
+        if not text:
+            continue
+        size = max(r[2] for r in line)
+        out.append((line[0][0], line[0][1], size, text, [(r[0], r[3]) for r in line], joins))
+    return out
+
+
+def split_run_together(pages):
+    """Put back the spaces missing between two runs in the PDF (`failuresfrom`).
+
+    Runs often meet inside a word (kerning, a change of font), so a join is
+    only split when the joined word occurs once in the whole standard and
+    each half occurs elsewhere on its own. Needs every page: returns a list.
+    """
+    pages = [list(lines) for lines in pages]
+    words = Counter(w.lower() for lines in pages for line in lines for w in _WORD.findall(line[3]))
+    for lines in pages:
+        for i, (x, y, size, text, runs, joins) in enumerate(lines):
+            for left, right in joins:
+                if (len(left) > 1 and len(right) > 1 and words[(left + right).lower()] == 1
+                        and words[left.lower()] > 1 and words[right.lower()] > 1):
+                    text = re.sub(rf'\b{left}{right}\b', f'{left} {right}', text, count=1)
+            lines[i] = (x, y, size, text, runs, joins)
+    return pages
+
+
+def _extract_pages(args):
+    path, start, end = args
+    with pdf_reader.Document(path) as doc:
+        return [page_lines(doc, i) for i in range(start, end)]
+
+
+def iter_page_lines(path, workers=None, pages=None):
+    """Yield the lines of every page in order, parsing pages in parallel.
+
+    `pages` is an optional (first, last) range of 0-based page indexes.
+    """
+    with pdf_reader.Document(path) as doc:
+        count = len(doc.pages)
+    first, last = pages or (0, count)
+    last = min(last, count)
+    tasks = [(path, i, min(i + PAGES_PER_TASK, last)) for i in range(first, last, PAGES_PER_TASK)]
+    if workers == 1 or len(tasks) <= 1:
+        results = map(_extract_pages, tasks)
+        for chunk in results:
+            yield from chunk
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map() keeps the page order
+        for chunk in pool.map(_extract_pages, tasks):
+            yield from chunk
+
+
+def parse_lines(pages):
+    """Turn page lines (as from `iter_page_lines`) into glossary entries."""
+    section = None        # number of the current clause, e.g. '2.3'
+    abbreviations = False
+    meaning_x = None
+    counters = {}
+    entry = None          # entry whose definition is being collected
+    parts = []
+    collecting = False
+    listed = False        # a list item was reached in the definition
+
+    def finish():
+        nonlocal entry, parts, collecting, listed
+        listed = False
+        if entry is not None:
+            entry['term'] = _plain(entry['term'])
+            entry['definition'] = _plain(_clean(' '.join(parts)))
+            yield entry
+        entry = None
+        parts = []
+        collecting = False
+
+    for lines in pages:
+        prev_y = None
+        for x, y, size, text, runs, _ in lines:
+            # a page break never counts as a paragraph gap
+            gap = None if prev_y is None else prev_y - y
+            prev_y = y
+
+            if size >= CLAUSE_MIN_SIZE:
+                yield from finish()
+                m = _CLAUSE.match(text)
+                # only the sub-clauses of clause 2 hold terms
+                section = m.group(1) if m and m.group(1).startswith('2.') else None
+                abbreviations = section is not None and 'abbreviat' in m.group(2).lower()
+                meaning_x = None
+                continue
+            if section is None or _CAPTION.match(text):
+                continue
+            if size >= SUBCLAUSE_MIN_SIZE:
+                yield from finish()
+                continue
+
+            if abbreviations:
+                if text.startswith('Abbreviation'):
+                    # table header, repeated on every page
+                    meaning_x = next((rx for rx, rt in runs if rt.strip().startswith('Meaning')), meaning_x)
+                    continue
+                if meaning_x is None:
+                    continue
+                left = _clean(''.join(rt for rx, rt in runs if rx < meaning_x - 1))
+                right = _clean(''.join(rt for rx, rt in runs if rx >= meaning_x - 1))
+                if left:
+                    yield from finish()
+                    counters[section] = counters.get(section, 0) + 1
+                    entry = {'type': ABBREVIATION_TYPE, 'id': str(counters[section]), 'term': left, 'definition': ''}
+                    collecting = True
+                if right and collecting:
+                    # a wrapped meaning continues the current row
+                    parts.append(right)
+                continue
+
+            if size >= TERM_MIN_SIZE:
+                yield from finish()
+                m = _NUMBERED.match(text)
+                if m and not m.group(1).startswith(section + '.'):
+                    # an example quoted from another clause
+                    continue
+                if m:
+                    ident, term = m.group(1), m.group(2)
+                else:
+                    counters[section] = counters.get(section, 0) + 1
+                    ident, term = f'{section}.{counters[section]}', text
+                entry = {'type': TERM_TYPE, 'id': ident, 'term': term, 'definition': ''}
+                collecting = True
+                continue
+
+            if not collecting:
+                continue
+            if text.startswith(('NOTE', 'EXAMPLE', '[')):
+                collecting = False
+            elif parts and gap is not None and gap > 1.6 * size and not _LIST_ITEM.match(text):
+                # a new paragraph after the definition (examples, remarks)
+                collecting = False
+            else:
+                if _LIST_ITEM.match(text):
+                    if parts and not listed and not _PUNCTUATED.search(parts[-1]):
+                        # the lead-in of a list ends with a colon (`results in:`)
+                        parts[-1] += ':'
+                    listed = True
+                parts.append(text)
+    yield from finish()
+
+
+def extract(pdf_path, workers=None, pages=None):
+    """Yield the glossary entries of an ECSS standard PDF in document order."""
+    return parse_lines(split_run_together(iter_page_lines(pdf_path, workers=workers, pages=pages)))
+
+
+def default_pdf():
+    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    found = sorted(glob.glob(os.path.join(repo_root, 'ECSS-*.pdf')))
+    if not found:
+        raise FileNotFoundError(f'no ECSS-*.pdf in {repo_root}')
+    return found[0]
+
+
+def main(pdf_path=None, output_path=None, fmt=None, workers=None, pages=None, full=False, index=False):
+    if pdf_path is None:
+        pdf_path = default_pdf()
+    if output_path is None:
+        output_path = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')), 'data', 'glossary.json')
+    return write_entries(extract(pdf_path, workers=workers, pages=pages), output_path, fmt, full=full, index=index)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Extract the glossary of an ECSS standard PDF to JSON.')
+    parser.add_argument('input', nargs='?', help='standard PDF (default: the ECSS-*.pdf at the repository root)')
+    parser.add_argument('output', nargs='?', help="output file, or '-' for stdout")
+    parser.add_argument('--jsonl', action='store_true', help='write one JSON object per line')
+    parser.add_argument('--workers', type=int, help='worker processes (default: CPU count)')
+    parser.add_argument('--full', action='store_true', help='rewrite the output instead of applying the changes')
+    parser.add_argument('--index', action='store_true', help='also write precomputed search artefacts (JSON output)')
+    parser.add_argument('--pages', help='0-based page range FIRST:LAST to read (default: all)')
+    args = parser.parse_args()
+    page_range = None
+    if args.pages:
+        first, _, last = args.pages.partition(':')
+        page_range = (int(first or 0), int(last) if last else sys.maxsize)
+    main(args.input, args.output, 'jsonl' if args.jsonl else None, workers=args.workers, pages=page_range, full=args.full, index=args.index)
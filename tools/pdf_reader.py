@@ -0,0 +1,601 @@
+"""Minimal pure-Python PDF reader: objects, pages and text runs.
+
+Only what the ECSS standards need is supported: classic cross-reference
+tables or cross-reference streams, object streams, FlateDecode streams and
+simple or Type0 fonts with a `/ToUnicode` CMap. The file is memory-mapped
+and objects are parsed on first access, so opening a document and reading
+one page only touches the bytes of that page.
+"""
+import mmap
+import re
+import zlib
+
+WHITESPACE = b' \t\r\n\x0c\x00'
+DELIMITERS = b'()<>[]{}/%'
+
+_ESCAPES = {ord('n'): 10, ord('r'): 13, ord('t'): 9, ord('b'): 8, ord('f'): 12,
+            ord('('): 40, ord(')'): 41, ord('\\'): 92}
+
+
+class PDFError(ValueError):
+    pass
+
+
+class Name(str):
+    """A PDF name (`/Type`), distinct from a string."""
+
+
+class Ref:
+    __slots__ = ('num', 'gen')
+
+    def __init__(self, num, gen):
+        self.num = num
+        self.gen = gen
+
+    def __repr__(self):
+        return f'Ref({self.num}, {self.gen})'
+
+
+class Stream:
+    __slots__ = ('attrs', 'raw')
+
+    def __init__(self, attrs, raw):
+        self.attrs = attrs
+        self.raw = raw
+
+
+class Operator(str):
+    """A bare keyword in a content stream (`BT`, `Tj`, ...)."""
+
+
+class Lexer:
+    """Tokenizer/parser for PDF objects over a bytes-like buffer."""
+
+    def __init__(self, buf, pos=0):
+        self.buf = buf
+        self.pos = pos
+
+    def skip_ws(self):
+        buf = self.buf
+        n = len(buf)
+        pos = self.pos
+        while pos < n:
+            c = buf[pos]
+            if c in WHITESPACE:
+                pos += 1
+            elif c == 37:  # % comment
+                while pos < n and buf[pos] not in b'\r\n':
+                    pos += 1
+            else:
+                break
+        self.pos = pos
+
+    def _word(self):
+        buf = self.buf
+        start = pos = self.pos
+        n = len(buf)
+        while pos < n and buf[pos] not in WHITESPACE and buf[pos] not in DELIMITERS:
+            pos += 1
+        self.pos = pos
+        return bytes(buf[start:pos])
+
+    def _literal_string(self):
+        buf = self.buf
+        pos = self.pos + 1
+        depth = 1
+        out = bytearray()
+        while True:
+            c = buf[pos]
+            if c == 92:  # backslash
+                pos += 1
+                c = buf[pos]
+                if c in _ESCAPES:
+                    out.append(_ESCAPES[c])
+                    pos += 1
+                elif 48 <= c <= 55:
+                    end = pos
+                    while end < pos + 3 and 48 <= buf[end] <= 55:
+                        end += 1
+                    out.append(int(bytes(buf[pos:end]), 8) & 0xff)
+                    pos = end
+                elif c == 13:
+                    pos += 2 if buf[pos + 1] == 10 else 1
+                elif c == 10:
+                    pos += 1
+                else:
+                    out.append(c)
+                    pos += 1
+                continue
+            if c == 40:
+                depth += 1
+            elif c == 41:
+                depth -= 1
+                if depth == 0:
+                    self.pos = pos + 1
+                    return bytes(out)
+            out.append(c)
+            pos += 1
+
+    def _hex_string(self):
+        end = self.buf.find(b'>', self.pos)
+        digits = re.sub(rb'\s', b'', bytes(self.buf[self.pos + 1:end]))
+        if len(digits) % 2:
+            digits += b'0'
+        self.pos = end + 1
+        return bytes.fromhex(digits.decode('ascii'))
+
+    def next_object(self):
+        """Parse one object; keywords come back as `Operator` instances.
+
+        Raises EOFError at the end of the buffer.
+        """
+        self.skip_ws()
+        buf = self.buf
+        if self.pos >= len(buf):
+            raise EOFError
+        c = buf[self.pos]
+        if c == 47:  # /Name
+            self.pos += 1
+            word = self._word()
+            return Name(re.sub(rb'#([0-9a-fA-F]{2})', lambda m: bytes([int(m.group(1), 16)]), word).decode('latin-1'))
+        if c == 40:
+            return self._literal_string()
+        if c == 60:
+            if buf[self.pos + 1] == 60:
+                self.pos += 2
+                return self._dict()
+            return self._hex_string()
+        if c == 91:
+            self.pos += 1
+            items = []
+            while True:
+                self.skip_ws()
+                if buf[self.pos] == 93:
+                    self.pos += 1
+                    return items
+                items.append(self.next_object())
+        if c in b')>]}{':
+            self.pos += 1
+            return Operator(chr(c))
+        word = self._word()
+        if not word:
+            self.pos += 1
+            return Operator(chr(c))
+        if word[0] in b'+-.0123456789':
+            try:
+                num = float(word) if b'.' in word else int(word)
+            except ValueError:
+                return Operator(word.decode('latin-1'))
+            if isinstance(num, int) and num >= 0:
+                # "12 0 R" is an indirect reference
+                m = _REF.match(buf, self.pos)
+                if m:
+                    self.pos = m.end()
+                    return Ref(num, int(m.group(1)))
+            return num
+        if word == b'true':
+            return True
+        if word == b'false':
+            return False
+        if word == b'null':
+            return None
+        return Operator(word.decode('latin-1'))
+
+    def _dict(self):
+        out = {}
+        while True:
+            self.skip_ws()
+            if self.buf[self.pos:self.pos + 2] == b'>>':
+                self.pos += 2
+                return out
+            key = self.next_object()
+            out[key] = self.next_object()
+
+
+_REF = re.compile(rb'\s+(\d+)\s+R(?=[\s/<>\[\]()%]|$)')
+_OBJ_HEADER = re.compile(rb'\s*(\d+)\s+(\d+)\s+obj\b')
+
+
+def decode_stream(stream):
+    """Return the decoded bytes of a Stream (FlateDecode or unfiltered)."""
+    filters = stream.attrs.get('Filter')
+    if filters is None:
+        return bytes(stream.raw)
+    if not isinstance(filters, list):
+        filters = [filters]
+    data = bytes(stream.raw)
+    for f in filters:
+        if f != 'FlateDecode':
+            raise PDFError(f'unsupported filter {f}')
+        try:
+            data = zlib.decompress(data)
+        except zlib.error:
+            # some producers leave trailing garbage after the deflate stream
+            data = zlib.decompressobj().decompress(data)
+    parms = stream.attrs.get('DecodeParms') or {}
+    if isinstance(parms, dict) and parms.get('Predictor', 1) >= 10:
+        data = _unpredict_png(data, parms.get('Columns', 1))
+    return data
+
+
+def _unpredict_png(data, columns):
+    # only the "Up" predictor is used by xref streams in practice
+    stride = columns + 1
+    prev = bytearray(columns)
+    out = bytearray()
+    for i in range(0, len(data), stride):
+        kind = data[i]
+        row = bytearray(data[i + 1:i + stride])
+        if kind == 2:
+            row = bytearray((a + b) & 0xff for a, b in zip(row, prev))
+        elif kind != 0:
+            raise PDFError(f'unsupported PNG predictor {kind}')
+        out += row
+        prev = row
+    return bytes(out)
+
+
+class Document:
+    """A PDF file opened through mmap; use as a context manager."""
+
+    def __init__(self, path):
+        self._fh = open(path, 'rb')
+        try:
+            self.buf = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._fh.close()
+            raise PDFError(f'{path}: empty file')
+        self.offsets = {}      # num -> byte offset
+        self.in_streams = {}   # num -> (object stream num, index)
+        self.trailer = {}
+        self._cache = {}
+        self._pages = None
+        self._read_xref()
+
+    def close(self):
+        self._cache.clear()
+        self.buf.close()
+        self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # -- cross-reference --------------------------------------------------
+
+    def _read_xref(self):
+        tail = self.buf[-1024:]
+        idx = tail.rfind(b'startxref')
+        if idx < 0:
+            raise PDFError('startxref not found')
+        pos = int(tail[idx + 9:].split()[0])
+        seen = set()
+        while pos is not None and pos not in seen:
+            seen.add(pos)
+            lex = Lexer(self.buf, pos)
+            lex.skip_ws()
+            if self.buf[lex.pos:lex.pos + 4] == b'xref':
+                trailer = self._read_xref_table(lex)
+            else:
+                trailer = self._read_xref_stream(lex)
+            for key, value in trailer.items():
+                self.trailer.setdefault(key, value)
+            if 'XRefStm' in trailer:
+                self._read_xref_stream(Lexer(self.buf, trailer['XRefStm']))
+            pos = trailer.get('Prev')
+
+    def _read_xref_table(self, lex):
+        lex.pos += 4
+        while True:
+            lex.skip_ws()
+            if self.buf[lex.pos:lex.pos + 7] == b'trailer':
+                lex.pos += 7
+                return lex.next_object()
+            start = lex.next_object()
+            count = lex.next_object()
+            lex.skip_ws()
+            for i in range(count):
+                entry = self.buf[lex.pos:lex.pos + 20]
+                lex.pos += 20
+                num = start + i
+                if entry[17:18] == b'n' and num not in self.offsets and num not in self.in_streams:
+                    self.offsets[num] = int(entry[:10])
+
+    def _read_xref_stream(self, lex):
+        num, _, stream = self._parse_indirect(lex.pos)
+        attrs = stream.attrs
+        data = decode_stream(stream)
+        widths = attrs['W']
+        size = sum(widths)
+        index = attrs.get('Index') or [0, attrs['Size']]
+        pos = 0
+        for start, count in zip(index[0::2], index[1::2]):
+            for num in range(start, start + count):
+                fields = []
+                for w in widths:
+                    fields.append(int.from_bytes(data[pos:pos + w], 'big') if w else None)
+                    pos += w
+                kind = 1 if fields[0] is None else fields[0]
+                if num in self.offsets or num in self.in_streams:
+                    continue
+                if kind == 1:
+                    self.offsets[num] = fields[1]
+                elif kind == 2:
+                    self.in_streams[num] = (fields[1], fields[2])
+        return attrs
+
+    # -- objects ----------------------------------------------------------
+
+    def _parse_indirect(self, offset):
+        m = _OBJ_HEADER.match(self.buf, offset)
+        if not m:
+            raise PDFError(f'no object at offset {offset}')
+        lex = Lexer(self.buf, m.end())
+        value = lex.next_object()
+        lex.skip_ws()
+        if isinstance(value, dict) and self.buf[lex.pos:lex.pos + 6] == b'stream':
+            start = lex.pos + 6
+            if self.buf[start:start + 2] == b'\r\n':
+                start += 2
+            elif self.buf[start:start + 1] in (b'\n', b'\r'):
+                start += 1
+            length = value.get('Length')
+            if isinstance(length, Ref):
+                length = self.resolve(length)
+            if not isinstance(length, int) or self.buf[start + length:start + length + 20].find(b'endstream') < 0:
+                length = self.buf.find(b'endstream', start) - start
+            value = Stream(value, memoryview(self.buf)[start:start + length])
+        return int(m.group(1)), int(m.group(2)), value
+
+    def get(self, num):
+        """Return object `num`, parsing it on first access."""
+        if num in self._cache:
+            return self._cache[num]
+        if num in self.offsets:
+            value = self._parse_indirect(self.offsets[num])[2]
+        elif num in self.in_streams:
+            value = self._from_object_stream(*self.in_streams[num])
+        else:
+            value = None
+        self._cache[num] = value
+        return value
+
+    def _from_object_stream(self, stream_num, index):
+        stream = self.get(stream_num)
+        data = decode_stream(stream)
+        lex = Lexer(data)
+        header = [lex.next_object() for _ in range(2 * stream.attrs['N'])]
+        lex.pos = stream.attrs['First'] + header[2 * index + 1]
+        return lex.next_object()
+
+    def resolve(self, value):
+        while isinstance(value, Ref):
+            value = self.get(value.num)
+        return value
+
+    # -- pages ------------------------------------------------------------
+
+    @property
+    def pages(self):
+        """Page dictionaries in document order (only the page tree is parsed)."""
+        if self._pages is None:
+            root = self.resolve(self.trailer['Root'])
+            self._pages = []
+            self._walk(self.resolve(root['Pages']), {})
+        return self._pages
+
+    def _walk(self, node, inherited):
+        inherited = dict(inherited)
+        for key in ('Resources', 'MediaBox', 'Rotate'):
+            if key in node:
+                inherited[key] = node[key]
+        if node.get('Type') == 'Pages' or 'Kids' in node:
+            for kid in node['Kids']:
+                self._walk(self.resolve(kid), inherited)
+        else:
+            page = dict(inherited)
+            page.update(node)
+            self._pages.append(page)
+
+    def page_content(self, page):
+        contents = self.resolve(page.get('Contents'))
+        if contents is None:
+            return b''
+        if isinstance(contents, list):
+            return b'\n'.join(decode_stream(self.resolve(c)) for c in contents)
+        return decode_stream(contents)
+
+    def fonts(self, page):
+        """Map resource name -> Font for a page."""
+        resources = self.resolve(page.get('Resources')) or {}
+        fonts = self.resolve(resources.get('Font')) or {}
+        out = {}
+        for name, ref in fonts.items():
+            key = ref.num if isinstance(ref, Ref) else id(ref)
+            font = self._cache.get(('font', key))
+            if font is None:
+                font = Font(self, self.resolve(ref))
+                self._cache[('font', key)] = font
+            out[name] = font
+        return out
+
+    def page_text_runs(self, index):
+        """Return [(x, y, font_size, text, width)] for the text shown on page `index`."""
+        page = self.pages[index]
+        return text_runs(self.page_content(page), self.fonts(page))
+
+
+class Font:
+    """Byte -> unicode decoding for one font, from its ToUnicode CMap."""
+
+    def __init__(self, doc, attrs):
+        self.two_byte = attrs.get('Subtype') == 'Type0'
+        self.map = {}
+        self.widths = {}
+        self.default_width = 0
+        cmap = doc.resolve(attrs.get('ToUnicode'))
+        if isinstance(cmap, Stream):
+            self._load_cmap(decode_stream(cmap))
+        if self.two_byte:
+            descendants = doc.resolve(attrs.get('DescendantFonts')) or [{}]
+            cid_font = doc.resolve(descendants[0]) or {}
+            self.default_width = cid_font.get('DW', 1000)
+            w = doc.resolve(cid_font.get('W')) or []
+            i = 0
+            while i + 1 < len(w):
+                first, spec = w[i], doc.resolve(w[i + 1])
+                if isinstance(spec, list):
+                    for offset, width in enumerate(spec):
+                        self.widths[first + offset] = width
+                    i += 2
+                else:
+                    for code in range(first, spec + 1):
+                        self.widths[code] = w[i + 2]
+                    i += 3
+        else:
+            first = attrs.get('FirstChar', 0)
+            for offset, width in enumerate(doc.resolve(attrs.get('Widths')) or []):
+                self.widths[first + offset] = width
+
+    def _load_cmap(self, data):
+        for block in re.findall(rb'beginbfchar(.*?)endbfchar', data, re.S):
+            for src, dst in re.findall(rb'<([0-9a-fA-F]+)>\s*<([0-9a-fA-F]*)>', block):
+                self.map[int(src, 16)] = _utf16(dst)
+        for block in re.findall(rb'beginbfrange(.*?)endbfrange', data, re.S):
+            for lo, hi, dst in re.findall(rb'<([0-9a-fA-F]+)>\s*<([0-9a-fA-F]+)>\s*(<[0-9a-fA-F]*>|\[[^\]]*\])', block):
+                lo, hi = int(lo, 16), int(hi, 16)
+                if dst.startswith(b'['):
+                    for code, item in zip(range(lo, hi + 1), re.findall(rb'<([0-9a-fA-F]*)>', dst)):
+                        self.map[code] = _utf16(item)
+                else:
+                    base = bytes.fromhex(dst[1:-1].decode('ascii'))
+                    for offset, code in enumerate(range(lo, hi + 1)):
+                        last = base[-2:]
+                        value = int.from_bytes(last, 'big') + offset
+                        self.map[code] = (base[:-2] + value.to_bytes(2, 'big')).decode('utf-16-be', 'replace')
+
+    def codes(self, data):
+        if self.two_byte:
+            return [int.from_bytes(data[i:i + 2], 'big') for i in range(0, len(data) - 1, 2)]
+        return list(data)
+
+    def decode(self, data):
+        return ''.join(self.map.get(c) or (chr(c) if not self.two_byte else '') for c in self.codes(data))
+
+    def advance(self, data, size, char_spacing=0, word_spacing=0):
+        """Horizontal displacement (text space) of showing `data`."""
+        total = 0
+        for c in self.codes(data):
+            total += self.widths.get(c, self.default_width) * size / 1000 + char_spacing
+            if c == 32 and not self.two_byte:
+                total += word_spacing
+        return total
+
+
+def _utf16(hexdigits):
+    return bytes.fromhex(hexdigits.decode('ascii')).decode('utf-16-be', 'replace')
+
+
+def text_runs(content, fonts):
+    """Interpret the text operators of a content stream.
+
+    Returns [(x, y, font_size, text, width)], one item per shown string,
+    with the baseline position and advance width in user space. Graphics
+    state transforms (`cm`) are applied for translation and scale only,
+    which covers text laid out by word processors.
+    """
+    lex = Lexer(content)
+    operands = []
+    runs = []
+    ctm = [1, 0, 0, 1, 0, 0]
+    stack = []
+    tm = lm = [1, 0, 0, 1, 0, 0]
+    font = None
+    size = 0
+    leading = char_spacing = word_spacing = 0
+
+    def show(items):
+        # items: strings to show, or numbers (TJ adjustments, 1/1000 em)
+        nonlocal tm
+        if font is None:
+            return
+        a, b, c, d, e, f = _mul(tm, ctm)
+        text = ''
+        advance = 0
+        for item in items:
+            if isinstance(item, bytes):
+                text += font.decode(item)
+                advance += font.advance(item, size, char_spacing, word_spacing)
+            elif isinstance(item, (int, float)):
+                if item < -200 and text and not text.endswith(' '):
+                    # a wide negative kern is a word gap
+                    text += ' '
+                advance -= item * size / 1000
+        tm = _mul([1, 0, 0, 1, advance, 0], tm)
+        scale = abs(a or d)
+        runs.append((round(e, 2), round(f, 2), round(size * abs(d or a), 2), text, round(advance * scale, 2)))
+
+    while True:
+        try:
+            obj = lex.next_object()
+        except EOFError:
+            break
+        except (IndexError, ValueError):
+            break
+        if not isinstance(obj, Operator):
+            operands.append(obj)
+            continue
+        op = str(obj)
+        if op == 'BI':
+            # skip inline images
+            end = content.find(b'EI', lex.pos)
+            lex.pos = len(content) if end < 0 else end + 2
+        elif op == 'q':
+            stack.append(ctm)
+        elif op == 'Q':
+            if stack:
+                ctm = stack.pop()
+        elif op == 'cm' and len(operands) >= 6:
+            ctm = _mul(operands[-6:], ctm)
+        elif op == 'BT':
+            tm = lm = [1, 0, 0, 1, 0, 0]
+        elif op == 'Tf' and len(operands) >= 2:
+            font = fonts.get(operands[-2])
+            size = operands[-1]
+        elif op == 'TL' and operands:
+            leading = operands[-1]
+        elif op == 'Tc' and operands:
+            char_spacing = operands[-1]
+        elif op == 'Tw' and operands:
+            word_spacing = operands[-1]
+        elif op == 'Tm' and len(operands) >= 6:
+            tm = lm = list(operands[-6:])
+        elif op in ('Td', 'TD') and len(operands) >= 2:
+            tx, ty = operands[-2:]
+            if op == 'TD':
+                leading = -ty
+            tm = lm = _mul([1, 0, 0, 1, tx, ty], lm)
+        elif op == 'T*':
+            tm = lm = _mul([1, 0, 0, 1, 0, -leading], lm)
+        elif op == 'Tj' and operands:
+            show([operands[-1]])
+        elif op == 'TJ' and operands:
+            show(operands[-1])
+        elif op == "'" and operands:
+            tm = lm = _mul([1, 0, 0, 1, 0, -leading], lm)
+            show([operands[-1]])
+        elif op == '"' and len(operands) >= 3:
+            word_spacing, char_spacing = operands[-3], operands[-2]
+            tm = lm = _mul([1, 0, 0, 1, 0, -leading], lm)
+            show([operands[-1]])
+        operands = []
+    return runs
+
+
+def _mul(m, n):
+    a, b, c, d, e, f = m
+    p, q, r, s, t, u = n
+    return [a * p + b * r, a * q + b * s, c * p + d * r, c * q + d * s,
+            e * p + f * r + t, e * q + f * s + u]
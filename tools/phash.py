@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Perceptual hashes (dHash) and a BK-tree for near-duplicate diagrams.
+
+The dHash of an image is computed on a 9x8 grayscale thumbnail: each bit
+says whether a cell is brighter than its right-hand neighbour. Re-saved or
+slightly altered screenshots end up a few bits apart, so near duplicates are
+found by Hamming distance, which the BK-tree answers without comparing
+against every image.
+
+Hashes missing from images.json (diagrams uploaded before hashing existed,
+or whose background hash failed) are filled in by `python -m tools.admin
+reindex`.
+"""
+import os
+import sys
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import png_codec, tiles
+
+HASH_WIDTH = 9
+HASH_HEIGHT = 8
+
+# Hamming distance (out of 64 bits) up to which two diagrams are reported
+# as near duplicates. Distinct diagrams on white backgrounds sit around
+# 11+ bits apart, re-saves and small edits within a few bits.
+NEAR_DUPLICATE_DISTANCE = 6
+
+
+def dhash_file(path):
+    """Return the 64-bit dHash of a PNG file as a 16-digit hex string."""
+    with open(path, 'rb') as fh:
+        header, extra, rows = png_codec.iter_file_rows(fh)
+        convert = tiles.rgba_converter(header, extra)
+        w, h = header.width, header.height
+        bounds = [(x * w // HASH_WIDTH, max(x * w // HASH_WIDTH + 1, (x + 1) * w // HASH_WIDTH))
+                  for x in range(HASH_WIDTH)]
+        sums = [[0] * HASH_WIDTH for _ in range(HASH_HEIGHT)]
+        counts = [0] * HASH_HEIGHT
+        for y, row in enumerate(rows):
+            rgba = convert(row)
+            cell_row = sums[y * HASH_HEIGHT // h]
+            counts[y * HASH_HEIGHT // h] += 1
+            for cx, (x0, x1) in enumerate(bounds):
+                cell = rgba[x0 * 4:x1 * 4]
+                # ITU-R 601 luma from per-channel sums
+                cell_row[cx] += 299 * sum(cell[0::4]) + 587 * sum(cell[1::4]) + 114 * sum(cell[2::4])
+    value = 0
+    for cy in range(HASH_HEIGHT):
+        n = counts[cy] or 1
+        cells = [s / ((x1 - x0) * n) for s, (x0, x1) in zip(sums[cy], bounds)]
+        for cx in range(HASH_WIDTH - 1):
+            value = (value << 1) | (1 if cells[cx] > cells[cx + 1] else 0)
+    return f'{value:016x}'
+
+
+def hamming(a, b):
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
+
+
+class BKTree:
+    """Burkhard-Keller tree over hex hashes with Hamming distance.
+
+    Each node is [hash, values, children] where children maps a distance to
+    a subtree; identical hashes share a node.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, h, value):
+        self.size += 1
+        if self.root is None:
+            self.root = [h, [value], {}]
+            return
+        node = self.root
+        while True:
+            d = hamming(h, node[0])
+            if d == 0:
+                node[1].append(value)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [h, [value], {}]
+                return
+            node = child
+
+    def search(self, h, max_distance):
+        """Return [(distance, value)] for every hash within `max_distance`."""
+        found = []
+        if self.root is None:
+            return found
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            d = hamming(h, node[0])
+            if d <= max_distance:
+                found.extend((d, v) for v in node[1])
+            for cd, child in node[2].items():
+                if d - max_distance <= cd <= d + max_distance:
+                    stack.append(child)
+        found.sort(key=lambda pair: pair[0])
+        return found
+
+
+def index_entry(meta):
+    """The part of an image's metadata kept in the index."""
+    return {'id': meta.get('id'), 'title': meta.get('title'), 'filename': meta.get('filename')}
+
+
+def build_index(images):
+    """BK-tree of images keyed by their stored `phash`."""
+    tree = BKTree()
+    for meta in images:
+        if meta.get('phash') and meta.get('id'):
+            tree.add(meta['phash'], index_entry(meta))
+    return tree
@@ -0,0 +1,318 @@
+"""Minimal pure-Python PNG reader/writer (stdlib only).
+
+Only what the image tools need: chunk iteration, scanline (un)filtering and
+re-encoding of non-interlaced images. Pixels are handled as lists of raw
+(unfiltered) scanlines, one `bytes` object per row.
+"""
+import struct
+import zlib
+from collections import namedtuple
+from itertools import accumulate
+
+SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# channels per pixel, by colour type
+CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+Header = namedtuple('Header', 'width height bit_depth color_type interlace')
+
+# Largest filtered image stream (scanlines plus filter bytes) this module will
+# inflate: 256 MiB, e.g. 64 megapixels of 8-bit RGBA. IDAT compresses a
+# blank image about 1000:1, so the header is checked before any inflating.
+MAX_STREAM_BYTES = 1 << 28
+
+
+class PNGError(ValueError):
+    """Raised when data is not a PNG this module can handle."""
+
+
+def iter_chunks(data):
+    """Yield (type, body) pairs for every chunk of a PNG byte string."""
+    if data[:8] != SIGNATURE:
+        raise PNGError('not a PNG file')
+    pos = 8
+    end = len(data)
+    while pos + 8 <= end:
+        length, ctype = struct.unpack('>I4s', data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        if len(body) != length:
+            raise PNGError('truncated chunk %r' % ctype)
+        yield ctype, body
+        pos += 12 + length
+        if ctype == b'IEND':
+            return
+    raise PNGError('missing IEND chunk')
+
+
+def make_chunk(ctype, body):
+    return struct.pack('>I', len(body)) + ctype + body + struct.pack('>I', zlib.crc32(ctype + body) & 0xffffffff)
+
+
+def parse_header(body):
+    width, height, bit_depth, color_type, _comp, _filt, interlace = struct.unpack('>IIBBBBB', body[:13])
+    if color_type not in CHANNELS:
+        raise PNGError('unknown colour type %d' % color_type)
+    return Header(width, height, bit_depth, color_type, interlace)
+
+
+def header_bytes(header):
+    return struct.pack('>IIBBBBB', header.width, header.height, header.bit_depth,
+                       header.color_type, 0, 0, header.interlace)
+
+
+def read_header(data):
+    """Return the Header of a PNG without decoding pixel data."""
+    for ctype, body in iter_chunks(data):
+        if ctype == b'IHDR':
+            return parse_header(body)
+        break
+    raise PNGError('IHDR must be the first chunk')
+
+
+def bytes_per_pixel(header):
+    """Filter unit in bytes (at least 1, as defined by the PNG spec)."""
+    return max(1, CHANNELS[header.color_type] * header.bit_depth // 8)
+
+
+def row_stride(header):
+    return (header.width * CHANNELS[header.color_type] * header.bit_depth + 7) // 8
+
+
+# Adam7 passes: (x0, y0, dx, dy)
+_ADAM7 = ((0, 0, 8, 8), (4, 0, 8, 8), (0, 4, 4, 8), (2, 0, 4, 4), (0, 2, 2, 4), (1, 0, 2, 2), (0, 1, 1, 2))
+
+
+def stream_size(header, max_bytes=MAX_STREAM_BYTES):
+    """Size of the filtered image stream `header` announces; PNGError above `max_bytes`."""
+    if header.interlace:
+        size = 0
+        for x0, y0, dx, dy in _ADAM7:
+            width = (header.width - x0 + dx - 1) // dx
+            height = (header.height - y0 + dy - 1) // dy
+            if width > 0 and height > 0:
+                size += (row_stride(header._replace(width=width)) + 1) * height
+    else:
+        size = (row_stride(header) + 1) * header.height
+    if size > max_bytes:
+        raise PNGError('image too large (%dx%d)' % (header.width, header.height))
+    return size
+
+
+def inflate(data, max_size):
+    """zlib-decompress `data`, refusing to produce more than `max_size` bytes."""
+    d = zlib.decompressobj()
+    out = d.decompress(data, max_size + 1)
+    if len(out) > max_size:
+        raise PNGError('image data larger than its header allows')
+    return out
+
+
+def idat_stream(chunks, header):
+    """Decompress the concatenated IDAT chunks of a list of (type, body) pairs."""
+    return inflate(b''.join(body for ctype, body in chunks if ctype == b'IDAT'), stream_size(header))
+
+
+def _paeth(a, b, c):
+    p = a + b - c
+    pa = abs(p - a)
+    pb = abs(p - b)
+    pc = abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    if pb <= pc:
+        return b
+    return c
+
+
+def _unfilter_row(ftype, line, prev, bpp):
+    if ftype == 0:
+        return bytes(line)
+    if ftype == 1:
+        out = bytearray(len(line))
+        for k in range(bpp):
+            out[k::bpp] = bytes(v & 0xff for v in accumulate(line[k::bpp]))
+        return bytes(out)
+    if ftype == 2:
+        return bytes((x + p) & 0xff for x, p in zip(line, prev))
+    if ftype == 3:
+        out = bytearray(line)
+        for i in range(len(out)):
+            left = out[i - bpp] if i >= bpp else 0
+            out[i] = (out[i] + ((left + prev[i]) >> 1)) & 0xff
+        return bytes(out)
+    if ftype == 4:
+        out = bytearray(line)
+        for i in range(len(out)):
+            if i >= bpp:
+                out[i] = (out[i] + _paeth(out[i - bpp], prev[i], prev[i - bpp])) & 0xff
+            else:
+                out[i] = (out[i] + prev[i]) & 0xff
+        return bytes(out)
+    raise PNGError('bad filter type %d' % ftype)
+
+
+def unfilter(stream, header):
+    """Reverse scanline filtering; return the list of raw rows."""
+    if header.interlace:
+        raise PNGError('interlaced PNG is not supported')
+    bpp = bytes_per_pixel(header)
+    stride = row_stride(header)
+    if len(stream) < (stride + 1) * header.height:
+        raise PNGError('image data too short')
+    rows = []
+    prev = bytes(stride)
+    pos = 0
+    for _ in range(header.height):
+        prev = _unfilter_row(stream[pos], stream[pos + 1:pos + 1 + stride], prev, bpp)
+        rows.append(prev)
+        pos += stride + 1
+    return rows
+
+
+def iter_file_rows(fh, chunk_size=1 << 16):
+    """Stream-decode a PNG file object.
+
+    Returns (header, extra_chunks, rows) where `rows` is a generator of raw
+    scanlines; only one row of pixels and one compressed block are held in
+    memory at a time, and inflating stops at `chunk_size` bytes per step, so
+    a small file claiming a huge image cannot blow up memory; headers over
+    MAX_STREAM_BYTES are refused outright. `extra_chunks` holds the PLTE/tRNS chunks seen before
+    the image data.
+    """
+    if fh.read(8) != SIGNATURE:
+        raise PNGError('not a PNG file')
+
+    def next_chunk():
+        head = fh.read(8)
+        if len(head) < 8:
+            raise PNGError('missing IEND chunk')
+        length, ctype = struct.unpack('>I4s', head)
+        return length, ctype
+
+    length, ctype = next_chunk()
+    if ctype != b'IHDR':
+        raise PNGError('IHDR must be the first chunk')
+    header = parse_header(fh.read(length))
+    fh.read(4)
+    stream_size(header)
+    if header.interlace:
+        raise PNGError('interlaced PNG is not supported')
+    extra = []
+    while True:
+        length, ctype = next_chunk()
+        if ctype == b'IDAT':
+            break
+        if ctype == b'IEND':
+            raise PNGError('no image data')
+        body = fh.read(length)
+        fh.read(4)
+        if ctype in (b'PLTE', b'tRNS'):
+            extra.append((ctype, body))
+
+    def rows():
+        nonlocal length, ctype
+        bpp = bytes_per_pixel(header)
+        stride = row_stride(header)
+        d = zlib.decompressobj()
+        buf = b''
+        pos = 0
+        prev = bytes(stride)
+        emitted = 0
+        while emitted < header.height:
+            while len(buf) - pos < stride + 1:
+                if d.unconsumed_tail:
+                    buf = buf[pos:] + d.decompress(d.unconsumed_tail, chunk_size)
+                    pos = 0
+                    continue
+                if ctype != b'IDAT':
+                    raise PNGError('image data too short')
+                if length:
+                    block = fh.read(min(chunk_size, length))
+                    if not block:
+                        raise PNGError('truncated chunk %r' % ctype)
+                    length -= len(block)
+                    buf = buf[pos:] + d.decompress(block, chunk_size)
+                    pos = 0
+                else:
+                    fh.read(4)
+                    length, ctype = next_chunk()
+            while len(buf) - pos >= stride + 1 and emitted < header.height:
+                prev = _unfilter_row(buf[pos], buf[pos + 1:pos + 1 + stride], prev, bpp)
+                pos += stride + 1
+                emitted += 1
+                yield prev
+
+    return header, extra, rows()
+
+
+def _filter_row(ftype, row, prev, bpp):
+    if ftype == 0:
+        return row
+    left = bytes(bpp) + row[:-bpp]
+    if ftype == 1:
+        return bytes((x - a) & 0xff for x, a in zip(row, left))
+    if ftype == 2:
+        return bytes((x - b) & 0xff for x, b in zip(row, prev))
+    if ftype == 3:
+        return bytes((x - ((a + b) >> 1)) & 0xff for x, a, b in zip(row, left, prev))
+    upleft = bytes(bpp) + prev[:-bpp]
+    return bytes((x - _paeth(a, b, c)) & 0xff for x, a, b, c in zip(row, left, prev, upleft))
+
+
+def _cost(filtered):
+    # minimum sum of absolute differences, bytes read as signed
+    return sum(v if v < 128 else 256 - v for v in filtered)
+
+
+def filter_rows(rows, header, mode='adaptive'):
+    """Filter raw rows into an IDAT payload (uncompressed).
+
+    `mode` is a filter type 0-4 applied to every row, or 'adaptive' to pick
+    per row the filter with the smallest sum of absolute values (the libpng
+    heuristic). Palette and sub-byte images always use filter 0.
+    """
+    bpp = bytes_per_pixel(header)
+    if header.color_type == 3 or header.bit_depth < 8:
+        mode = 0
+    out = bytearray()
+    prev = bytes(row_stride(header))
+    for row in rows:
+        if mode == 'adaptive':
+            best = None
+            for ftype in range(5):
+                candidate = _filter_row(ftype, row, prev, bpp)
+                cost = _cost(candidate)
+                if best is None or cost < best[0]:
+                    best = (cost, ftype, candidate)
+            _cost_, ftype, filtered = best
+        else:
+            ftype = mode
+            filtered = _filter_row(ftype, row, prev, bpp)
+        out.append(ftype)
+        out += filtered
+        prev = row
+    return bytes(out)
+
+
+def decode(data):
+    """Decode a PNG; return (header, rows, chunks)."""
+    chunks = list(iter_chunks(data))
+    if not chunks or chunks[0][0] != b'IHDR':
+        raise PNGError('IHDR must be the first chunk')
+    header = parse_header(chunks[0][1])
+    return header, unfilter(idat_stream(chunks, header), header), chunks
+
+
+def encode(header, rows, extra_chunks=(), level=9, mode='adaptive'):
+    """Encode raw rows as a non-interlaced PNG.
+
+    `extra_chunks` are (type, body) pairs written between IHDR and IDAT
+    (PLTE, tRNS, iCCP, ...).
+    """
+    header = header._replace(interlace=0)
+    payload = zlib.compress(filter_rows(rows, header, mode), level)
+    parts = [SIGNATURE, make_chunk(b'IHDR', header_bytes(header))]
+    parts.extend(make_chunk(ctype, body) for ctype, body in extra_chunks)
+    parts.append(make_chunk(b'IDAT', payload))
+    parts.append(make_chunk(b'IEND', b''))
+    return b''.join(parts)
@@ -0,0 +1,88 @@
+"""Server-side rendering of the glossary's first page into index.html.
+
+The page arrives with the first `PAGE_SIZE` entries (in the order the UI
+lists them when nothing is searched) and the tag bar, and the records of
+that page embedded as `<script id="initialState" type="application/json">`.
+The list is therefore painted as soon as the HTML is parsed, whatever the
+size of the glossary or the speed of the client, and the page stays small:
+app.js makes the first page interactive from the embedded records, then
+fetches the glossary, its index and its links (`/api/terms*`) as usual.
+
+The markup mirrors `mkResult` and `renderTagFiltersInto` in web/app.js,
+which re-renders the same nodes with their event handlers once loaded.
+"""
+import html
+import json
+import re
+
+PAGE_SIZE = 50  # must match INITIAL_PAGE_SIZE in web/app.js
+
+_TAG_STYLE = ('background-color: rgba(77, 161, 255, 0.15); color: var(--accent); padding: 2px 8px; '
+              'border-radius: 4px; font-size: 12px; font-weight: 500;')
+_RESULTS = re.compile(r'(<div id="results"[^>]*>)')
+_TAG_BAR = re.compile(r'(<div id="tagFilterContainer"[^>]*>)')
+_BODY_END = re.compile(r'</body>', re.IGNORECASE)
+
+
+def browse_key(item):
+    # same order as browseOrder() in web/app.js
+    return (item.get('term') or '').lower(), item.get('id') or ''
+
+
+def first_page(items, size=PAGE_SIZE):
+    return sorted(items, key=browse_key)[:size]
+
+
+def all_tags(items):
+    return sorted({t for it in items for t in (it.get('tags') or []) if isinstance(t, str)})
+
+
+def _escape(text):
+    return html.escape('' if text is None else str(text), quote=True)
+
+
+def render_item(item):
+    data_id = f' data-id="{_escape(item["id"])}"' if item.get('id') else ''
+    parts = [f'<div class="item"{data_id}>',
+             f'<h3>{_escape(item.get("term"))} <small>{_escape(item.get("abbreviation"))}</small></h3>',
+             f'<p>{_escape(item.get("definition"))}</p>']
+    tags = item.get('tags') or []
+    if tags:
+        parts.append('<div style="margin-bottom: 8px; display: flex; gap: 6px; flex-wrap: wrap;">')
+        parts.extend(f'<span style="{_TAG_STYLE}">{_escape(t)}</span>' for t in tags)
+        parts.append('</div>')
+    parts.append('<div class="itemActions"><button>Edit</button><button>Delete</button></div></div>')
+    return ''.join(parts)
+
+
+def render_results(items):
+    return ''.join(render_item(it) for it in items)
+
+
+def render_tag_bar(tags):
+    return ''.join(f'<button type="button" class="tagFilterBtn">{_escape(t)}</button>' for t in tags)
+
+
+def embed_json(text):
+    """JSON text made safe inside a <script> element (no `</script>`, `<!--`)."""
+    return text.replace('<', '\\u003c').replace('>', '\\u003e').replace('&', '\\u0026')
+
+
+def initial_state(page):
+    """The embedded state: the records of the first page."""
+    return json.dumps({'terms': page}, ensure_ascii=False)
+
+
+def render_page(template, items, size=PAGE_SIZE):
+    """`template` (index.html) with the first page, the tag bar and the state filled in.
+
+    Elements missing from the template are left out; the state is only
+    embedded when the page has a `</body>`.
+    """
+    first = first_page(items, size)
+    page = _RESULTS.sub(lambda m: m.group(1) + render_results(first), template, count=1)
+    page = _TAG_BAR.sub(lambda m: m.group(1) + render_tag_bar(all_tags(items)), page, count=1)
+    state = embed_json(initial_state(first))
+    script = f'<script id="initialState" type="application/json">{state}</script>\n'
+    # app.js reads it on DOMContentLoaded, once the whole page is parsed
+    return _BODY_END.sub(lambda m: script + m.group(0), page, count=1)
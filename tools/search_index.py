@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""Precomputed search artefacts for a glossary JSON file.
+
+Next to `glossary.json` this writes:
+
+- `glossary.fuse-index.json`: the index `Fuse.createIndex(keys, docs)`
+  builds in the browser (Fuse.js 6 `toJSON()` layout), loaded with
+  `Fuse.parseIndex` instead of re-indexing on every page load;
+- `glossary.inverted.json`: token -> document numbers (delta-encoded);
+- `glossary.trie.json`: radix trie of normalized terms and abbreviations
+  for prefix lookups;
+- `glossary.json.gz`: the data itself, gzip-compressed;
+- `glossary.artefacts.json`: the size, mtime and version token of
+  `glossary.json` the artefacts were built from (`artefacts_fresh`).
+
+Usage (e.g. for the user glossary maintained by the server):
+  python tools/search_index.py data/glossary_user.json [more.json ...]
+"""
+import argparse
+import functools
+import gzip
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import tempfile
+import unicodedata
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import data_lock
+from tools.json_stream import iter_json_array
+
+# Must match the keys given to `new Fuse(...)` in web/app.js.
+FUSE_KEYS = [
+    {'name': 'term', 'weight': 0.8},
+    {'name': 'definition', 'weight': 0.4},
+    {'name': 'abbreviation', 'weight': 0.9},
+]
+
+# Fields whose whole value goes into the prefix trie.
+TRIE_FIELDS = ('term', 'abbreviation')
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def artefact_paths(path):
+    """Map artefact kind -> path for the glossary file at `path`."""
+    base = os.path.splitext(path)[0]
+    return {
+        'fuse': base + '.fuse-index.json',
+        'inverted': base + '.inverted.json',
+        'trie': base + '.trie.json',
+        'gzip': path + '.gz',
+        'stamp': base + '.artefacts.json',
+    }
+
+
+def normalize(text):
+    """Lower-case `text` and strip accents."""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text):
+    return _TOKEN.findall(normalize(text))
+
+
+@functools.lru_cache(maxsize=1024)
+def _norm_for_count(count):
+    return round(1 / math.sqrt(count), 3)
+
+
+def _field_norm(value):
+    # Fuse.js: 1 / sqrt(number of space-separated tokens), rounded to 3 digits
+    return _norm_for_count(len(re.findall(r'[^ ]+', value)))
+
+
+def compact_json(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def docs_version(docs):
+    """Digest of `docs` as `compact_json` serializes them (the ETag of /api/terms)."""
+    return hashlib.sha1(compact_json(docs)).hexdigest()
+
+
+def fuse_index(docs, keys=FUSE_KEYS):
+    """Return what `Fuse.createIndex(keys, docs).toJSON()` produces.
+
+    `source` (ignored by `Fuse.parseIndex`) is the `docs_version` of the
+    documents, so a client can tell an index that does not match its data.
+    """
+    key_records = [{'path': k['name'].split('.'), 'id': k['name'], 'weight': k.get('weight', 1), 'src': k['name']}
+                   for k in keys]
+    records = []
+    for i, doc in enumerate(docs):
+        fields = {}
+        for key_index, key in enumerate(key_records):
+            value = doc
+            for part in key['path']:
+                value = value.get(part) if isinstance(value, dict) else None
+            if isinstance(value, bool):
+                value = 'true' if value else 'false'
+            elif isinstance(value, int):
+                value = str(value)
+            if isinstance(value, str) and value.strip():
+                fields[str(key_index)] = {'v': value, 'n': _field_norm(value)}
+            elif isinstance(value, list):
+                # Fuse walks arrays with a stack, hence the reversed order
+                fields[str(key_index)] = [{'v': v, 'i': j, 'n': _field_norm(v)} for j, v in reversed(list(enumerate(value)))
+                                          if isinstance(v, str) and v.strip()]
+        records.append({'i': i, '$': fields})
+    return {'keys': key_records, 'records': records, 'source': docs_version(docs)}
+
+
+def inverted_index(docs, fields=None):
+    """Token -> sorted document numbers, stored as first value then gaps."""
+    fields = fields or [k['name'] for k in FUSE_KEYS]
+    postings = {}
+    for i, doc in enumerate(docs):
+        seen = set()
+        for field in fields:
+            value = doc.get(field)
+            if isinstance(value, str):
+                seen.update(tokenize(value))
+        for token in seen:
+            postings.setdefault(token, []).append(i)
+    terms = {}
+    for token in sorted(postings):
+        ids = postings[token]
+        terms[token] = [ids[0]] + [b - a for a, b in zip(ids, ids[1:])]
+    return {'fields': fields, 'count': len(docs), 'terms': terms}
+
+
+def postings(index, token):
+    """Decode the document numbers of `token` from an inverted index."""
+    out = []
+    n = 0
+    for gap in index['terms'].get(token, ()):
+        n += gap
+        out.append(n)
+    return out
+
+
+def build_trie(docs, fields=TRIE_FIELDS):
+    """Radix trie of normalized field values.
+
+    A node is {'c': {edge label: child}, 'i': [document numbers]}; chains of
+    single children are merged into one edge.
+    """
+    root = {}
+    for i, doc in enumerate(docs):
+        for field in fields:
+            value = doc.get(field)
+            if not isinstance(value, str) or not value.strip():
+                continue
+            node = root
+            for ch in normalize(value.strip()):
+                node = node.setdefault(ch, {})
+            ids = node.setdefault('', [])
+            if not ids or ids[-1] != i:
+                ids.append(i)
+    return _compress(root)
+
+
+def _compress(node):
+    out = {}
+    if '' in node:
+        out['i'] = node['']
+    children = {}
+    for ch, child in node.items():
+        if ch == '':
+            continue
+        label = ch
+        while '' not in child and len(child) == 1:
+            (next_ch, next_child), = child.items()
+            label += next_ch
+            child = next_child
+        children[label] = _compress(child)
+    if children:
+        out['c'] = children
+    return out
+
+
+def trie_prefix(trie, prefix):
+    """Document numbers whose term or abbreviation starts with `prefix`."""
+    prefix = normalize(prefix)
+    node = trie
+    while prefix:
+        for label, child in node.get('c', {}).items():
+            if label.startswith(prefix):
+                node, prefix = child, ''
+                break
+            if prefix.startswith(label):
+                node, prefix = child, prefix[len(label):]
+                break
+        else:
+            return []
+    found = set()
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        found.update(n.get('i', ()))
+        stack.extend(n.get('c', {}).values())
+    return sorted(found)
+
+
+def _write_atomic(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            out.write(data)
+        # mkstemp creates the file private to the owner
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def source_stamp(path):
+    """[size, mtime_ns, version token] of the glossary file: what artefacts are built from."""
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns, data_lock.read_version(path)]
+
+
+def write_artefacts(path, docs=None, stamp=None):
+    """Write every artefact for the glossary file at `path`; return their paths.
+
+    `docs` defaults to the content of `path`. The gzip copy is made from the
+    file bytes so that it decompresses to exactly the same file. `stamp` is
+    the `source_stamp` taken before `docs` were read (by default: now); it
+    is written last, so artefacts interrupted or built from a file that
+    changed meanwhile are never taken as fresh.
+    """
+    if stamp is None:
+        stamp = source_stamp(path)
+    if docs is None:
+        docs = list(iter_json_array(path))
+    paths = artefact_paths(path)
+    _write_atomic(paths['fuse'], compact_json(fuse_index(docs)))
+    _write_atomic(paths['inverted'], compact_json(inverted_index(docs)))
+    _write_atomic(paths['trie'], compact_json(build_trie(docs)))
+    with open(path, 'rb') as fh:
+        _write_atomic(paths['gzip'], gzip.compress(fh.read(), mtime=0))
+    _write_atomic(paths['stamp'], compact_json(stamp))
+    return paths
+
+
+def artefacts_fresh(path):
+    """True when every artefact exists and was built from `path` as it is now.
+
+    Compares the recorded `source_stamp` (size, mtime and the version token
+    bumped by every locked write), not only modification times, which a
+    write within the filesystem's timestamp resolution would not change.
+    """
+    paths = artefact_paths(path)
+    try:
+        with open(paths['stamp'], encoding='utf-8') as fh:
+            recorded = json.load(fh)
+        return recorded == source_stamp(path) and all(os.path.exists(p) for p in paths.values())
+    except (OSError, ValueError):
+        return False
+
+
+def main(paths):
+    for path in paths:
+        written = write_artefacts(path)
+        print(f'Indexed {path}: ' + ', '.join(os.path.basename(p) for p in written.values()))
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write precomputed search artefacts for glossary JSON files.')
+    parser.add_argument('paths', nargs='*', help='glossary JSON files (default: data/glossary_user.json)')
+    args = parser.parse_args()
+    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    sys.exit(main(args.paths or [os.path.join(repo_root, 'data', 'glossary_user.json')]))
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""Production launcher: several worker processes, each with a pool of threads.
+
+The parent binds the listening socket, then forks `--workers` processes
+that accept on it; each worker handles requests on a pool of `--threads`
+threads (Werkzeug's WSGI server, without the debugger or reloader), with
+at most as many requests waiting as there are threads. A worker that dies is replaced; SIGINT/SIGTERM stops them all.
+
+Workers share nothing in memory. Writes are serialized by the per-collection
+file locks (`tools.data_lock`) and every write bumps the collection's
+version file, so the indexes cached by the other workers are rebuilt on
+their next request. Metrics (`/metrics`) are per worker, and so is the
+access log: worker n writes `data/logs/requests.w<n>.jsonl` (a replacement
+takes over the number of the worker it replaces).
+
+  python -m tools.serve --workers 4 --threads 8 --port 5000 [--data-dir data]
+
+The pre-compressed web assets (`tools.build_assets`) are rebuilt first when
+web/ changed since the last build.
+
+Without `os.fork` (Windows) a single process is started. Any WSGI server
+can be used instead through the factory, e.g.
+`gunicorn -w 4 --threads 8 'server:create_app()'`.
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+RESTART_DELAY = 1.0  # seconds before replacing a worker that died
+
+
+class _Handler(WSGIRequestHandler):
+    # one request per connection, so an idle keep-alive client never holds a pool thread
+    protocol_version = 'HTTP/1.0'
+
+    def log_request(self, *args, **kwargs):
+        pass  # requests go to the structured access log (tools/access_log.py)
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug's server with requests handled on a fixed thread pool.
+
+    At most `threads` requests run and `queue_size` (default: `threads`)
+    wait for a thread; past that the worker stops accepting, so connections
+    stay in the listening socket's backlog, where another worker can pick
+    them up, instead of piling up in this process's memory.
+    """
+
+    multithread = True
+
+    def __init__(self, host, port, app, threads, fd=None, queue_size=None):
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='glossary-worker')
+        self.slots = threading.BoundedSemaphore(threads + (threads if queue_size is None else queue_size))
+        super().__init__(host, port, app, handler=_Handler, fd=fd)
+
+    def process_request(self, request, client_address):
+        self.slots.acquire()
+        try:
+            self.pool.submit(self._handle, request, client_address)
+        except Exception:
+            self.slots.release()
+            raise
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+
+    def serve_forever(self, poll_interval=0.5):
+        try:
+            super().serve_forever(poll_interval)
+        finally:
+            # let the requests in progress finish
+            self.pool.shutdown(wait=True)
+
+
+def _listen(host, port, backlog=128):
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def _run_worker(app, sock, threads, on_exit, on_start=None, n=0):
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    if on_start is not None:
+        on_start(n)
+    host, port = sock.getsockname()[:2]
+    try:
+        PooledWSGIServer(host, port, app, threads, fd=sock.fileno()).serve_forever()
+    finally:
+        if on_exit is not None:
+            on_exit()
+        os._exit(0)
+
+
+def _spawn(app, sock, threads, on_exit, on_start, n):
+    pid = os.fork()
+    if pid == 0:
+        _run_worker(app, sock, threads, on_exit, on_start, n)
+    return pid
+
+
+def serve(app, host='127.0.0.1', port=5000, workers=2, threads=8, on_exit=None, on_start=None, log=_log):
+    """Serve `app` until SIGINT/SIGTERM.
+
+    With several workers, `on_start(n)` runs in worker n (1-based) right
+    after the fork and `on_exit` in each worker as it stops.
+    """
+    sock = _listen(host, port)
+    log(f'Serving on http://{host}:{sock.getsockname()[1]} with {workers} worker(s) x {threads} thread(s)')
+    if workers <= 1 or not hasattr(os, 'fork'):
+        try:
+            PooledWSGIServer(host, port, app, threads, fd=sock.fileno()).serve_forever()
+        finally:
+            if on_exit is not None:
+                on_exit()
+        return
+    children = {_spawn(app, sock, threads, on_exit, on_start, n): n for n in range(1, workers + 1)}
+    stopping = []
+
+    def stop(signum, frame):
+        stopping.append(signum)
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        n = children.pop(pid, None)
+        if n is not None and not stopping:
+            log(f'Worker {pid} exited with status {status}, restarting')
+            time.sleep(RESTART_DELAY)
+            children[_spawn(app, sock, threads, on_exit, on_start, n)] = n
+    sock.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the glossary with several worker processes and threads.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='processes (default: one per core)')
+    parser.add_argument('--threads', type=int, default=8, help='request threads per process')
+    parser.add_argument('--data-dir', help='data directory (default: ./data)')
+    parser.add_argument('--no-build', action='store_true', help='do not rebuild the pre-compressed web assets')
+    args = parser.parse_args(argv)
+
+    import server
+    from tools import build_assets
+    if not args.no_build:
+        manifest = build_assets.load_manifest(str(server.WEB_DIR))
+        if manifest is None or not build_assets.is_fresh(manifest, str(server.WEB_DIR)):
+            build_assets.build(str(server.WEB_DIR))
+    config = {'DATA_DIR': args.data_dir} if args.data_dir else {}
+    app = server.create_app(config)
+    serve(app, args.host, args.port, max(1, args.workers), max(1, args.threads),
+          on_exit=server.access_log.close, on_start=server.access_log.for_worker)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
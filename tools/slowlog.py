@@ -0,0 +1,141 @@
+"""Watchdog for slow requests: sampled stacks and storage operations in a JSONL log.
+
+`SlowRequestLog.begin()` registers the calling thread as handling a request.
+A single watchdog thread wakes every `interval` seconds and, for each
+request that has been running longer than `sample_after` seconds, records
+the handling thread's stack (`sys._current_frames()`). Storage helpers
+report what they did with `note()` (or the `traced()` decorator). When a
+request finishes after more than `threshold` seconds, `end()` appends one
+line to the log:
+
+    {"time": "...", "method": "POST", "route": "/api/terms", "path": "/api/terms",
+     "params": {...}, "status": 201, "duration_ms": 2310.4,
+     "operations": [{"op": "backup", "target": "glossary_user.json", "ms": 2101.7}, ...],
+     "samples": 46, "stacks": [{"stack": "a;b;c", "count": 40}, ...]}
+
+Stacks use the collapsed `frame;frame;frame` format of `tools.profiler`.
+Fast requests cost a dict insert and removal; nothing is written for them.
+"""
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from tools.profiler import collapse
+
+MAX_OPERATIONS = 200  # per request, the rest are only counted
+MAX_STACKS = 20  # distinct stacks written per record
+
+
+class _Request:
+    __slots__ = ('info', 'start', 'operations', 'dropped', 'stacks')
+
+    def __init__(self, info):
+        self.info = info
+        self.start = time.perf_counter()
+        self.operations = []
+        self.dropped = 0
+        self.stacks = Counter()
+
+
+class SlowRequestLog:
+    def __init__(self, path, threshold=1.0, interval=0.05, sample_after=None):
+        self.path = path
+        self.threshold = threshold
+        self.interval = interval
+        # None: start sampling at half the threshold so the record covers most of the request
+        self.sample_after = sample_after
+        self._active = {}  # thread id -> _Request
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._watchdog = None
+
+    def _ensure_watchdog(self):
+        if self._watchdog is None or not self._watchdog.is_alive():
+            with self._lock:
+                if self._watchdog is None or not self._watchdog.is_alive():
+                    self._watchdog = threading.Thread(target=self._run, name='slow-request-watchdog', daemon=True)
+                    self._watchdog.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                active = list(self._active.items())
+            if not active:
+                continue
+            now = time.perf_counter()
+            after = self.threshold / 2 if self.sample_after is None else self.sample_after
+            due = [(tid, req) for tid, req in active if now - req.start >= after]
+            if not due:
+                continue
+            frames = sys._current_frames()
+            for tid, req in due:
+                frame = frames.get(tid)
+                if frame is not None:
+                    req.stacks[collapse(frame)] += 1
+            del frames
+
+    def begin(self, **info):
+        """Start tracking the request handled by the calling thread."""
+        self._ensure_watchdog()
+        with self._lock:
+            self._active[threading.get_ident()] = _Request(info)
+
+    def note(self, op, target, seconds=None, **detail):
+        """Record a storage operation of the current request (no-op outside one)."""
+        req = self._active.get(threading.get_ident())
+        if req is None:
+            return
+        if len(req.operations) >= MAX_OPERATIONS:
+            req.dropped += 1
+            return
+        entry = {'op': op, 'target': target}
+        if seconds is not None:
+            entry['ms'] = round(seconds * 1000, 2)
+        entry.update(detail)
+        req.operations.append(entry)
+
+    def traced(self, op, target):
+        """Decorator: `note()` every call of the function with its duration."""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if threading.get_ident() not in self._active:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.note(op, target, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def end(self, **info):
+        """Stop tracking; write and return the record if the request was slow."""
+        with self._lock:
+            req = self._active.pop(threading.get_ident(), None)
+        if req is None:
+            return None
+        duration = time.perf_counter() - req.start
+        if duration < self.threshold:
+            return None
+        record = {'time': datetime.utcnow().isoformat() + 'Z'}
+        record.update(req.info)
+        record.update(info)
+        record['duration_ms'] = round(duration * 1000, 2)
+        record['operations'] = req.operations
+        if req.dropped:
+            record['operations_dropped'] = req.dropped
+        record['samples'] = sum(req.stacks.values())
+        record['stacks'] = [{'stack': s, 'count': n} for s, n in req.stacks.most_common(MAX_STACKS)]
+        line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._write_lock:
+            with open(self.path, 'a', encoding='utf-8') as fh:
+                fh.write(line)
+        return record
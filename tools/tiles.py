@@ -0,0 +1,175 @@
+"""Deep-zoom tile pyramids for large PNG diagrams.
+
+`build_pyramid` decodes the source PNG row by row and writes every level of
+the pyramid in a single pass: level `levels - 1` is the full resolution,
+each lower level halves both dimensions (2x2 box filter) and level 0 fits in
+one tile. Only a band of `tile_size` rows per level is held in memory, so
+memory use does not depend on the image height.
+
+Tiles are RGBA PNGs stored as `<out_dir>/<z>/<x>_<y>.png`; `info.json` is
+written last and marks a complete pyramid.
+"""
+import json
+import os
+
+from tools import png_codec
+
+TILE_SIZE = 256
+INFO_NAME = 'info.json'
+
+
+def pyramid_levels(width, height, tile_size=TILE_SIZE):
+    """Number of levels needed so that level 0 fits in a single tile."""
+    levels = 1
+    size = max(width, height)
+    while size > tile_size:
+        size = (size + 1) // 2
+        levels += 1
+    return levels
+
+
+def level_size(width, height, levels, z):
+    w, h = width, height
+    for _ in range(levels - 1 - z):
+        w, h = (w + 1) // 2, (h + 1) // 2
+    return w, h
+
+
+def _unpack_bits(row, depth, width):
+    per_byte = 8 // depth
+    mask = (1 << depth) - 1
+    shifts = [8 - depth * (i + 1) for i in range(per_byte)]
+    values = [(b >> s) & mask for b in row for s in shifts]
+    return values[:width]
+
+
+def rgba_converter(header, extra_chunks=()):
+    """Return a function converting one raw scanline to 8-bit RGBA."""
+    width = header.width
+    depth = header.bit_depth
+    ct = header.color_type
+    opaque = b'\xff' * width
+
+    def interleave(r, g, b, a):
+        out = bytearray(width * 4)
+        out[0::4] = r
+        out[1::4] = g
+        out[2::4] = b
+        out[3::4] = a
+        return bytes(out)
+
+    if ct == 3:
+        chunks = dict(extra_chunks)
+        plte = chunks.get(b'PLTE', b'')
+        trns = chunks.get(b'tRNS', b'')
+        palette = []
+        for i in range(256):
+            rgb = plte[i * 3:i * 3 + 3] or b'\0\0\0'
+            alpha = trns[i] if i < len(trns) else 255
+            palette.append(rgb + bytes([alpha]))
+
+        def convert(row):
+            idx = row if depth == 8 else _unpack_bits(row, depth, width)
+            return b''.join(palette[i] for i in idx[:width])
+        return convert
+
+    if ct in (0, 4) and depth < 8:
+        scale = 255 // ((1 << depth) - 1)
+
+        def convert(row):
+            g = bytes(v * scale for v in _unpack_bits(row, depth, width))
+            return interleave(g, g, g, opaque)
+        return convert
+
+    def convert(row):
+        if depth == 16:
+            row = row[0::2]
+        if ct == 6:
+            return bytes(row)
+        if ct == 2:
+            return interleave(row[0::3], row[1::3], row[2::3], opaque)
+        if ct == 4:
+            g = row[0::2]
+            return interleave(g, g, g, row[1::2])
+        return interleave(row, row, row, opaque)
+    return convert
+
+
+def downsample(r0, r1, width):
+    """Average two RGBA rows of `width` pixels into one row of half width."""
+    if width % 2:
+        r0 = r0 + r0[-4:]
+        r1 = r1 + r1[-4:]
+    out = bytearray(((width + 1) // 2) * 4)
+    for c in range(4):
+        out[c::4] = bytes((p + q + r + s + 2) >> 2 for p, q, r, s in
+                          zip(r0[c::8], r0[4 + c::8], r1[c::8], r1[4 + c::8]))
+    return bytes(out)
+
+
+def _write_atomic(path, data):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+def build_pyramid(src_path, out_dir, tile_size=TILE_SIZE):
+    """Generate every tile of `src_path` under `out_dir`; return the info dict."""
+    with open(src_path, 'rb') as fh:
+        header, extra, rows = png_codec.iter_file_rows(fh)
+        convert = rgba_converter(header, extra)
+        levels = pyramid_levels(header.width, header.height, tile_size)
+        widths = [level_size(header.width, header.height, levels, z)[0] for z in range(levels)]
+        state = [{'band': [], 'y': 0, 'pending': None} for _ in range(levels)]
+
+        def flush(z):
+            st = state[z]
+            if not st['band']:
+                return
+            zdir = os.path.join(out_dir, str(z))
+            os.makedirs(zdir, exist_ok=True)
+            width = widths[z]
+            for x in range((width + tile_size - 1) // tile_size):
+                left = x * tile_size * 4
+                tw = min(tile_size, width - x * tile_size)
+                tile_rows = [row[left:left + tw * 4] for row in st['band']]
+                tile_header = png_codec.Header(tw, len(tile_rows), 8, 6, 0)
+                data = png_codec.encode(tile_header, tile_rows, level=6, mode=1)
+                _write_atomic(os.path.join(zdir, f"{x}_{st['y']}.png"), data)
+            st['band'] = []
+            st['y'] += 1
+
+        def push(z, row):
+            st = state[z]
+            st['band'].append(row)
+            if len(st['band']) == tile_size:
+                flush(z)
+            if z > 0:
+                if st['pending'] is None:
+                    st['pending'] = row
+                else:
+                    push(z - 1, downsample(st['pending'], row, widths[z]))
+                    st['pending'] = None
+
+        for row in rows:
+            push(levels - 1, convert(row))
+        for z in range(levels - 1, -1, -1):
+            pending = state[z]['pending']
+            if pending is not None:
+                push(z - 1, downsample(pending, pending, widths[z]))
+            flush(z)
+
+    info = {'width': header.width, 'height': header.height, 'tile_size': tile_size, 'levels': levels}
+    os.makedirs(out_dir, exist_ok=True)
+    _write_atomic(os.path.join(out_dir, INFO_NAME), json.dumps(info).encode('utf-8'))
+    return info
+
+
+def load_info(out_dir):
+    """Return the info dict of a complete pyramid, or None."""
+    try:
+        with open(os.path.join(out_dir, INFO_NAME), encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
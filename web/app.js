@@ -8,6 +8,20 @@ let imagesData = [];
 let equationsData = [];
 let referencesData = [];
 let methodsData = [];
+let glossaryById = new Map();
+let termLinks = {}; // id -> {out: [[id, start, end]], in: [ids]}, computed by the server
+
+// Body and ETag (without quotes) of a JSON resource, null on failure
+async function tryFetchVersioned(path){
+  try{
+    const resp = await fetch(path);
+    if(!resp.ok) throw new Error(`HTTP ${resp.status}`);
+    const etag = (resp.headers.get('ETag') || '').replace(/^W\//, '').replace(/"/g, '');
+    return {data: await resp.json(), version: etag || null};
+  }catch(e){
+    return null;
+  }
+}
 
 async function tryFetch(path){
   try{
@@ -19,13 +33,28 @@ async function tryFetch(path){
   }
 }
 
+// Records of the first page, embedded by the server in index.html (tools/prerender.py);
+// used once, to make the server-rendered list interactive while the glossary loads
+function takeInitialState(){
+  const el = document.getElementById('initialState');
+  if(!el) return null;
+  el.remove();
+  try{
+    const state = JSON.parse(el.textContent);
+    return Array.isArray(state.terms) ? state : null;
+  }catch(e){
+    return null;
+  }
+}
+
 async function loadGlossary() {
-  // Prefer the local API if available
-  const api = await tryFetch('/api/terms');
-  if(Array.isArray(api)){
-    glossary = api;
+  // Prefer the local API if available; its search index is precomputed server-side
+  const [api, apiIndex, apiLinks] = await Promise.all([tryFetchVersioned('/api/terms'), tryFetch('/api/terms/index'), tryFetch('/api/terms/links')]);
+  if(api && Array.isArray(api.data)){
+    glossary = api.data;
     usingApi = true;
-    buildIndex();
+    termLinks = apiLinks || {};
+    buildIndex(apiIndex, api.version);
     return;
   }
 
@@ -36,8 +65,10 @@ async function loadGlossary() {
     if(j){
       glossary = j;
       usingApi = false;
+      termLinks = {};
       console.log('Loaded glossary from', p, glossary.length);
-      buildIndex();
+      // written by `parse_glossary.py --index`
+      buildIndex(await tryFetch(p.replace(/\.json$/, '.fuse-index.json')));
       return;
     }
   }
@@ -50,19 +81,33 @@ async function loadGlossary() {
   console.error('Could not load glossary from API or static candidates');
 }
 
-function buildIndex(){
+// Keys must match FUSE_KEYS in tools/search_index.py
+const FUSE_OPTIONS = {
+  keys: [
+    { name: 'term', weight: 0.8 },
+    { name: 'definition', weight: 0.4 },
+    { name: 'abbreviation', weight: 0.9 }
+  ],
+  includeMatches: true,
+  threshold: 0.35,
+  ignoreLocation: true,
+  minMatchCharLength: 1
+};
+
+// `version`: ETag of the glossary, compared with the `source` the server records in its index
+function buildIndex(prebuilt, version=null){
+  glossaryById = new Map(glossary.map(it=>[it.id, it]));
   try{
-    fuse = new Fuse(glossary, {
-      keys: [
-        { name: 'term', weight: 0.8 },
-        { name: 'definition', weight: 0.4 },
-        { name: 'abbreviation', weight: 0.9 }
-      ],
-      includeMatches: true,
-      threshold: 0.35,
-      ignoreLocation: true,
-      minMatchCharLength: 1
-    });
+    // A precomputed index is only usable if it was built from exactly these entries (the two are
+    // fetched in parallel, so an edit in between can pair them with a different version). Static
+    // files carry no version and are generated together: their entry count is checked instead.
+    const matches = version ? prebuilt && prebuilt.source === version
+      : prebuilt && Array.isArray(prebuilt.records) && prebuilt.records.length === glossary.length;
+    if(matches){
+      fuse = new Fuse(glossary, FUSE_OPTIONS, Fuse.parseIndex(prebuilt));
+    }else{
+      fuse = new Fuse(glossary, FUSE_OPTIONS);
+    }
   }catch(e){
     console.warn('Fuse initialization failed, search will fallback to simple filtering', e);
     fuse = null;
@@ -120,6 +165,7 @@ function highlightWithIndices(text, indices){
 function mkResult(item, matches){
   const div = document.createElement('div');
   div.className = 'item';
+  if(item.id) div.dataset.id = item.id;
   const h = document.createElement('h3');
   // find match indices for term and definition
   const mTerm = (matches || []).find(m=>m.key==='term');
@@ -255,6 +301,46 @@ async function deleteTerm(id){
   }
 }
 
+// Definition with its precomputed cross-references as links to the other entries
+function linkedDefinition(item){
+  const text = item.definition || '';
+  const links = (termLinks[item.id] || {}).out || [];
+  const frag = document.createDocumentFragment();
+  let pos = 0;
+  for(const [targetId, start, end] of links){
+    const target = glossaryById.get(targetId);
+    if(!target || start < pos) continue;
+    frag.appendChild(document.createTextNode(text.slice(pos, start)));
+    const a = document.createElement('a');
+    a.href = '#';
+    a.textContent = text.slice(start, end);
+    a.title = target.term || '';
+    a.addEventListener('click', (ev)=>{ ev.preventDefault(); openModal(target); });
+    frag.appendChild(a);
+    pos = end;
+  }
+  frag.appendChild(document.createTextNode(text.slice(pos)));
+  return frag;
+}
+
+function usedByList(item){
+  const ids = (termLinks[item.id] || {}).in || [];
+  const users = ids.map(id=>glossaryById.get(id)).filter(Boolean);
+  if(!users.length) return null;
+  const p = document.createElement('p');
+  p.className = 'modal__meta';
+  p.appendChild(document.createTextNode('Used by: '));
+  users.forEach((other, i)=>{
+    if(i) p.appendChild(document.createTextNode(', '));
+    const a = document.createElement('a');
+    a.href = '#';
+    a.textContent = other.term || '';
+    a.addEventListener('click', (ev)=>{ ev.preventDefault(); openModal(other); });
+    p.appendChild(a);
+  });
+  return p;
+}
+
 // Modal handling
 function openModal(item, matches){
   const modal = document.getElementById('modal');
@@ -291,8 +377,14 @@ function openModal(item, matches){
   // highlight in modal as well
   const mTerm = (matches || []).find(m=>m.key==='term');
   const mDef = (matches || []).find(m=>m.key==='definition');
-  const defHtml = highlightWithIndices(item.definition, mDef ? mDef.indices : []);
-  body.innerHTML = defHtml;
+  if(mDef && mDef.indices.length){
+    body.innerHTML = highlightWithIndices(item.definition, mDef.indices);
+  }else{
+    body.innerHTML = '';
+    body.appendChild(linkedDefinition(item));
+  }
+  const usedBy = usedByList(item);
+  if(usedBy) body.appendChild(usedBy);
   modal.classList.remove('hidden');
   modal.setAttribute('aria-hidden','false');
   // attach button handlers
@@ -331,13 +423,24 @@ document.addEventListener('DOMContentLoaded', ()=>{
   });
 });
 
+// Must match PAGE_SIZE in tools/prerender.py, which renders this first page into index.html
+const INITIAL_PAGE_SIZE = 50;
+
+// Order of the entries when nothing is searched; same as browse_key() in tools/prerender.py
+function browseOrder(items){
+  const key = it=>[(it.term || '').toLowerCase(), it.id || ''];
+  return items.slice().sort((a,b)=>{
+    const ka = key(a), kb = key(b);
+    if(ka[0] !== kb[0]) return ka[0] < kb[0] ? -1 : 1;
+    return ka[1] < kb[1] ? -1 : ka[1] > kb[1] ? 1 : 0;
+  });
+}
+
 function search(q) {
-  // If no query but tags are selected, return all items (tag filter will be applied)
+  // No query: every entry when tags are selected (the tag filter narrows them), the first page otherwise
   if (!q) {
-    if (selectedTags.size > 0) {
-      return glossary.map(it => ({item: it, matches: []}));
-    }
-    return [];
+    const all = browseOrder(glossary).map(it => ({item: it, matches: []}));
+    return selectedTags.size > 0 ? all : all.slice(0, INITIAL_PAGE_SIZE);
   }
   if(fuse){
     const raw = fuse.search(q, {limit: 200});
@@ -547,6 +650,13 @@ function setupTagAutocompleteFor(inputId, suggestionsContainerId){
 }
 
 document.addEventListener('DOMContentLoaded', async ()=>{
+  const state = takeInitialState();
+  if(state){
+    // the server-rendered first page, rebuilt with its handlers, until the whole glossary is here
+    glossary = state.terms;
+    glossaryById = new Map(glossary.map(it=>[it.id, it]));
+    render(search(''));
+  }
   await loadGlossary();
   const q = document.getElementById('q');
   doSearch = debounce(()=>{
@@ -555,6 +665,8 @@ document.addEventListener('DOMContentLoaded', async ()=>{
     render(filtered);
   }, 150);
   q.addEventListener('input', doSearch);
+  // The first page again, now with the cross-references (or a query typed meanwhile)
+  if(glossary.length) render(filterByTags(search(q.value)));
 
   // Global search
   const globalSearchInput = document.getElementById('globalSearch');
@@ -874,15 +986,36 @@ document.addEventListener('DOMContentLoaded', async ()=>{
     const titleEl = document.getElementById('imgTitleInline');
     const tagsEl = document.getElementById('imgTagsInline');
     if(!fileEl.files || fileEl.files.length===0){ alert('Select a file to upload'); return; }
-    const f = fileEl.files[0];
     const fd = new FormData();
-    fd.append('file', f);
-    fd.append('title', titleEl.value || f.name);
+    let endpoint = '/api/images';
+    if(fileEl.files.length > 1){
+      // several files: one bulk request, titles default to the file names
+      endpoint = '/api/images/bulk';
+      for(const f of fileEl.files){
+        fd.append('files', f);
+        fd.append('titles', f.name);
+      }
+    }else{
+      const f = fileEl.files[0];
+      fd.append('file', f);
+      fd.append('title', titleEl.value || f.name);
+    }
     fd.append('tags', (tagsEl && tagsEl.value) ? tagsEl.value : '');
     try{
-      const resp = await fetch('/api/images', {method:'POST', body: fd});
+      const resp = await fetch(endpoint, {method:'POST', body: fd});
       if(!resp.ok) throw new Error('Upload failed');
       const meta = await resp.json();
+      if(meta.failed){
+        const names = meta.results.filter(r=>!r.ok).map(r=>`${r.original}: ${r.error}`);
+        alert(`${meta.failed} file(s) could not be uploaded:\n${names.join('\n')}`);
+      }
+      // warn about diagrams that look like ones already in the gallery
+      const dupes = meta.results
+        ? meta.results.filter(r=>r.ok && r.near_duplicates && r.near_duplicates.length).map(r=>`${r.original} ≈ ${r.near_duplicates.map(d=>d.title).join(', ')}`)
+        : (meta.near_duplicates && meta.near_duplicates.length ? [`${meta.title} ≈ ${meta.near_duplicates.map(d=>d.title).join(', ')}`] : []);
+      if(dupes.length){
+        alert(`Possible duplicates of existing diagrams:\n${dupes.join('\n')}`);
+      }
       // reload gallery
       imagesData = await tryFetch('/api/images') || [];
       const filtered = filterImagesByTags(imagesData);
@@ -968,6 +1101,10 @@ function renderGalleryIn(containerId, imgs){
       const img = document.createElement('img');
       img.src = `/images/${it.filename}`;
       img.className = 'diagramThumb';
+      if(ext === 'png'){
+        img.style.cursor = 'zoom-in';
+        img.addEventListener('click', ()=>openTileViewer(it));
+      }
       card.appendChild(img);
     }else{
       const box = document.createElement('div');
@@ -1016,6 +1153,135 @@ function renderGalleryIn(containerId, imgs){
   }
 }
 
+// Deep-zoom viewer: only the tiles intersecting the viewport are requested.
+// Level `levels - 1` is full resolution; each lower level halves the size.
+let tileViewer = null;
+
+async function openTileViewer(it){
+  const info = await tryFetch(`/api/images/${it.id}/tiles`);
+  if(!info){ window.open(`/images/${it.filename}`, '_blank'); return; }
+  const modal = document.getElementById('tileModal');
+  const viewport = document.getElementById('tileViewport');
+  document.getElementById('tileModalTitle').textContent = it.title || it.original || '';
+  document.getElementById('tileModalMeta').textContent = `${info.width} × ${info.height}`;
+  document.getElementById('tileOriginal').href = `/images/${it.filename}`;
+  viewport.innerHTML = '';
+  modal.classList.remove('hidden');
+  modal.setAttribute('aria-hidden','false');
+  const v = {id: it.id, info, z: 0, ox: 0, oy: 0, tiles: new Map()};
+  tileViewer = v;
+  // start at the largest level that fits the viewport
+  const W = viewport.clientWidth, H = viewport.clientHeight;
+  for(let z = info.levels - 1; z >= 0; z--){
+    const [lw, lh] = tileLevelSize(info, z);
+    if((lw <= W && lh <= H) || z === 0){ v.z = z; break; }
+  }
+  const [lw, lh] = tileLevelSize(info, v.z);
+  v.ox = (lw - W) / 2; v.oy = (lh - H) / 2;
+  renderTiles();
+}
+
+function tileLevelSize(info, z){
+  let w = info.width, h = info.height;
+  for(let i = 0; i < info.levels - 1 - z; i++){ w = Math.ceil(w / 2); h = Math.ceil(h / 2); }
+  return [w, h];
+}
+
+function clampTileOffsets(v, W, H){
+  const [lw, lh] = tileLevelSize(v.info, v.z);
+  // center small levels, otherwise keep the image covering the viewport
+  v.ox = lw <= W ? (lw - W) / 2 : Math.min(Math.max(v.ox, 0), lw - W);
+  v.oy = lh <= H ? (lh - H) / 2 : Math.min(Math.max(v.oy, 0), lh - H);
+}
+
+function renderTiles(){
+  const v = tileViewer;
+  if(!v) return;
+  const viewport = document.getElementById('tileViewport');
+  const W = viewport.clientWidth, H = viewport.clientHeight;
+  clampTileOffsets(v, W, H);
+  const T = v.info.tile_size;
+  const [lw, lh] = tileLevelSize(v.info, v.z);
+  const x0 = Math.max(0, Math.floor(v.ox / T)), x1 = Math.min(Math.ceil(lw / T) - 1, Math.floor((v.ox + W - 1) / T));
+  const y0 = Math.max(0, Math.floor(v.oy / T)), y1 = Math.min(Math.ceil(lh / T) - 1, Math.floor((v.oy + H - 1) / T));
+  const wanted = new Set();
+  for(let y = y0; y <= y1; y++){
+    for(let x = x0; x <= x1; x++){
+      const key = `${v.z}/${x}/${y}`;
+      wanted.add(key);
+      let img = v.tiles.get(key);
+      if(!img){
+        img = document.createElement('img');
+        img.src = `/images/${v.id}/tiles/${key}`;
+        img.alt = '';
+        v.tiles.set(key, img);
+        viewport.appendChild(img);
+      }
+      img.style.left = `${Math.round(x * T - v.ox)}px`;
+      img.style.top = `${Math.round(y * T - v.oy)}px`;
+    }
+  }
+  // drop tiles that scrolled out of view or belong to another level
+  for(const [key, img] of v.tiles){
+    if(!wanted.has(key)){ img.remove(); v.tiles.delete(key); }
+  }
+}
+
+function zoomTiles(delta, cx, cy){
+  const v = tileViewer;
+  if(!v) return;
+  const z = Math.min(v.info.levels - 1, Math.max(0, v.z + delta));
+  if(z === v.z) return;
+  const viewport = document.getElementById('tileViewport');
+  if(cx === undefined){ cx = viewport.clientWidth / 2; cy = viewport.clientHeight / 2; }
+  // keep the point under (cx, cy) fixed
+  const k = Math.pow(2, z - v.z);
+  v.ox = (v.ox + cx) * k - cx;
+  v.oy = (v.oy + cy) * k - cy;
+  v.z = z;
+  renderTiles();
+}
+
+function closeTileViewer(){
+  const modal = document.getElementById('tileModal');
+  modal.classList.add('hidden');
+  modal.setAttribute('aria-hidden','true');
+  document.getElementById('tileViewport').innerHTML = '';
+  tileViewer = null;
+}
+
+document.addEventListener('DOMContentLoaded', ()=>{
+  const viewport = document.getElementById('tileViewport');
+  if(!viewport) return;
+  let drag = null;
+  viewport.addEventListener('pointerdown', (e)=>{
+    if(!tileViewer) return;
+    drag = {x: e.clientX, y: e.clientY};
+    viewport.classList.add('dragging');
+    viewport.setPointerCapture(e.pointerId);
+  });
+  viewport.addEventListener('pointermove', (e)=>{
+    if(!drag || !tileViewer) return;
+    tileViewer.ox -= e.clientX - drag.x;
+    tileViewer.oy -= e.clientY - drag.y;
+    drag = {x: e.clientX, y: e.clientY};
+    renderTiles();
+  });
+  const endDrag = ()=>{ drag = null; viewport.classList.remove('dragging'); };
+  viewport.addEventListener('pointerup', endDrag);
+  viewport.addEventListener('pointercancel', endDrag);
+  viewport.addEventListener('wheel', (e)=>{
+    e.preventDefault();
+    const r = viewport.getBoundingClientRect();
+    zoomTiles(e.deltaY < 0 ? 1 : -1, e.clientX - r.left, e.clientY - r.top);
+  }, {passive: false});
+  document.getElementById('tileZoomIn').addEventListener('click', ()=>zoomTiles(1));
+  document.getElementById('tileZoomOut').addEventListener('click', ()=>zoomTiles(-1));
+  document.getElementById('closeTile').addEventListener('click', closeTileViewer);
+  document.getElementById('tileModalOverlay').addEventListener('click', closeTileViewer);
+  window.addEventListener('resize', renderTiles);
+});
+
 function showDbModal(db){
   const modal = document.getElementById('dbModal');
   const container = document.getElementById('dbTableContainer');